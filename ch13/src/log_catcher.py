@@ -3,6 +3,11 @@
 This module implements a TCP server that receives pickled log records from
 remote logging clients using Python's logging.handlers.SocketHandler. The
 server unpickles the log records and writes them to a unified JSON log file.
+Pickles are loaded with RecordUnpickler, which refuses to import anything,
+so a client can't make the server run code. Clients using the
+JSONSocketHandler of remote_logging_app.py send JSON objects instead, which
+are written as they are; the first record of a connection settles which
+format it sends.
 
 The server uses the struct module to handle the message framing protocol,
 where each log record is prefixed with a 4-byte big-endian unsigned long
@@ -23,26 +28,95 @@ Attributes:
     PORT (int): Default port number for the server (18842).
 """
 
+from enum import Enum
+import io
 import json
 from pathlib import Path
 import socketserver
-from typing import TextIO
+from typing import Any, Optional, TextIO
 import pickle
 import sys
 import struct
 
 
+# Payload decoding, the same as in ch14/src/log_catcher.py: each chapter
+# stands alone, so a fix to one copy goes in both (ch14's tests compare them)
+class RecordUnpickler(pickle.Unpickler):
+    """An unpickler of plain data, which refuses to import anything.
+
+    pickle.loads() imports and calls whatever a payload names. Every opcode
+    that reaches a module global looks it up with find_class(), and the
+    opcodes that call something can only call what such a lookup found, so
+    refusing every lookup leaves the opcodes of plain data: dicts, lists,
+    tuples, strings, numbers, booleans and None, as SocketHandler sends.
+
+    Example:
+        >>> load_record(pickle.dumps({"msg": "Hello", "lineno": 42}))
+        {'msg': 'Hello', 'lineno': 42}
+    """
+
+    def find_class(self, module: str, name: str) -> Any:
+        raise pickle.UnpicklingError(f"global '{module}.{name}' is forbidden")
+
+
+def load_record(payload_bytes: bytes) -> Any:
+    """Unpickle a payload with RecordUnpickler.
+
+    The BufferedReader lets the unpickler peek() ahead, rather than call
+    read() for every opcode of SocketHandler's unframed protocol 1 pickles.
+
+    Raises:
+        pickle.UnpicklingError: If the pickle names a global, or is invalid.
+    """
+    return RecordUnpickler(io.BufferedReader(io.BytesIO(payload_bytes))).load()
+
+
+class Format(str, Enum):
+    """Format of the payloads of a connection.
+
+    A JSON object begins with "{", which isn't a pickle opcode, so the
+    first payload of a connection tells which format it sends.
+    """
+
+    PICKLE = "pickle"
+    JSON = "json"
+
+
+def frame_format(payload_bytes: bytes) -> Format:
+    """The format of a payload, from its first byte."""
+    return Format.JSON if payload_bytes[:1] == b"{" else Format.PICKLE
+
+
+def record_text(payload_bytes: bytes) -> str:
+    """Convert a pickled or JSON payload to one line of JSON.
+
+    Raises:
+        pickle.UnpicklingError: If a pickle names a global, or is invalid.
+        ValueError: If a JSON payload is invalid.
+        TypeError: If the unpickled object cannot be JSON serialized.
+    """
+    if frame_format(payload_bytes) is Format.JSON:
+        text = payload_bytes.decode("utf-8")
+        record = json.loads(text)
+        if "\n" in text or "\r" in text:
+            return json.dumps(record)
+        return text
+    return json.dumps(load_record(payload_bytes))
+
+
 class LogDataCatcher(socketserver.BaseRequestHandler):
     """TCP request handler that receives and processes remote log records.
 
     This handler receives pickled log records sent via SocketHandler,
     unpickles them, and writes them to a JSON log file. Each connection
-    can send multiple log records in sequence.
+    can send multiple log records in sequence. A connection whose first
+    record is a JSON object sends JSON (see Format); records in the other
+    format, and records that can't be converted, are skipped.
 
     The handler implements the logging protocol:
     1. Read 4-byte size header (big-endian unsigned long)
     2. Read payload bytes based on the size
-    3. Unpickle the log record dictionary
+    3. Unpickle the log record dictionary (see record_text())
     4. Write to JSON log file
     5. Repeat until connection closes
 
@@ -79,7 +153,7 @@ class LogDataCatcher(socketserver.BaseRequestHandler):
         1. Receive 4-byte size header
         2. Unpack to get payload size
         3. Receive payload bytes
-        4. Unpickle to get log record dictionary
+        4. Convert the log record to JSON (see record_text())
         5. Write to JSON log file
         6. Increment counter and print diagnostic info
 
@@ -101,16 +175,26 @@ class LogDataCatcher(socketserver.BaseRequestHandler):
             Each received log record is written as a JSON line to the output file.
         """
 
+        settled: Optional[Format] = None
         size_header_bytes = self.request.recv(LogDataCatcher.size_bytes)
         while size_header_bytes:
             payload_size = struct.unpack(LogDataCatcher.size_format, size_header_bytes)
             print(f"{size_header_bytes=} {payload_size=}", file=sys.stderr)
             payload_bytes = self.request.recv(payload_size[0])
             print(f"{len(payload_bytes)=}", file=sys.stderr)
-            payload = pickle.loads(payload_bytes)
-            LogDataCatcher.count += 1
-            print(f"{self.client_address[0]} {LogDataCatcher.count} {payload!r}")
-            self.log_file.write(json.dumps(payload) + "\n")
+            if settled is None:
+                settled = frame_format(payload_bytes)
+            if frame_format(payload_bytes) is not settled:
+                print(f"Skipped a payload not in {settled.value}", file=sys.stderr)
+            else:
+                try:
+                    text = record_text(payload_bytes)
+                except (pickle.UnpicklingError, ValueError, TypeError) as error:
+                    print(f"Skipped a payload: {error}", file=sys.stderr)
+                else:
+                    LogDataCatcher.count += 1
+                    print(f"{self.client_address[0]} {LogDataCatcher.count} {text}")
+                    self.log_file.write(text + "\n")
 
             try:
                 size_header_bytes = self.request.recv(LogDataCatcher.size_bytes)
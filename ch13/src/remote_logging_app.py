@@ -8,6 +8,9 @@ The application uses two logging handlers:
 1. SocketHandler - Sends pickled log records to a remote server (log_catcher.py)
 2. StreamHandler - Outputs log messages to stderr for local debugging
 
+JSONSocketHandler can stand in for SocketHandler: it sends the same records
+as JSON objects, which log_catcher.py writes without unpickling anything.
+
 Example:
     Run the application directly:
 
@@ -30,14 +33,46 @@ Note:
     this application, otherwise the SocketHandler will fail to connect.
 """
 
+import json
 import logging
 import logging.handlers
+import struct
 import sys
 from math import factorial
 
 logger = logging.getLogger("app")
 
 
+# The same handler as in ch14/src/remote_logging_app.py: each chapter stands
+# alone, so a fix to one copy goes in both (ch14's tests compare them)
+class JSONSocketHandler(logging.handlers.SocketHandler):
+    """A SocketHandler that sends each record as a compact JSON object.
+
+    The framing (a 4-byte big-endian length, then the payload) and the
+    record's dict are those of SocketHandler; only the payload is JSON
+    instead of a pickle. Values that aren't JSON types are sent as their
+    str().
+
+    Example:
+        >>> handler = JSONSocketHandler("localhost", 18842)
+        >>> logger.addHandler(handler)
+    """
+
+    def makePickle(self, record: logging.LogRecord) -> bytes:
+        """Frame the record as JSON (the name is SocketHandler's hook)."""
+        if record.exc_info:
+            # Formats the traceback into record.exc_text
+            self.format(record)
+        record_dict = dict(record.__dict__)
+        record_dict["msg"] = record.getMessage()
+        record_dict["args"] = None
+        record_dict["exc_info"] = None
+        record_dict.pop("message", None)
+        payload = json.dumps(record_dict, default=str, separators=(",", ":"))
+        data = payload.encode("utf-8")
+        return struct.pack(">L", len(data)) + data
+
+
 def work(i: int) -> int:
     """Calculate the factorial of a number and log the operation.
 
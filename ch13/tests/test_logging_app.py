@@ -1,3 +1,7 @@
+import json
+import os
+import pickle
+import struct
 import sys
 from pathlib import Path
 import pytest
@@ -10,15 +14,18 @@ from typing import Iterator
 # Add parent directory to path to import from src
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
+from src import log_catcher as catcher
 from src import remote_logging_app
 
 
 @pytest.fixture(scope="session")
-def log_catcher() -> Iterator[None]:
-    server_path = Path("src") / "log_catcher.py"
+def log_catcher(tmp_path_factory: pytest.TempPathFactory) -> Iterator[None]:
+    server_path = Path(__file__).parent.parent / "src" / "log_catcher.py"
     print(f"Starting server {server_path}")
+    # The server writes one.log to its working directory
     p = subprocess.Popen(
         [sys.executable, str(server_path)],
+        cwd=tmp_path_factory.mktemp("log_catcher"),
         stdout=subprocess.PIPE,
         stderr=subprocess.STDOUT,
         text=True,
@@ -219,3 +226,37 @@ def test_single_call(log_catcher: None, logging_config: None) -> None:
     """Test single isolated call to work function."""
     result = remote_logging_app.work(8)
     assert result == 40320  # 8! = 40320
+
+
+def test_json_handler(log_catcher: None) -> None:
+    """Test the JSON handler's frames, and sending them to the server."""
+    handler = remote_logging_app.JSONSocketHandler("localhost", 18842)
+    record = logging.LogRecord("app", logging.INFO, "x.py", 7, "n=%d", (3,), None)
+    data = handler.makePickle(record)
+    (size,) = struct.unpack(">L", data[:4])
+    assert size == len(data) - 4
+    assert json.loads(data[4:])["msg"] == "n=3"
+    assert catcher.record_text(data[4:]) == data[4:].decode()
+    remote_logging_app.logger.addHandler(handler)
+    try:
+        assert remote_logging_app.work(4) == 24
+    finally:
+        handler.close()
+        remote_logging_app.logger.removeHandler(handler)
+
+
+class Exploit:
+    """Runs a command when unpickled with pickle.loads()."""
+
+    def __reduce__(self):
+        return (os.system, ("echo unpickled",))
+
+
+def test_record_unpickler() -> None:
+    """Test that pickles of plain data load, and globals are refused."""
+    data = {"msg": "x", "lineno": 42, "created": 1.5, "args": None}
+    assert catcher.load_record(pickle.dumps(data, 1)) == data
+    with pytest.raises(pickle.UnpicklingError, match="is forbidden"):
+        catcher.load_record(pickle.dumps(Exploit()))
+    assert catcher.frame_format(pickle.dumps(data)) is catcher.Format.PICKLE
+    assert catcher.frame_format(b'{"a": 1}') is catcher.Format.JSON
@@ -0,0 +1,370 @@
+"""Counting Code Constructs with Pluggable Collectors in One Parse.
+
+code_search's ImportVisitor answers one question, which modules a file
+imports. Questions like "which functions are called most", "which
+decorators does this codebase use", or "how often is .append reached for"
+need the same parse, and a visitor per question would parse every file
+once per question. This module runs any number of collectors over one
+parse and one ast.walk() of each file:
+
+    - A collector names the node types it wants and turns each such node
+      into zero or more keys ('os.path.join' for a call, 'dataclass' for
+      a decorator)
+    - MultiVisitor dispatches each node by type to the collectors that
+      asked for it, so a node type nobody wants costs one dict lookup
+    - Each collector's keys are counted in a collections.Counter; workers
+      return one Counter per collector for their whole batch, and the
+      batches are summed, so only the counts cross the process boundary
+
+Collectors are registered by name with register(). The built-in ones are
+imports, calls, classes, decorators and attributes. Workers look
+collectors up by name, so a collector registered by a module of your own
+must be registered when that module is imported (as the built-in ones
+are), which makes it available in spawned workers too.
+
+Example Usage:
+    # The 20 most common calls and decorators of a project
+    python ast_query.py src --collect calls decorators --top 20
+
+    # Use as a module
+    >>> counts = query(all_source(Path('src'), '*.py'), ['calls', 'classes'])
+    >>> counts['calls'].most_common(3)
+    [('len', 412), ('isinstance', 260), ('print', 131)]
+
+    # A collector of your own
+    >>> @register('lambdas', ast.Lambda)
+    ... def lambdas(node: ast.Lambda) -> Iterator[str]:
+    ...     yield f'{len(node.args.args)} args'
+"""
+
+from __future__ import annotations
+
+import argparse
+import ast
+from collections import Counter
+from concurrent import futures
+import os
+from pathlib import Path
+import sys
+import time
+from typing import Callable, Iterable, Iterator, NamedTuple, Optional
+
+from code_search import BATCH_SIZE, SourceRoots
+
+
+# A collector's function: one node in, the keys to count out
+Keys = Callable[[ast.AST], Iterable[str]]
+
+
+class Collector(NamedTuple):
+    """A registered collector.
+
+    Attributes:
+        name (str): The name it is registered and reported under.
+        nodes (tuple[type[ast.AST], ...]): The node types it is given.
+        keys (Keys): Turns one node into the keys to count.
+    """
+
+    name: str
+    nodes: tuple[type[ast.AST], ...]
+    keys: Keys
+
+
+# Registered collectors, by name
+COLLECTORS: dict[str, Collector] = {}
+
+
+def register(name: str, *nodes: type[ast.AST]) -> Callable[[Keys], Keys]:
+    """Register a function as the collector name, for nodes of these types.
+
+    Args:
+        name (str): Name of the collector; registering it again replaces
+            the previous one.
+        *nodes (type[ast.AST]): Node types the function is called with
+            (exact types; subclasses aren't matched).
+
+    Returns:
+        Callable: A decorator that registers the function and returns it
+            unchanged.
+
+    Example:
+        >>> @register('globals', ast.Global)
+        ... def globals_(node: ast.Global) -> list[str]:
+        ...     return node.names
+    """
+
+    def decorate(keys: Keys) -> Keys:
+        COLLECTORS[name] = Collector(name, nodes, keys)
+        return keys
+
+    return decorate
+
+
+def dotted(node: ast.AST) -> Optional[str]:
+    """The dotted name an expression spells, if it is one.
+
+    Args:
+        node (ast.AST): An expression, e.g. a call's func.
+
+    Returns:
+        Optional[str]: 'os.path.join' for os.path.join, 'app.route' for
+            app.route('/') (a call is named after what it calls), or None
+            for anything else, such as handlers[0].run.
+    """
+    parts = []
+    while isinstance(node, ast.Attribute):
+        parts.append(node.attr)
+        node = node.value
+    if isinstance(node, ast.Call):
+        return dotted(node.func)
+    if not isinstance(node, ast.Name):
+        return None
+    parts.append(node.id)
+    return ".".join(reversed(parts))
+
+
+@register("imports", ast.Import, ast.ImportFrom)
+def imports(node: ast.Import | ast.ImportFrom) -> Iterator[str]:
+    """Modules imported, as ImportVisitor names them."""
+    if isinstance(node, ast.Import):
+        for alias in node.names:
+            yield alias.name
+    elif node.module:
+        yield node.module
+
+
+@register("calls", ast.Call)
+def calls(node: ast.Call) -> Iterator[str]:
+    """Functions called by name, e.g. 'print' or 'self.visit'."""
+    name = dotted(node.func)
+    if name is not None:
+        yield name
+
+
+@register("classes", ast.ClassDef)
+def classes(node: ast.ClassDef) -> Iterator[str]:
+    """Classes defined, by name."""
+    yield node.name
+
+
+@register("decorators", ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)
+def decorators(
+    node: ast.FunctionDef | ast.AsyncFunctionDef | ast.ClassDef,
+) -> Iterator[str]:
+    """Decorators applied, e.g. 'property' or 'mark.parametrize'."""
+    for decorator in node.decorator_list:
+        name = dotted(decorator)
+        if name is not None:
+            yield name
+
+
+@register("attributes", ast.Attribute)
+def attributes(node: ast.Attribute) -> Iterator[str]:
+    """Attributes accessed, by attribute name alone (e.g. 'append')."""
+    yield node.attr
+
+
+class MultiVisitor:
+    """Run several collectors over a tree in one walk.
+
+    Each node is looked up by its exact type in a dispatch table built
+    once, which lists the collectors wanting that type. The keys they
+    return are counted per collector.
+
+    Attributes:
+        counts (dict[str, Counter]): Keys counted so far, by collector.
+
+    Example:
+        >>> visitor = MultiVisitor(['calls', 'classes'])
+        >>> visitor.visit(ast.parse('class A: pass\\nprint(len(A.x))'))
+        >>> visitor.counts
+        {'calls': Counter({'print': 1, 'len': 1}), 'classes': Counter({'A': 1})}
+    """
+
+    def __init__(self, names: Iterable[str]) -> None:
+        """Set up the collectors to run.
+
+        Args:
+            names (Iterable[str]): Registered collector names.
+
+        Raises:
+            ValueError: If a name isn't registered.
+        """
+        self.counts: dict[str, Counter] = {}
+        self.dispatch: dict[type[ast.AST], list[tuple[Keys, Counter]]] = {}
+        for name in names:
+            if name not in COLLECTORS:
+                raise ValueError(f"unknown collector {name!r}")
+            if name in self.counts:
+                continue
+            collector = COLLECTORS[name]
+            counter = self.counts[name] = Counter()
+            for node_type in collector.nodes:
+                self.dispatch.setdefault(node_type, []).append(
+                    (collector.keys, counter)
+                )
+
+    def visit(self, tree: ast.AST) -> None:
+        """Count the keys of every node in the tree."""
+        dispatch = self.dispatch
+        for node in ast.walk(tree):
+            handlers = dispatch.get(type(node))
+            if handlers:
+                for keys, counter in handlers:
+                    counter.update(keys(node))
+
+
+def query_batch(paths: list[Path], names: list[str]) -> dict[str, Counter]:
+    """Parse a batch of files once each and count with the collectors.
+
+    Args:
+        paths (list[Path]): Python source files.
+        names (list[str]): Registered collector names.
+
+    Returns:
+        dict[str, Counter]: The counts of the whole batch, by collector.
+
+    Raises:
+        SyntaxError: If a file contains invalid syntax.
+    """
+    visitor = MultiVisitor(names)
+    for path in paths:
+        visitor.visit(ast.parse(path.read_text(), filename=str(path)))
+    return visitor.counts
+
+
+def query(
+    paths: Iterable[Path],
+    names: Iterable[str],
+    workers: Optional[int] = None,
+    batch: int = BATCH_SIZE,
+) -> dict[str, Counter]:
+    """Count with the collectors over files, in a process pool.
+
+    Each task is a batch of paths, read and parsed by the worker, which
+    returns one Counter per collector; the main process adds them up.
+
+    Args:
+        paths (Iterable[Path]): Python source files.
+        names (Iterable[str]): Registered collector names.
+        workers (Optional[int], optional): Worker processes. Defaults to
+            None (one per CPU).
+        batch (int, optional): Paths per task. Defaults to BATCH_SIZE.
+
+    Returns:
+        dict[str, Counter]: The counts of all the files, by collector, in
+            the order of names.
+
+    Raises:
+        ValueError: If a name isn't registered.
+        SyntaxError: If a file contains invalid syntax.
+    """
+    totals = MultiVisitor(names).counts  # Checks the names first
+    names = list(totals)
+    paths = list(paths)
+    batches = [paths[i : i + batch] for i in range(0, len(paths), batch)]
+    with futures.ProcessPoolExecutor(workers) as pool:
+        tasks = [pool.submit(query_batch, task, names) for task in batches]
+        for task in futures.as_completed(tasks):
+            for name, counts in task.result().items():
+                totals[name].update(counts)
+    return totals
+
+
+def get_options(argv: list[str] = sys.argv[1:]) -> argparse.Namespace:
+    """Parse command-line arguments for the query tool.
+
+    Args:
+        argv (list[str], optional): Command-line arguments to parse.
+            Defaults to sys.argv[1:].
+
+    Returns:
+        argparse.Namespace: Parsed arguments containing:
+            - root (list[Path]): Directories to scan, default none (the
+              current directory).
+            - collect (list[str]): Collectors to run, default all.
+            - top (int): Most common keys shown per collector, default 10.
+            - workers (Optional[int]): Parser processes, default None.
+            - batch (int): Paths per process task, default BATCH_SIZE.
+    """
+    parser = argparse.ArgumentParser(
+        description="Count calls, classes, decorators and more in one parse"
+    )
+    parser.add_argument(
+        "root",
+        type=Path,
+        nargs="*",
+        help="directories to scan (defaults to the current directory)",
+    )
+    parser.add_argument(
+        "--collect",
+        nargs="+",
+        choices=sorted(COLLECTORS),
+        default=list(COLLECTORS),
+        metavar="NAME",
+        help=f"collectors to run (default all: {', '.join(COLLECTORS)})",
+    )
+    parser.add_argument(
+        "--top",
+        type=int,
+        default=10,
+        help="most common keys to show per collector (default 10)",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        help="parse in this many processes (default one per CPU)",
+    )
+    parser.add_argument(
+        "--batch",
+        type=int,
+        default=BATCH_SIZE,
+        help=f"paths per process task (default {BATCH_SIZE})",
+    )
+    return parser.parse_args(argv)
+
+
+def main(
+    roots: list[Path],
+    names: list[str],
+    top: int = 10,
+    workers: Optional[int] = None,
+    batch: int = BATCH_SIZE,
+) -> None:
+    """Scan some roots and print each collector's most common keys.
+
+    Args:
+        roots (list[Path]): Directories to scan, each file once (see
+            SourceRoots).
+        names (list[str]): Registered collector names.
+        top (int, optional): Keys shown per collector. Defaults to 10.
+        workers (Optional[int], optional): Parser processes. Defaults to
+            None.
+        batch (int, optional): Paths per task. Defaults to BATCH_SIZE.
+
+    Example Output:
+        calls (5230 in total, 1297 distinct)
+            412 len
+            260 isinstance
+        Queried 180 files in 0.412s
+    """
+    start = time.perf_counter()
+    paths = list(SourceRoots(roots).walk())
+    counts = query(paths, names, workers, batch)
+    end = time.perf_counter()
+    for name, counter in counts.items():
+        print(f"{name} ({counter.total()} in total, {len(counter)} distinct)")
+        for key, count in counter.most_common(top):
+            print(f"{count:8d} {key}")
+    print(f"Queried {len(paths)} files in {end - start:.3f}s", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    options = get_options()
+    main(
+        options.root or [Path(os.curdir)],
+        options.collect,
+        options.top,
+        options.workers,
+        options.batch,
+    )
@@ -0,0 +1,402 @@
+"""Benchmark Suite for the Parallel Directory Search.
+
+This module measures what the DirectorySearch docstring used to only
+claim: how long setup takes, how long each query takes, how much memory
+the workers hold, and how much data crosses the process queues. It
+generates a synthetic corpus of configurable size and shape, then runs
+setup_search() and search() for every combination of worker count,
+worker mode and query selectivity.
+
+Measurements:
+    - Setup time: setup_search() plus a first query, since the workers
+      load their files after setup_search() has returned
+    - Query latency: wall time to exhaust search(), reported as the
+      p50/p95/p99 of the repeated runs
+    - Peak RSS per worker: the high-water mark (VmHWM) of each worker
+      process, read from /proc before shutdown; None where /proc is not
+      available
+    - Queue bytes: pickled size of every Request sent to the workers and
+      every Result received, measured in a separate, untimed pass
+
+Corpus Shape:
+    Every line is made of random identifier-like words, plus marker words
+    placed so that each query hits a known fraction of the lines:
+    "m10x" is on every 10th line, "m1000x" on every 1000th, and so on.
+    With skew="zipf" file i gets a share of the lines proportional to
+    1/(i+1), which is the case that size-balanced partitioning is for.
+
+Output:
+    One JSON document (see run_benchmark()), meant to be stored per
+    release and compared to catch regressions.
+
+Example Usage:
+    # Default matrix on a 200 file corpus, JSON on stdout
+    python bench_directory_search.py
+
+    # A larger, skewed corpus, written to a file
+    python bench_directory_search.py --files 2000 --skew zipf \\
+        --cpus 1 2 4 8 --modes lists corpus index -o bench.json
+
+    # Use as a module
+    from bench_directory_search import Shape, run_benchmark
+    report = run_benchmark(Shape(files=50), cpus=[2], repeat=5)
+"""
+
+from __future__ import annotations
+import argparse
+from contextlib import redirect_stdout
+import json
+import os
+from pathlib import Path
+import pickle
+import platform
+import random
+import string
+import sys
+import tempfile
+import time
+from typing import Any, NamedTuple, Optional
+
+from directory_search import DirectorySearch, Query, Request, Result
+from latency import percentiles
+
+# Bump on any change to the layout of the JSON report
+REPORT_VERSION = 1
+
+# Fraction of lines each benchmark query matches; 0.0 matches nothing
+SELECTIVITIES = (0.0, 0.001, 0.01, 0.1, 1.0)
+
+MODES = ("lists", "corpus", "index")
+
+
+class Shape(NamedTuple):
+    """Size and shape of a synthetic corpus.
+
+    Attributes:
+        files (int): Number of files.
+        lines (int): Average lines per file.
+        line_length (int): Approximate characters per line.
+        skew (str): "uniform" (every file the same length) or "zipf"
+            (file i holds a share of the lines proportional to 1/(i+1)).
+        seed (int): Seed of the random words, so a shape always produces
+            the same corpus.
+    """
+
+    files: int = 200
+    lines: int = 500
+    line_length: int = 60
+    skew: str = "uniform"
+    seed: int = 0
+
+
+def marker(selectivity: float) -> str:
+    """Return the word that appears on the given fraction of the lines.
+
+    Args:
+        selectivity (float): Fraction of lines, from 0.0 to 1.0.
+
+    Returns:
+        str: "m<n>x" for a fraction 1/n, or "absent" for 0.0. The trailing
+            "x" keeps "m10x" from matching inside "m100x".
+
+    Example:
+        >>> marker(0.01)
+        'm100x'
+    """
+    if not selectivity:
+        return "absent"
+    return f"m{round(1 / selectivity)}x"
+
+
+def make_corpus(root: Path, shape: Shape) -> list[Path]:
+    """Write a synthetic corpus of Python-like files.
+
+    Args:
+        root (Path): Directory to write the files into; created if needed.
+        shape (Shape): Size and shape of the corpus.
+
+    Returns:
+        list[Path]: The files written, in order.
+
+    Example:
+        >>> paths = make_corpus(Path('/tmp/bench'), Shape(files=10, lines=100))
+        >>> len(paths)
+        10
+    """
+    rng = random.Random(shape.seed)
+    total = shape.files * shape.lines
+    if shape.skew == "zipf":
+        weights = [1 / (i + 1) for i in range(shape.files)]
+    else:
+        weights = [1.0] * shape.files
+    scale = total / sum(weights)
+    counts = [max(1, round(w * scale)) for w in weights]
+
+    denominators = [round(1 / s) for s in SELECTIVITIES if s]
+    letters = string.ascii_lowercase
+    root.mkdir(parents=True, exist_ok=True)
+    paths, number = [], 0
+    for i, line_count in enumerate(counts):
+        lines = []
+        for _ in range(line_count):
+            words = [f"m{n}x" for n in denominators if number % n == 0]
+            while sum(len(w) + 1 for w in words) < shape.line_length:
+                words.append("".join(rng.choices(letters, k=rng.randint(2, 10))))
+            lines.append("    " + " ".join(words))
+            number += 1
+        path = root / f"module_{i:05d}.py"
+        path.write_text("\n".join(lines) + "\n")
+        paths.append(path)
+    return paths
+
+
+def peak_rss(pid: int) -> Optional[int]:
+    """Return the peak resident set size of a live process, in bytes.
+
+    Reads the VmHWM ("high water mark") line of /proc/<pid>/status, so it
+    only works on Linux and while the process is still running.
+
+    Args:
+        pid (int): Process id.
+
+    Returns:
+        Optional[int]: Peak RSS in bytes, or None if it can't be read.
+    """
+    try:
+        with open(f"/proc/{pid}/status") as status:
+            for line in status:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return None
+
+
+class CountingQueue:
+    """Results queue wrapper that adds up the pickled size of each Result.
+
+    The coordinator only calls get() on its results queue, so this stands
+    in for it during the traffic pass. Pickling again costs time, which is
+    why that pass is not timed.
+
+    Attributes:
+        queue (Queue): The wrapped results queue.
+        received (int): Bytes of the Results taken off the queue so far.
+    """
+
+    def __init__(self, queue: Any) -> None:
+        """Wrap a results queue, starting the count at zero."""
+        self.queue = queue
+        self.received = 0
+
+    def get(self, *args: Any, **kwargs: Any) -> Result:
+        """Take the next Result off the queue and count its size."""
+        result = self.queue.get(*args, **kwargs)
+        self.received += len(pickle.dumps(result))
+        return result
+
+
+def bench_run(
+    paths: list[Path],
+    cpus: int,
+    mode: str,
+    work: Path,
+    repeat: int,
+    selectivities: tuple[float, ...] = SELECTIVITIES,
+) -> dict[str, Any]:
+    """Measure one worker pool: setup, then every query selectivity.
+
+    Args:
+        paths (list[Path]): Corpus files.
+        cpus (int): Number of worker processes.
+        mode (str): "lists" (workers load private line lists), "corpus"
+            (shared memory-mapped corpus) or "index" (corpus plus trigram
+            index).
+        work (Path): Directory for the corpus and index files.
+        repeat (int): Timed runs of each query.
+        selectivities (tuple[float, ...], optional): Query selectivities
+            to measure. Defaults to SELECTIVITIES.
+
+    Returns:
+        dict[str, Any]: mode, cpus, setup_s, worker_peak_rss (one entry
+            per worker), and one "queries" entry per selectivity.
+
+    Note:
+        The corpus and index are rebuilt for every run (reuse=False), so
+        setup_s includes packing them.
+    """
+    corpus = None if mode == "lists" else work / f"corpus-{cpus}.bin"
+    ds = DirectorySearch()
+
+    # The coordinator and (when forked) the workers print progress; keep
+    # it out of the JSON on stdout
+    with open(os.devnull, "w") as devnull, redirect_stdout(devnull):
+        start = time.perf_counter()
+        ds.setup_search(paths, cpus, corpus=corpus, index=mode == "index", reuse=False)
+        # The workers load their files after setup_search() returns; the
+        # first answer arrives once all of them are ready
+        list(ds.search(marker(0.0)))
+        setup = time.perf_counter() - start
+
+        try:
+            queries = []
+            for selectivity in selectivities:
+                target = marker(selectivity)
+                samples, matches = [], 0
+                for _ in range(repeat):
+                    start = time.perf_counter()
+                    matches = sum(1 for _ in ds.search(target))
+                    samples.append(time.perf_counter() - start)
+
+                # Untimed pass, to count the bytes crossing the queues
+                counting = CountingQueue(ds.results_queue)
+                ds.results_queue = counting
+                try:
+                    list(ds.search(target))
+                finally:
+                    ds.results_queue = counting.queue
+                request = Request(0, Query(target))
+
+                queries.append(
+                    {
+                        "selectivity": selectivity,
+                        "target": target,
+                        "matches": matches,
+                        **percentiles(samples),
+                        "query_bytes": cpus * len(pickle.dumps(request)),
+                        "result_bytes": counting.received,
+                    }
+                )
+            rss = [peak_rss(proc.pid) for proc in ds.search_workers]
+        finally:
+            ds.teardown_search()
+
+    return {
+        "mode": mode,
+        "cpus": cpus,
+        "setup_s": round(setup, 6),
+        "worker_peak_rss": rss,
+        "queries": queries,
+    }
+
+
+def run_benchmark(
+    shape: Shape,
+    cpus: list[int],
+    modes: tuple[str, ...] = ("lists",),
+    repeat: int = 20,
+    selectivities: tuple[float, ...] = SELECTIVITIES,
+    work: Optional[Path] = None,
+) -> dict[str, Any]:
+    """Generate a corpus and benchmark it across worker counts and modes.
+
+    Args:
+        shape (Shape): Size and shape of the synthetic corpus.
+        cpus (list[int]): Worker counts to measure.
+        modes (tuple[str, ...], optional): Worker modes to measure (see
+            bench_run()). Defaults to ("lists",).
+        repeat (int, optional): Timed runs of each query. Defaults to 20.
+        selectivities (tuple[float, ...], optional): Query selectivities.
+            Defaults to SELECTIVITIES.
+        work (Optional[Path], optional): Directory for the corpus; a
+            temporary directory (removed afterwards) if None.
+
+    Returns:
+        dict[str, Any]: The report::
+
+            {
+              "version": 1,
+              "python": "3.13.0", "platform": "Linux-...", "cpu_count": 8,
+              "shape": {"files": 200, "lines": 500, ...},
+              "corpus_bytes": 6123456,
+              "runs": [
+                {"mode": "lists", "cpus": 2, "setup_s": 0.21,
+                 "worker_peak_rss": [31457280, 30932992],
+                 "queries": [{"selectivity": 0.01, "target": "m100x",
+                              "matches": 1000, "p50_ms": 4.1, "p95_ms": 6.0,
+                              "p99_ms": 7.2, "query_bytes": 142,
+                              "result_bytes": 70211}, ...]},
+                ...
+              ]
+            }
+
+    Raises:
+        ValueError: If a mode is not one of MODES.
+    """
+    for mode in modes:
+        if mode not in MODES:
+            raise ValueError(f"unknown mode {mode!r}, expected one of {MODES}")
+
+    with tempfile.TemporaryDirectory() as scratch:
+        work = Path(scratch) if work is None else work
+        paths = make_corpus(work / "src", shape)
+        runs = [
+            bench_run(paths, n, mode, work, repeat, selectivities)
+            for mode in modes
+            for n in cpus
+        ]
+        corpus_bytes = sum(path.stat().st_size for path in paths)
+
+    return {
+        "version": REPORT_VERSION,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "shape": shape._asdict(),
+        "corpus_bytes": corpus_bytes,
+        "runs": runs,
+    }
+
+
+def get_options(argv: list[str] = sys.argv[1:]) -> argparse.Namespace:
+    """Parse command-line arguments for the benchmark.
+
+    Args:
+        argv (list[str], optional): Command-line arguments to parse.
+            Defaults to sys.argv[1:].
+
+    Returns:
+        argparse.Namespace: The corpus shape (files, lines, line_length,
+            skew, seed), the matrix (cpus, modes, repeat) and output.
+    """
+    defaults = Shape()
+    parser = argparse.ArgumentParser(
+        description="Benchmark DirectorySearch setup, query latency and memory"
+    )
+    parser.add_argument("--files", type=int, default=defaults.files)
+    parser.add_argument(
+        "--lines", type=int, default=defaults.lines, help="average lines per file"
+    )
+    parser.add_argument("--line-length", type=int, default=defaults.line_length)
+    parser.add_argument("--skew", choices=["uniform", "zipf"], default=defaults.skew)
+    parser.add_argument("--seed", type=int, default=defaults.seed)
+    parser.add_argument("--cpus", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--modes", choices=MODES, nargs="+", default=["lists"])
+    parser.add_argument(
+        "--repeat", type=int, default=20, help="timed runs of each query"
+    )
+    parser.add_argument(
+        "-o", "--output", type=Path, help="write the JSON report here (default stdout)"
+    )
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    options = get_options()
+    report = run_benchmark(
+        Shape(
+            options.files,
+            options.lines,
+            options.line_length,
+            options.skew,
+            options.seed,
+        ),
+        options.cpus,
+        tuple(options.modes),
+        options.repeat,
+    )
+    text = json.dumps(report, indent=2)
+    if options.output:
+        options.output.write_text(text + "\n")
+    else:
+        print(text)
@@ -0,0 +1,211 @@
+"""Benchmark of the log_catcher Framing Layers.
+
+This module measures how many frames a second each of log_catcher's two
+connection handlers can take off a socket: the log_catcher() coroutine,
+which reads every header and payload through a StreamReader, and
+LogCatcherProtocol, which parses the frames in place in its own buffer.
+
+Only the framing is measured. While a run lasts, log_catcher.log_writer
+is replaced by a coroutine that counts the payloads, so neither
+unpickling nor the log file adds to the time. A client thread sends a
+prebuilt stream of frames over a loopback TCP connection in chunks of a
+given size, so that frames arrive split and coalesced the way they do
+under load.
+
+Measurements:
+    - frames_per_s: frames counted, divided by the time from the first
+      byte sent to the last frame counted; the median of the repeated
+      runs, with the best and worst
+    - speedup: the protocol's median over the StreamReader's
+
+Output:
+    One JSON document (see run_benchmark()).
+
+Example Usage:
+    # 200,000 frames of about 300 bytes, JSON on stdout
+    python bench_log_catcher.py
+
+    # Small frames, sent in small chunks
+    python bench_log_catcher.py --frames 500000 --size 64 --chunk 1024
+
+    # Use as a module
+    from bench_log_catcher import run_benchmark
+    report = run_benchmark(frames=10_000, repeat=1)
+"""
+
+from __future__ import annotations
+import argparse
+import asyncio
+from contextlib import redirect_stdout
+import io
+import json
+import pickle
+import platform
+import socket
+import statistics
+import struct
+import sys
+import threading
+import time
+from typing import Any
+
+import log_catcher
+
+# Handlers measured, by name
+HANDLERS = ("streams", "protocol")
+
+
+def make_stream(frames: int, size: int) -> bytes:
+    """Build the bytes of frames pickled LogRecord-like dicts.
+
+    Args:
+        frames (int): Number of frames.
+        size (int): Approximate payload size in bytes.
+
+    Returns:
+        bytes: The frames, each a SIZE_FORMAT header and its payload.
+    """
+    record = {
+        "name": "bench",
+        "levelname": "INFO",
+        "lineno": 42,
+        "created": 1700000000.0,
+        "msg": "",
+    }
+    padding = max(size - len(pickle.dumps(record)), 0)
+    payload = pickle.dumps(record | {"msg": "x" * padding})
+    frame = struct.pack(log_catcher.SIZE_FORMAT, len(payload)) + payload
+    return frame * frames
+
+
+def send(port: int, data: bytes, chunk: int) -> None:
+    """Send data to a local port, chunk bytes at a time, then close."""
+    with socket.create_connection(("127.0.0.1", port)) as client:
+        with memoryview(data) as view:
+            for start in range(0, len(data), chunk):
+                client.sendall(view[start : start + chunk])
+
+
+async def bench_run(handler: str, data: bytes, frames: int, chunk: int) -> float:
+    """Time one connection sending data to a fresh server.
+
+    Args:
+        handler (str): "streams" or "protocol".
+        data (bytes): The stream of frames, from make_stream().
+        frames (int): Number of frames in data.
+        chunk (int): Bytes per send.
+
+    Returns:
+        float: Frames per second.
+    """
+    counted = 0
+    done = asyncio.Event()
+
+    async def count(bytes_payload: bytes) -> None:
+        nonlocal counted
+        counted += 1
+        if counted == frames:
+            done.set()
+
+    loop = asyncio.get_running_loop()
+    if handler == "streams":
+        server = await asyncio.start_server(log_catcher.log_catcher, "127.0.0.1", 0)
+    else:
+        server = await loop.create_server(
+            log_catcher.LogCatcherProtocol, "127.0.0.1", 0
+        )
+    port = server.sockets[0].getsockname()[1]
+    writer, log_catcher.log_writer = log_catcher.log_writer, count
+    try:
+        async with server:
+            start = time.perf_counter()
+            sender = threading.Thread(target=send, args=(port, data, chunk))
+            sender.start()
+            await done.wait()
+            elapsed = time.perf_counter() - start
+            await asyncio.to_thread(sender.join)
+    finally:
+        log_catcher.log_writer = writer
+    return frames / elapsed
+
+
+def run_benchmark(
+    frames: int = 200_000, size: int = 300, chunk: int = 65536, repeat: int = 5
+) -> dict[str, Any]:
+    """Benchmark both handlers on the same stream of frames.
+
+    Args:
+        frames (int, optional): Frames per run. Defaults to 200,000.
+        size (int, optional): Approximate payload size. Defaults to 300.
+        chunk (int, optional): Bytes per send. Defaults to 65536.
+        repeat (int, optional): Runs of each handler. Defaults to 5.
+
+    Returns:
+        dict[str, Any]: The report::
+
+            {
+              "python": "3.11.7", "platform": "Linux-...",
+              "frames": 200000, "frame_bytes": 306, "chunk": 65536,
+              "handlers": {
+                "streams": {"frames_per_s": 151234.0, "min": ..., "max": ...},
+                "protocol": {"frames_per_s": 655321.0, "min": ..., "max": ...}
+              },
+              "speedup": 4.33
+            }
+    """
+    data = make_stream(frames, size)
+    results: dict[str, dict[str, float]] = {}
+    # The handlers print a summary line per connection
+    with redirect_stdout(io.StringIO()):
+        for handler in HANDLERS:
+            rates = [
+                asyncio.run(bench_run(handler, data, frames, chunk))
+                for _ in range(repeat)
+            ]
+            results[handler] = {
+                "frames_per_s": round(statistics.median(rates)),
+                "min": round(min(rates)),
+                "max": round(max(rates)),
+            }
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "frames": frames,
+        "frame_bytes": len(data) // frames if frames else 0,
+        "chunk": chunk,
+        "handlers": results,
+        "speedup": round(
+            results["protocol"]["frames_per_s"] / results["streams"]["frames_per_s"],
+            2,
+        ),
+    }
+
+
+def get_options(argv: list[str] = sys.argv[1:]) -> argparse.Namespace:
+    """Parse command-line arguments for the benchmark.
+
+    Args:
+        argv (list[str], optional): Command-line arguments to parse.
+            Defaults to sys.argv[1:].
+
+    Returns:
+        argparse.Namespace: frames, size, chunk and repeat.
+    """
+    parser = argparse.ArgumentParser(
+        description="Benchmark log_catcher framing: StreamReader vs protocol"
+    )
+    parser.add_argument("--frames", type=int, default=200_000)
+    parser.add_argument(
+        "--size", type=int, default=300, help="approximate payload bytes"
+    )
+    parser.add_argument("--chunk", type=int, default=65536, help="bytes per send")
+    parser.add_argument("--repeat", type=int, default=5, help="runs per handler")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    options = get_options()
+    report = run_benchmark(
+        options.frames, options.size, options.chunk, options.repeat
+    )
+    print(json.dumps(report, indent=2))
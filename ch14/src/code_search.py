@@ -9,12 +9,24 @@ The tool uses ThreadPoolExecutor for concurrent file analysis, making it
 efficient for scanning large codebases. Results are highlighted when specific
 modules of interest (e.g., 'typing') are imported.
 
+Parsing is CPU-bound pure-Python work, so threads mostly take turns on the
+GIL. The processes and hybrid backends (see Backend) parse in a process
+pool instead, sending the paths in batches so that the pickling cost is
+paid per batch rather than per file. The report is identical whichever
+backend produced it.
+
 Key Features:
-    - Concurrent file analysis using thread pools
-    - AST-based import extraction
+    - Concurrent file analysis using thread pools, or process pools
+      that scale with CPU cores
+    - AST-based import extraction, or a faster token scan
     - Configurable directory scanning with pattern matching
     - Automatic skipping of common non-source directories
     - Performance metrics reporting
+    - Persistent import cache, so warm runs only parse changed files
+    - Streaming output (text or NDJSON) with bounded work in flight
+    - Optional per-phase timing report (walk, read, parse, visit) as JSON
+    - An asyncio API, scan(), that never blocks the event loop
+    - Huge files analyzed apart, within memory and time budgets
 
 Example Usage:
     # Scan current directory
@@ -23,20 +35,120 @@ Example Usage:
     # Scan specific directories
     python code_search.py /path/to/project1 /path/to/project2
 
+    # Parse in 16 processes, reading files in threads
+    python code_search.py --backend hybrid --workers 16 /path/to/project
+
+    # Only top-level imports, from the tokens
+    python code_search.py --extractor top /path/to/project
+
+    # Keep the imports in a cache; later runs only parse changed files
+    python code_search.py --cache .imports.sqlite --stats /path/to/project
+
+    # Print each file as soon as it's parsed, as JSON lines, in walk order
+    python code_search.py --stream ndjson --ordered /path/to/project
+
+    # Where does the time go? Per-phase timings and the 20 slowest files
+    python code_search.py --profile profile.json --slowest 20 /path/to/project
+
     # Use as a module
     from code_search import main
     main(Path('/path/to/project'))
+
+    # Or from asyncio code
+    async for result in scan([Path('/path/to/project')], concurrency=16):
+        print(result.path, result.imports)
 """
 
 import argparse
 import ast
+import asyncio
+from collections import deque
 from concurrent import futures
-from fnmatch import fnmatch
+from enum import Enum
+import errno
+from hashlib import blake2b
+import heapq
+from itertools import chain, islice
+import io
+import json
+import mmap
 import os
 from pathlib import Path
+import re
+import signal
+import sqlite3
+import statistics
 import sys
 import time
-from typing import Iterator, NamedTuple
+import tokenize
+from typing import (
+    Any,
+    AsyncIterator,
+    Callable,
+    Iterable,
+    Iterator,
+    NamedTuple,
+    Optional,
+    Union,
+)
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+from latency import percentiles
+from source_walker import SOURCE_SKIP, walk
+
+# Threads used for file I/O by the threads and hybrid backends
+IO_THREADS = 24
+
+# Paths per task sent to a process pool
+BATCH_SIZE = 64
+
+# Tasks in flight (or finished but held back for ordering) while streaming
+WINDOW = 4 * IO_THREADS
+
+
+class Backend(str, Enum):
+    """Executor used by main() to analyze the files.
+
+    THREADS runs find_imports() in a thread pool. PROCESSES sends batches
+    of paths to a process pool that reads and parses them. HYBRID reads
+    the files in a thread pool and sends batches of (path, text) to a
+    process pool that only parses them.
+    """
+
+    THREADS = "threads"
+    PROCESSES = "processes"
+    HYBRID = "hybrid"
+
+
+class Extractor(str, Enum):
+    """How the imports of a file are extracted.
+
+    AST parses the whole module and visits it with ImportVisitor, finding
+    every import and rejecting invalid syntax. TOP and NESTED read the
+    tokens instead and stop as soon as no further import can follow (see
+    scan_imports()). TOP finds the imports at the top level of the module;
+    NESTED also those in functions, classes and if/try blocks, the same
+    names AST finds.
+    """
+
+    AST = "ast"
+    TOP = "top"
+    NESTED = "nested"
+
+
+class Output(str, Enum):
+    """Line format of main()'s streaming mode.
+
+    TEXT prints the same lines as the sorted report. NDJSON prints one
+    JSON object per file, and the summary goes to stderr.
+    """
+
+    TEXT = "text"
+    NDJSON = "ndjson"
 
 
 class ImportResult(NamedTuple):
@@ -89,6 +201,9 @@ class ImportVisitor(ast.NodeVisitor):
 
     Attributes:
         imports (set[str]): Accumulated set of module names found in the file.
+        order (list[str]): The same names, in the order first found. A set
+            rebuilt from it by adding in this order iterates exactly like
+            imports, which keeps process pool results printing the same.
 
     Example:
         >>> tree = ast.parse('import os\nfrom pathlib import Path')
@@ -101,6 +216,13 @@ class ImportVisitor(ast.NodeVisitor):
     def __init__(self) -> None:
         """Initialize the visitor with an empty imports set."""
         self.imports: set[str] = set()
+        self.order: list[str] = []
+
+    def add(self, name: str) -> None:
+        """Record an imported module name, keeping first-seen order."""
+        if name not in self.imports:
+            self.imports.add(name)
+            self.order.append(name)
 
     def visit_Import(self, node: ast.Import) -> None:
         """Visit an import statement node (e.g., 'import os').
@@ -117,7 +239,7 @@ class ImportVisitor(ast.NodeVisitor):
             Adds: 'os', 'sys', 'pathlib' to self.imports
         """
         for alias in node.names:
-            self.imports.add(alias.name)
+            self.add(alias.name)
 
     def visit_ImportFrom(self, node: ast.ImportFrom) -> None:
         """Visit a from-import statement node (e.g., 'from os import path').
@@ -137,18 +259,367 @@ class ImportVisitor(ast.NodeVisitor):
             Skips relative imports without a module name (e.g., 'from . import x')
         """
         if node.module:
-            self.imports.add(node.module)
+            self.add(node.module)
+
+
+# Where a top-level import statement might start: at the left margin, after
+# a semicolon, or on a backslash-continued line. Text inside strings can
+# match too; a match only means the scan has to go on.
+TOP_CANDIDATE = re.compile(
+    r"(?:^\f*|;[ \t\f]*|\\\r?\n[ \t\f]*)(?:import|from)\b", re.MULTILINE
+)
+
+# Where any import statement might start, indented or after a colon
+NESTED_CANDIDATE = re.compile(r"(?:^|[;:])[ \t\f]*(?:import|from)\b", re.MULTILINE)
+
+# Statements whose header ends with a colon that may be followed by a body
+COMPOUND = frozenset(
+    {
+        "if", "elif", "else", "while", "for", "try", "except", "finally",
+        "with", "def", "class", "async", "match", "case",
+    }
+)  # fmt: skip
 
+# The candidate patterns, for searching a memory-mapped file
+TOP_BYTES = re.compile(TOP_CANDIDATE.pattern.encode(), re.MULTILINE)
+NESTED_BYTES = re.compile(NESTED_CANDIDATE.pattern.encode(), re.MULTILINE)
+
+# Tokens scan_imports() never needs to look at
+IGNORED_TOKENS = frozenset({tokenize.COMMENT, tokenize.NL})
+
+# And stream_imports(), which reads bytes and is told their encoding
+STREAM_IGNORED = IGNORED_TOKENS | {tokenize.ENCODING}
+
+
+class Unrecognized(Exception):
+    """The token scan met something only the full AST can settle."""
+
+
+def ast_imports(text: str, nested: bool = True) -> list[str]:
+    """Collect the imported module names with ast.parse and ImportVisitor.
+
+    Args:
+        text (str): Python source code.
+        nested (bool, optional): Include imports inside functions, classes
+            and compound statements. Defaults to True.
+
+    Returns:
+        list[str]: Module names in first-seen order (ImportVisitor.order).
+
+    Raises:
+        SyntaxError: If the source contains invalid syntax.
+    """
+    tree = ast.parse(text)
+    iv = ImportVisitor()
+    if nested:
+        iv.visit(tree)
+    else:
+        for node in tree.body:
+            if isinstance(node, (ast.Import, ast.ImportFrom)):
+                iv.visit(node)
+    return iv.order
+
+
+def import_statement(
+    keyword: str, tokens: Iterator[tokenize.TokenInfo]
+) -> tuple[list[str], tokenize.TokenInfo]:
+    """Read the rest of an import statement from the token stream.
+
+    Args:
+        keyword (str): 'import' or 'from', already read.
+        tokens (Iterator[tokenize.TokenInfo]): The tokens that follow.
+
+    Returns:
+        tuple[list[str], tokenize.TokenInfo]: The module names the
+            statement adds to ImportVisitor, and the token that ended it
+            (NEWLINE, ';' or ENDMARKER).
+
+    Raises:
+        Unrecognized: If the tokens are not a well-formed import.
+    """
+    names: list[str] = []
+    token = next(tokens)
+
+    def dotted() -> str:
+        """Read a dotted module name, leaving token just after it."""
+        nonlocal token
+        parts = []
+        while token.type == tokenize.NAME:
+            parts.append(token.string)
+            token = next(tokens)
+            if token.string != ".":
+                break
+            token = next(tokens)
+        if not parts or parts[-1] in ("import", "as"):
+            raise Unrecognized(token)
+        return ".".join(parts)
+
+    if keyword == "from":
+        # Relative imports: "..." is a single token
+        while token.string in (".", "..."):
+            token = next(tokens)
+        if token.string != "import":
+            names.append(dotted())
+            if token.string != "import":
+                raise Unrecognized(token)
+        # The imported names are not recorded, skip to the end
+        while token.type not in (tokenize.NEWLINE, tokenize.ENDMARKER):
+            if token.string == ";":
+                break
+            token = next(tokens)
+        return names, token
+
+    while True:
+        names.append(dotted())
+        if token.string == "as":
+            token = next(tokens)
+            if token.type != tokenize.NAME:
+                raise Unrecognized(token)
+            token = next(tokens)
+        if token.string != ",":
+            break
+        token = next(tokens)
+    if token.type not in (tokenize.NEWLINE, tokenize.ENDMARKER) and token.string != ";":
+        raise Unrecognized(token)
+    return names, token
+
+
+def _scan_tokens(
+    tokens: Iterator[tokenize.TokenInfo],
+    nested: bool,
+    more: Callable[[int], bool],
+) -> list[str]:
+    """Collect the imported module names from a stream of tokens.
+
+    The state machine shared by scan_imports() and stream_imports().
 
-def find_imports(path: Path) -> ImportResult:
+    Args:
+        tokens (Iterator[tokenize.TokenInfo]): The tokens of a module,
+            without IGNORED_TOKENS.
+        nested (bool): Include imports that aren't at the top level.
+        more (Callable[[int], bool]): Called with the row of each
+            statement; returns False when no import can start there or
+            after, which ends the scan.
+
+    Returns:
+        list[str]: Module names in first-seen order.
+
+    Raises:
+        Unrecognized: For an import the token scan can't read.
+        tokenize.TokenError, SyntaxError, StopIteration: If the tokens
+            can't be read.
+    """
+    found: dict[str, None] = {}
+    depth = 0  # Open brackets
+    indent = 0
+    at_start = True  # The next token begins a statement
+    header = ""  # Keyword of the compound statement on this logical line
+    inline = False  # The statement follows the header's colon
+
+    for token in tokens:
+        kind, string = token.type, token.string
+        if kind == tokenize.INDENT:
+            indent += 1
+        elif kind == tokenize.DEDENT:
+            indent -= 1
+        elif kind == tokenize.NEWLINE:
+            at_start, header, inline = True, "", False
+        elif at_start:
+            at_start = False
+            if not more(token.start[0]):
+                break
+            if not inline and string in COMPOUND:
+                header = string
+            if kind == tokenize.NAME and string in ("import", "from"):
+                if inline and header in ("match", "case"):
+                    # Soft keywords: was that colon an annotation?
+                    raise Unrecognized(token)
+                names, end = import_statement(string, tokens)
+                if nested or (indent == 0 and not inline):
+                    found.update(dict.fromkeys(names))
+                if end.type == tokenize.NEWLINE:
+                    header, inline = "", False
+                at_start = end.type != tokenize.ENDMARKER
+                continue
+        if kind == tokenize.OP:
+            if string in "([{":
+                depth += 1
+            elif string in ")]}":
+                depth -= 1
+            elif depth == 0 and string == ";":
+                at_start = True
+            elif depth == 0 and string == ":" and header:
+                at_start, inline = True, True
+    return list(found)
+
+
+def scan_imports(text: str, nested: bool = False) -> list[str]:
+    """Collect the imported module names from the tokens of a source.
+
+    ast.parse builds a tree of the whole module just so that ImportVisitor
+    can pick out a few Import and ImportFrom nodes; on a large generated
+    file that costs as much as compiling it. This reads the tokens instead,
+    tracking only brackets, indentation and where statements start, and
+    stops as soon as a regular expression search of the remaining text
+    finds no place where an import statement could still start. For a
+    module whose imports are at the top, that is right after the last one.
+
+    Sources the tokenizer rejects, or import statements it cannot read,
+    are handed to ast_imports(), so the result is always what the AST gives.
+    The token scan does not check the syntax of the rest of the file.
+
+    Args:
+        text (str): Python source code.
+        nested (bool, optional): Include imports inside functions, classes
+            and compound statements (conditional imports), as
+            ImportVisitor does. Defaults to False (top-level only).
+
+    Returns:
+        list[str]: Module names in first-seen order, as ast_imports().
+
+    Raises:
+        SyntaxError: If the tokens can't be read and the AST fallback
+            finds invalid syntax.
+
+    Example:
+        >>> scan_imports('import os\\ndef f():\\n    import json\\n')
+        ['os']
+        >>> scan_imports('import os\\ndef f():\\n    import json\\n', nested=True)
+        ['os', 'json']
+    """
+    candidate = NESTED_CANDIDATE if nested else TOP_CANDIDATE
+    source = io.StringIO(text)
+    # Offset of the start of each line read so far, by row - 1
+    starts = [0]
+    next_row = 0  # The earliest row where an import might still start
+
+    def readline() -> str:
+        line = source.readline()
+        starts.append(starts[-1] + len(line))
+        return line
+
+    def more(row: int) -> bool:
+        nonlocal next_row
+        if row > next_row:
+            # Past the last candidate: is there another one? Back up over
+            # the line break, which may follow a backslash
+            offset = starts[row - 1]
+            match = candidate.search(text, max(offset - 3, 0))
+            if match is None:
+                return False
+            next_row = row + text.count("\n", offset, match.end())
+        return True
+
+    tokens = (
+        token
+        for token in tokenize.generate_tokens(readline)
+        if token.type not in IGNORED_TOKENS
+    )
+    try:
+        return _scan_tokens(tokens, nested, more)
+    except (tokenize.TokenError, SyntaxError, Unrecognized, StopIteration):
+        return ast_imports(text, nested)
+
+
+def stream_imports(path: Path, nested: bool = False) -> list[str]:
+    """Collect the imported module names of a file without reading it all.
+
+    scan_imports() for files too large to hold in memory. The file is
+    memory-mapped rather than read: the candidate search runs over the
+    mapping, and the tokenizer reads it line by line, so only the pages
+    the scan touches are loaded, and the kernel can drop them again. The
+    lines read are only kept until the next statement starts.
+
+    Only if the token scan fails is the file read in full for
+    ast_imports(), as scan_imports() does.
+
+    Args:
+        path (Path): Python source file.
+        nested (bool, optional): As for scan_imports(). Defaults to False.
+
+    Returns:
+        list[str]: Module names in first-seen order, as ast_imports().
+
+    The mapping takes address space for the whole file, though, so under
+    an RLIMIT_AS budget (see limit_memory()) smaller than the file mmap
+    fails with ENOMEM.
+
+    Raises:
+        SyntaxError: If the tokens can't be read and the AST fallback
+            finds invalid syntax.
+        OSError: With errno ENOMEM if the file can't be mapped.
+    """
+    candidate = NESTED_BYTES if nested else TOP_BYTES
+    with open(path, "rb") as file:
+        if os.fstat(file.fileno()).st_size == 0:
+            return []
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            lines: deque[tuple[int, int]] = deque()  # (row, offset) of lines
+            rows = 0
+            next_end = -1  # Offset where the last candidate ends
+
+            def readline() -> bytes:
+                nonlocal rows
+                rows += 1
+                lines.append((rows, data.tell()))
+                return data.readline()
+
+            def more(row: int) -> bool:
+                nonlocal next_end
+                while lines[0][0] < row:
+                    lines.popleft()
+                offset = lines[0][1]
+                if offset > next_end:
+                    match = candidate.search(data, max(offset - 3, 0))
+                    if match is None:
+                        return False
+                    next_end = match.end()
+                return True
+
+            try:
+                # tokenize() reads the encoding cookie at once
+                tokens = (
+                    token
+                    for token in tokenize.tokenize(readline)
+                    if token.type not in STREAM_IGNORED
+                )
+                return _scan_tokens(tokens, nested, more)
+            except (tokenize.TokenError, SyntaxError, Unrecognized, StopIteration):
+                pass
+    return ast_imports(path.read_text(), nested)
+
+
+def import_names(text: str, extractor: Extractor = Extractor.AST) -> list[str]:
+    """Collect the imported module names of a source with an Extractor.
+
+    Args:
+        text (str): Python source code.
+        extractor (Extractor, optional): Defaults to Extractor.AST.
+
+    Returns:
+        list[str]: Module names in first-seen order.
+
+    Raises:
+        SyntaxError: If the source contains invalid syntax (always checked
+            by Extractor.AST, only when the token scan fails otherwise).
+    """
+    extractor = Extractor(extractor)
+    if extractor is Extractor.AST:
+        return ast_imports(text)
+    return scan_imports(text, nested=extractor is Extractor.NESTED)
+
+
+def find_imports(path: Path, extractor: Extractor = Extractor.AST) -> ImportResult:
     """Analyze a Python file and extract all import statements.
 
     This function reads a Python source file, parses it into an Abstract
     Syntax Tree (AST), and uses the ImportVisitor to extract all imported
-    module names.
+    module names. With Extractor.TOP or Extractor.NESTED it reads the
+    tokens instead (see scan_imports()), which is much faster.
 
     Args:
         path (Path): Path to the Python source file to analyze.
+        extractor (Extractor, optional): Defaults to Extractor.AST.
 
     Returns:
         ImportResult: A named tuple containing the file path and set of
@@ -166,18 +637,794 @@ def find_imports(path: Path) -> ImportResult:
         File: my_module.py
         Imports: {'os', 'sys', 'pathlib'}
     """
-    # Parse the Python file into an Abstract Syntax Tree
-    tree = ast.parse(path.read_text())
-
-    # Create visitor and traverse the AST to collect imports
-    iv = ImportVisitor()
-    iv.visit(tree)
+    # Parse the Python file and collect its imports
+    names = import_names(path.read_text(), extractor)
 
     # Return results as a named tuple
-    return ImportResult(path, iv.imports)
+    return ImportResult(path, set(names))
+
+
+def imports_from_sources(
+    paths: list[Path], texts: list[str], extractor: Extractor = Extractor.AST
+) -> list[tuple[Path, list[str]]]:
+    """Parse a batch of already-read sources, for a process pool worker.
+
+    Args:
+        paths (list[Path]): Paths of the sources, for the results.
+        texts (list[str]): Source text of each path.
+        extractor (Extractor, optional): Defaults to Extractor.AST.
+
+    Returns:
+        list[tuple[Path, list[str]]]: Each path with its imported module
+            names in first-seen order (ImportVisitor.order). The caller
+            rebuilds the sets, see analyze_batches().
+
+    Raises:
+        SyntaxError: If a source contains invalid syntax.
+    """
+    return [(path, import_names(text, extractor)) for path, text in zip(paths, texts)]
+
+
+def find_imports_batch(
+    paths: list[Path], extractor: Extractor = Extractor.AST
+) -> list[tuple[Path, list[str]]]:
+    """Read and parse a batch of files, for a process pool worker.
+
+    Args:
+        paths (list[Path]): Python source files.
+        extractor (Extractor, optional): Defaults to Extractor.AST.
+
+    Returns:
+        list[tuple[Path, list[str]]]: As imports_from_sources().
+
+    Raises:
+        SyntaxError: If a file contains invalid syntax.
+        FileNotFoundError: If a file doesn't exist.
+    """
+    return imports_from_sources(
+        paths, [path.read_text() for path in paths], extractor
+    )
+
+
+def import_batches(
+    paths: list[Path],
+    backend: Backend = Backend.PROCESSES,
+    workers: Optional[int] = None,
+    batch: int = BATCH_SIZE,
+    extractor: Extractor = Extractor.AST,
+) -> Iterator[tuple[Path, list[str]]]:
+    """Find the imports of files in an executor, batch by batch.
+
+    Each task covers up to batch paths, so pickling a task and its
+    results costs one round trip per batch. With Backend.HYBRID every
+    file is read by a pool of IO_THREADS threads, and the processes
+    receive the text; with Backend.PROCESSES the processes read too.
+    Backend.THREADS runs the same batches in IO_THREADS threads.
+
+    Args:
+        paths (list[Path]): Python source files.
+        backend (Backend, optional): Defaults to Backend.PROCESSES.
+        workers (Optional[int], optional): Worker processes. Defaults to
+            None (one per CPU).
+        batch (int, optional): Paths per task. Defaults to BATCH_SIZE.
+        extractor (Extractor, optional): Defaults to Extractor.AST.
+
+    Yields:
+        tuple[Path, list[str]]: One per path, in completion order, with
+            the imported module names in first-seen order.
+
+    Raises:
+        SyntaxError: If a file contains invalid syntax.
+    """
+    batches = [paths[i : i + batch] for i in range(0, len(paths), batch)]
+    backend = Backend(backend)
+    if backend is Backend.THREADS:
+        pool = futures.ThreadPoolExecutor(IO_THREADS)
+    else:
+        pool = futures.ProcessPoolExecutor(workers)
+    with pool:
+        if backend is Backend.HYBRID:
+            with futures.ThreadPoolExecutor(IO_THREADS) as io:
+                # All reads are queued at once; each batch is sent to the
+                # processes as soon as its own files have been read
+                texts = io.map(Path.read_text, paths)
+                parsers = [
+                    pool.submit(
+                        imports_from_sources, b, [next(texts) for _ in b], extractor
+                    )
+                    for b in batches
+                ]
+        else:
+            parsers = [pool.submit(find_imports_batch, b, extractor) for b in batches]
+
+        for parser in futures.as_completed(parsers):
+            yield from parser.result()
+
+
+def analyze_batches(
+    paths: list[Path],
+    backend: Backend = Backend.PROCESSES,
+    workers: Optional[int] = None,
+    batch: int = BATCH_SIZE,
+    extractor: Extractor = Extractor.AST,
+) -> Iterator[ImportResult]:
+    """Analyze files in a process pool, batch by batch.
+
+    See import_batches(), which does the work.
+
+    Args:
+        paths (list[Path]): Python source files.
+        backend (Backend, optional): Backend.PROCESSES or Backend.HYBRID.
+            Defaults to Backend.PROCESSES.
+        workers (Optional[int], optional): Worker processes. Defaults to
+            None (one per CPU).
+        batch (int, optional): Paths per task. Defaults to BATCH_SIZE.
+        extractor (Extractor, optional): Defaults to Extractor.AST.
+
+    Yields:
+        ImportResult: One per path, in completion order. Each imports set
+            is rebuilt in the order the names were found, so it prints the
+            same as the set find_imports() returns.
+
+    Raises:
+        SyntaxError: If a file contains invalid syntax.
+
+    Example:
+        >>> paths = list(all_source(Path('/project'), '*.py'))
+        >>> results = sorted(analyze_batches(paths, Backend.HYBRID, workers=8))
+    """
+    for path, names in import_batches(paths, backend, workers, batch, extractor):
+        yield ImportResult(path, set(names))
+
+
+def stream_results(
+    paths: Iterable[Path],
+    backend: Backend = Backend.THREADS,
+    workers: Optional[int] = None,
+    batch: int = BATCH_SIZE,
+    extractor: Extractor = Extractor.AST,
+    window: int = WINDOW,
+    ordered: bool = False,
+) -> Iterator[ImportResult]:
+    """Analyze files as they are found, yielding results as they complete.
+
+    Unlike main()'s report, nothing waits for the whole tree: paths are
+    taken from the iterable only while fewer than window tasks are in
+    flight, so memory stays bounded however large the tree is, and the
+    first result arrives as soon as its file is parsed.
+
+    With the thread backend each task is one file. With the process
+    backends each task is a batch of files that the worker reads and
+    parses, as find_imports_batch() does (HYBRID streams like PROCESSES).
+
+    Args:
+        paths (Iterable[Path]): Python source files, consumed lazily,
+            e.g. all_source()'s generator.
+        backend (Backend, optional): Defaults to Backend.THREADS.
+        workers (Optional[int], optional): Worker processes for the
+            process backends. Defaults to None (one per CPU).
+        batch (int, optional): Paths per process pool task. Defaults to
+            BATCH_SIZE.
+        extractor (Extractor, optional): Defaults to Extractor.AST.
+        window (int, optional): Most tasks in flight at once. Defaults to
+            WINDOW.
+        ordered (bool, optional): Yield in the order of paths rather than
+            of completion. Early results wait in a heap keyed by task
+            number, and count against window, so one slow file stalls
+            submission rather than letting the heap grow. Defaults to
+            False.
+
+    Yields:
+        ImportResult: One per path, each imports set rebuilt in first-seen
+            order, so it prints the same as find_imports()'s.
+
+    Raises:
+        SyntaxError: If a file contains invalid syntax.
+        ValueError: If window is less than 1, when nothing could be sent.
+
+    Example:
+        >>> for result in stream_results(all_source(Path('.'), '*.py')):
+        ...     print(result.path, result.imports)
+    """
+    if window < 1:
+        raise ValueError(f"window must be at least 1, not {window}")
+    backend = Backend(backend)
+    if backend is Backend.THREADS:
+        pool, size = futures.ThreadPoolExecutor(IO_THREADS), 1
+    else:
+        pool, size = futures.ProcessPoolExecutor(workers), batch
+    paths = iter(paths)
+    tasks = iter(lambda: list(islice(paths, size)), [])
+
+    pending: dict[futures.Future, int] = {}
+    held: list[tuple[int, list[ImportResult]]] = []  # Heap, by task number
+    next_task = 0
+
+    def finished() -> Iterator[ImportResult]:
+        """Wait for a task to complete and yield whatever may go out."""
+        nonlocal next_task
+        done, _ = futures.wait(pending, return_when=futures.FIRST_COMPLETED)
+        for future in done:
+            number = pending.pop(future)
+            results = [
+                ImportResult(path, set(names)) for path, names in future.result()
+            ]
+            if not ordered:
+                yield from results
+                continue
+            heapq.heappush(held, (number, results))
+            while held and held[0][0] == next_task:
+                yield from heapq.heappop(held)[1]
+                next_task += 1
+
+    with pool:
+        for number, task in enumerate(tasks):
+            while len(pending) + len(held) >= window:
+                yield from finished()
+            pending[pool.submit(find_imports_batch, task, extractor)] = number
+        while pending:
+            yield from finished()
+
+
+# Files listed in a Profile report, slowest first
+SLOWEST = 10
+
+# Phases timed per file by a Profile
+PHASES = ("read", "parse", "visit")
+
+
+class FileTiming(NamedTuple):
+    """Time spent on one file in each phase, in seconds.
+
+    The token extractors (Extractor.TOP and NESTED) scan in a single pass,
+    which is counted as parse; their visit is 0.
+
+    Attributes:
+        path (str): The file.
+        size (int): Its size in bytes.
+        read (float): Reading and decoding the file.
+        parse (float): ast.parse, or the token scan.
+        visit (float): ImportVisitor's walk over the tree.
+    """
+
+    path: str
+    size: int
+    read: float
+    parse: float
+    visit: float
+
+
+def timed_batch(
+    paths: list[Path], extractor: Extractor = Extractor.AST
+) -> list[tuple[Path, list[str], FileTiming]]:
+    """Read and parse a batch of files, timing each phase, for a Profile.
+
+    Args:
+        paths (list[Path]): Python source files.
+        extractor (Extractor, optional): Defaults to Extractor.AST.
+
+    Returns:
+        list[tuple[Path, list[str], FileTiming]]: Each path with its
+            module names in first-seen order and its timings.
+
+    Raises:
+        SyntaxError: If a file contains invalid syntax.
+    """
+    extractor = Extractor(extractor)
+    clock = time.perf_counter
+    results = []
+    for path in paths:
+        start = clock()
+        text = path.read_text()
+        read = clock()
+        if extractor is Extractor.AST:
+            tree = ast.parse(text)
+            parsed = clock()
+            iv = ImportVisitor()
+            iv.visit(tree)
+            names = iv.order
+        else:
+            names = scan_imports(text, nested=extractor is Extractor.NESTED)
+            parsed = clock()
+        end = clock()
+        size = path.stat().st_size
+        timing = FileTiming(str(path), size, read - start, parsed - read, end - parsed)
+        results.append((path, names, timing))
+    return results
+
+
+def summarize(samples: list[float]) -> dict[str, float]:
+    """Summarize durations as a total, mean and percentiles, in milliseconds.
+
+    Args:
+        samples (list[float]): Durations in seconds; at least one.
+
+    Returns:
+        dict[str, float]: Keys "total_ms", "mean_ms", "p50_ms", "p90_ms",
+            "p99_ms" and "max_ms".
+
+    Example:
+        >>> summarize([0.010, 0.020, 0.030])["p50_ms"]
+        20.0
+    """
+    return {
+        "total_ms": round(1000 * sum(samples), 3),
+        "mean_ms": round(1000 * statistics.fmean(samples), 3),
+        **percentiles(samples, (50, 90, 99)),
+        "max_ms": round(1000 * max(samples), 3),
+    }
+
+
+class Profile:
+    """Per-phase timings of a run, reported as JSON.
+
+    main()'s ms/file rate mixes walking the tree, reading the files,
+    parsing them and visiting the trees, so a slow run doesn't tell
+    whether the disk or the CPU is to blame. A Profile measures each
+    phase: the walk as a whole, the others per file, in whichever thread
+    or process handles the file.
+
+    Profiling runs through its own functions (walk() and analyze(), with
+    timed_batch() in the workers); without a Profile, main() takes its
+    usual path and pays nothing for it.
+
+    Timings are wall-clock. In the thread backend they include the time a
+    thread waits for the GIL, so the read phase of a CPU-bound run looks
+    slow; the process backends give each phase its own CPU.
+
+    Attributes:
+        slowest (int): Number of slowest files to report.
+        walk_s (float): Time spent finding the files.
+        wall_s (float): Time from the first path to the last result,
+            added up over the calls to analyze().
+        timings (list[FileTiming]): One per file analyzed.
+
+    Example:
+        >>> profile = Profile()
+        >>> results = list(profile.analyze(profile.walk(all_source(base, '*.py'))))
+        >>> print(json.dumps(profile.report(), indent=2))
+    """
+
+    def __init__(self, slowest: int = SLOWEST) -> None:
+        """Start an empty profile.
+
+        Args:
+            slowest (int, optional): Number of slowest files to report.
+                Defaults to SLOWEST.
+        """
+        self.slowest = slowest
+        self.walk_s = 0.0
+        self.wall_s = 0.0
+        self.timings: list[FileTiming] = []
+
+    def walk(self, paths: Iterable[Path]) -> Iterator[Path]:
+        """Pass paths through, adding the time taken to produce them to walk_s."""
+        paths = iter(paths)
+        clock = time.perf_counter
+        while True:
+            start = clock()
+            path = next(paths, None)
+            self.walk_s += clock() - start
+            if path is None:
+                return
+            yield path
+
+    def analyze(
+        self,
+        paths: Iterable[Path],
+        backend: Backend = Backend.THREADS,
+        workers: Optional[int] = None,
+        batch: int = BATCH_SIZE,
+        extractor: Extractor = Extractor.AST,
+    ) -> Iterator[ImportResult]:
+        """Analyze files with timed_batch(), recording the timings.
+
+        With the thread backend each task is one file; with the process
+        backends, a batch read and parsed by the worker (HYBRID runs like
+        PROCESSES here, as its reads would otherwise be timed apart).
+
+        Args:
+            paths (Iterable[Path]): Python source files, e.g. from walk().
+            backend (Backend, optional): Defaults to Backend.THREADS.
+            workers (Optional[int], optional): Worker processes. Defaults
+                to None (one per CPU).
+            batch (int, optional): Paths per process task. Defaults to
+                BATCH_SIZE.
+            extractor (Extractor, optional): Defaults to Extractor.AST.
+
+        Yields:
+            ImportResult: One per path, in completion order.
+
+        Raises:
+            SyntaxError: If a file contains invalid syntax.
+        """
+        start = time.perf_counter()
+        if Backend(backend) is Backend.THREADS:
+            pool, size = futures.ThreadPoolExecutor(IO_THREADS), 1
+        else:
+            pool, size = futures.ProcessPoolExecutor(workers), batch
+        paths = iter(paths)
+        with pool:
+            tasks = [
+                pool.submit(timed_batch, task, extractor)
+                for task in iter(lambda: list(islice(paths, size)), [])
+            ]
+            for task in futures.as_completed(tasks):
+                for path, names, timing in task.result():
+                    self.timings.append(timing)
+                    yield ImportResult(path, set(names))
+        self.wall_s += time.perf_counter() - start
+
+    def report(self) -> dict[str, Any]:
+        """Summarize the profile.
+
+        Returns:
+            dict[str, Any]: JSON-ready. "files" and "bytes" count what was
+                analyzed; "wall_ms" and "walk_ms" are totals; "phases"
+                maps each of PHASES (and "total", their sum per file) to
+                summarize()'s statistics over the files; "slowest" lists
+                the slowest files, with their size and each phase in ms.
+        """
+        report: dict[str, Any] = {
+            "files": len(self.timings),
+            "bytes": sum(timing.size for timing in self.timings),
+            "wall_ms": round(1000 * self.wall_s, 3),
+            "walk_ms": round(1000 * self.walk_s, 3),
+        }
+        if not self.timings:
+            return report | {"phases": {}, "slowest": []}
+
+        totals = [sum(timing[2:]) for timing in self.timings]
+        report["phases"] = {
+            phase: summarize([getattr(timing, phase) for timing in self.timings])
+            for phase in PHASES
+        }
+        report["phases"]["total"] = summarize(totals)
+        ranked = sorted(zip(totals, self.timings), reverse=True)[: self.slowest]
+        report["slowest"] = []
+        for total, timing in ranked:
+            entry: dict[str, Any] = {"path": timing.path, "size": timing.size}
+            for phase in PHASES:
+                entry[f"{phase}_ms"] = round(1000 * getattr(timing, phase), 3)
+            entry["total_ms"] = round(1000 * total, 3)
+            report["slowest"].append(entry)
+        return report
+
+
+# Bump on any change to the cache schema or to what an extractor returns:
+# a database of another version is emptied, not reused
+CACHE_VERSION = 1
+
+CACHE_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS imports (
+        path TEXT NOT NULL,
+        extractor TEXT NOT NULL,
+        size INTEGER NOT NULL,
+        mtime_ns INTEGER NOT NULL,
+        digest BLOB NOT NULL,
+        names TEXT NOT NULL,
+        PRIMARY KEY (path, extractor)
+    )
+"""
+
+
+class CacheEntry(NamedTuple):
+    """What ImportCache knows about one file.
+
+    Attributes:
+        size (int): Size in bytes when it was last checked.
+        mtime_ns (int): Modification time when it was last checked.
+        digest (bytes): BLAKE2b digest of the content.
+        names (Optional[str]): The imported module names in first-seen
+            order, as a JSON list. None while the file awaits parsing.
+    """
+
+    size: int
+    mtime_ns: int
+    digest: bytes
+    names: Optional[str]
+
+
+class ImportCache:
+    """Persistent map of source files to their imports, kept in SQLite.
+
+    Between two runs almost no file changes, so a warm run only needs to
+    parse the few that did. A file is a hit if its (size, mtime_ns) is
+    the one recorded; failing that, if the BLAKE2b digest of its content
+    is. The digest check matters in CI, where every fresh checkout gives
+    every file a new mtime. Entries are kept per Extractor, as the
+    extractors find different imports.
+
+    Use split() to separate the hits from the files to parse, pass the
+    parsed results through record(), then save().
 
+    Attributes:
+        database (Path): The SQLite database file.
+        extractor (Extractor): The extractor whose results are cached.
+        stat_hits (int): Files of the last split() unchanged by stat.
+        hash_hits (int): Files of the last split() unchanged by content.
+        misses (int): Files of the last split() that must be parsed.
+
+    Example:
+        >>> with ImportCache(Path('.imports.sqlite')) as cache:
+        ...     hits, misses = cache.split(paths)
+        ...     fresh = list(cache.record(import_batches(misses)))
+        ...     cache.save()
+    """
+
+    def __init__(self, database: Path, extractor: Extractor = Extractor.AST) -> None:
+        """Open (or create) the database and load its entries.
+
+        Args:
+            database (Path): The SQLite database file.
+            extractor (Extractor, optional): Defaults to Extractor.AST.
+        """
+        self.database = database
+        self.extractor = Extractor(extractor)
+        self.connection = sqlite3.connect(database)
+        with self.connection:
+            (version,) = self.connection.execute("PRAGMA user_version").fetchone()
+            if version != CACHE_VERSION:
+                self.connection.execute("DROP TABLE IF EXISTS imports")
+                self.connection.execute(f"PRAGMA user_version = {CACHE_VERSION}")
+            self.connection.execute(CACHE_SCHEMA)
+        rows = self.connection.execute(
+            "SELECT path, size, mtime_ns, digest, names FROM imports"
+            " WHERE extractor = ?",
+            (self.extractor.value,),
+        )
+        self.entries = {path: CacheEntry(*entry) for path, *entry in rows}
+        # Entries to write on save(), and files awaiting their results
+        self.updates: dict[str, CacheEntry] = {}
+        self.pending: dict[str, CacheEntry] = {}
+        self.removed: set[str] = set()
+        self.stat_hits = self.hash_hits = self.misses = 0
+
+    def __enter__(self) -> "ImportCache":
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
+    def check(self, path: Path) -> tuple[str, CacheEntry]:
+        """Compare a file with its entry; safe to call from any thread.
 
-def all_source(path: Path, pattern: str) -> Iterator[Path]:
+        Args:
+            path (Path): A Python source file.
+
+        Returns:
+            tuple[str, CacheEntry]: 'stat', 'hash' or 'miss', and the
+                file's current entry (names is None for a miss).
+
+        Raises:
+            FileNotFoundError: If the file doesn't exist.
+        """
+        status = path.stat()
+        entry = self.entries.get(str(path))
+        if entry is not None and entry[:2] == (status.st_size, status.st_mtime_ns):
+            return "stat", entry
+        # Stamped before reading, so a change made meanwhile is seen next run
+        digest = blake2b(path.read_bytes(), digest_size=16).digest()
+        current = CacheEntry(status.st_size, status.st_mtime_ns, digest, None)
+        if entry is not None and entry.digest == digest:
+            return "hash", current._replace(names=entry.names)
+        return "miss", current
+
+    def split(
+        self, paths: list[Path], base: Union[Path, Iterable[Path], None] = None
+    ) -> tuple[list[ImportResult], list[Path]]:
+        """Separate the cached files from the ones that must be parsed.
+
+        The files are checked in a pool of IO_THREADS threads.
+
+        Args:
+            paths (list[Path]): Python source files.
+            base (Union[Path, Iterable[Path], None], optional): The
+                directory, or directories, the paths were found in.
+                Entries of other files under them are deleted on save().
+                Defaults to None (nothing deleted).
+
+        Returns:
+            tuple[list[ImportResult], list[Path]]: Results of the cached
+                files, and the paths to parse and pass to record().
+        """
+        with futures.ThreadPoolExecutor(IO_THREADS) as pool:
+            checked = list(pool.map(self.check, paths))
+
+        hits: list[ImportResult] = []
+        misses: list[Path] = []
+        self.stat_hits = self.hash_hits = self.misses = 0
+        for path, (outcome, entry) in zip(paths, checked):
+            if outcome == "miss":
+                self.pending[str(path)] = entry
+                misses.append(path)
+                self.misses += 1
+                continue
+            if outcome == "hash":
+                self.updates[str(path)] = entry
+                self.hash_hits += 1
+            else:
+                self.stat_hits += 1
+            hits.append(ImportResult(path, set(json.loads(entry.names))))
+
+        if base is not None:
+            bases = [base] if isinstance(base, (str, os.PathLike)) else base
+            prefixes = tuple(os.path.join(path, "") for path in bases)
+            found = {str(path) for path in paths}
+            self.removed.update(
+                key
+                for key in self.entries
+                if key.startswith(prefixes) and key not in found
+            )
+        return hits, misses
+
+    def record(
+        self, results: Iterable[tuple[Path, list[str]]]
+    ) -> Iterator[tuple[Path, list[str]]]:
+        """Store the results of the files split() returned, passing them on.
+
+        Args:
+            results (Iterable[tuple[Path, list[str]]]): Paths with their
+                names in first-seen order, as import_batches() yields.
+
+        Yields:
+            tuple[Path, list[str]]: Each of the results, once stored.
+        """
+        for path, names in results:
+            entry = self.pending.pop(str(path))
+            self.updates[str(path)] = entry._replace(names=json.dumps(names))
+            yield path, names
+
+    def save(self) -> None:
+        """Write the new and updated entries, and delete the removed ones."""
+        with self.connection:
+            self.connection.executemany(
+                "INSERT OR REPLACE INTO imports VALUES (?, ?, ?, ?, ?, ?)",
+                (
+                    (path, self.extractor.value, *entry)
+                    for path, entry in self.updates.items()
+                ),
+            )
+            self.connection.executemany(
+                "DELETE FROM imports WHERE path = ? AND extractor = ?",
+                ((path, self.extractor.value) for path in self.removed),
+            )
+        self.entries.update(self.updates)
+        for path in self.removed:
+            self.entries.pop(path, None)
+        self.updates.clear()
+        self.removed.clear()
+
+    def report(self) -> str:
+        """Describe the hit rate of the last split()."""
+        hits = self.stat_hits + self.hash_hits
+        total = hits + self.misses
+        rate = 100 * hits / total if total else 0
+        return (
+            f"Cache {self.database}: {hits} of {total} files unchanged "
+            f"({rate:.1f}% hit rate, {self.hash_hits} by content), "
+            f"{self.misses} parsed"
+        )
+
+    def close(self) -> None:
+        """Close the database; unsaved changes are lost."""
+        self.connection.close()
+
+
+# Files read or parsed at once by scan()
+CONCURRENCY = IO_THREADS
+
+
+async def scan(
+    paths: Iterable[Path],
+    *,
+    concurrency: int = CONCURRENCY,
+    extractor: Extractor = Extractor.AST,
+    workers: Optional[int] = None,
+    executor: Optional[futures.Executor] = None,
+) -> AsyncIterator[ImportResult]:
+    """Analyze files from asyncio code, yielding results as they complete.
+
+    main() blocks its thread until the whole tree is done, which stalls an
+    event loop. scan() keeps the loop free: directories are walked and
+    files read in threads (asyncio.to_thread), and the text is parsed in a
+    process pool, as with Backend.HYBRID.
+
+    At most concurrency files are in progress or waiting to be taken by
+    the consumer, so a slow consumer holds back submission. Closing the
+    iterator early (contextlib.aclosing(), or cancelling the task that
+    iterates) stops submission at once: files not yet started are
+    dropped, and a pool scan() created is shut down without waiting.
+
+    Args:
+        paths (Iterable[Path]): Directories to search for *.py files (see
+            all_source()) and individual files, in any mix.
+        concurrency (int, optional): Most files in progress. Defaults to
+            CONCURRENCY.
+        extractor (Extractor, optional): Defaults to Extractor.AST.
+        workers (Optional[int], optional): Processes of the pool scan()
+            creates. Defaults to None (one per CPU).
+        executor (Optional[futures.Executor], optional): Parse in this
+            executor instead, e.g. a process pool the service shares. It
+            is left running. Defaults to None.
+
+    Yields:
+        ImportResult: One per file, in completion order.
+
+    Raises:
+        SyntaxError: If a file contains invalid syntax; the scan stops.
+        Exception: Whatever iterating paths raises; the scan stops.
+
+    Example:
+        >>> async def report(root: Path) -> None:
+        ...     async with aclosing(scan([root], concurrency=8)) as results:
+        ...         async for result in results:
+        ...             print(result.path, result.imports)
+    """
+    loop = asyncio.get_running_loop()
+    pool = executor or futures.ProcessPoolExecutor(workers)
+    slots = asyncio.Semaphore(concurrency)
+    done = asyncio.Queue()  # ImportResult, exception, or None at the end
+    running: set[asyncio.Task] = set()
+
+    async def analyze(path: Path) -> None:
+        """Read a file off the loop, parse it in the pool, queue the result."""
+        try:
+            text = await asyncio.to_thread(path.read_text)
+            names = await loop.run_in_executor(pool, import_names, text, extractor)
+            done.put_nowait(ImportResult(path, set(names)))
+        except asyncio.CancelledError:
+            raise
+        except Exception as error:
+            done.put_nowait(error)
+
+    def expand(path: Path) -> list[Path]:
+        """List the files of a directory, or the path itself if it isn't one."""
+        return list(all_source(path, "*.py")) if path.is_dir() else [path]
+
+    async def submit() -> None:
+        """Start a task per file as slots free up; queue None when all end.
+
+        An error raised by paths is queued for the consumer to raise, and
+        None always goes last, so the consumer never waits for an end that
+        won't come.
+        """
+        try:
+            for path in paths:
+                # Even is_dir() stats the file, so it stays off the loop
+                for file in await asyncio.to_thread(expand, path):
+                    await slots.acquire()
+                    task = asyncio.create_task(analyze(file))
+                    running.add(task)
+                    task.add_done_callback(running.discard)
+            if running:
+                await asyncio.wait(set(running))
+        except Exception as error:
+            done.put_nowait(error)
+        finally:
+            done.put_nowait(None)
+
+    producer = asyncio.create_task(submit())
+    try:
+        while (item := await done.get()) is not None:
+            slots.release()
+            if isinstance(item, Exception):
+                raise item
+            yield item
+        # The producer may have failed rather than finished
+        await producer
+    finally:
+        producer.cancel()
+        for task in list(running):
+            task.cancel()
+        await asyncio.gather(producer, *running, return_exceptions=True)
+        if executor is None:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+
+def all_source(
+    path: Path, pattern: str, workers: Optional[int] = None
+) -> Iterator[Path]:
     """Recursively find all files matching a pattern in a directory tree.
 
     This generator function walks through a directory tree and yields paths
@@ -186,14 +1433,18 @@ def all_source(path: Path, pattern: str) -> Iterator[Path]:
     cache directories, version control directories, build artifacts, and IDE
     configuration).
 
-    The function modifies the dirs list in-place during traversal to prevent
-    os.walk from descending into excluded directories, which improves
+    The traversal is done by source_walker.walk(), which prunes excluded
+    directories without listing them (using os.scandir and one compiled
+    regular expression for all the skip patterns), which improves
     performance when scanning large projects.
 
     Args:
         path (Path): The root directory to start searching from.
         pattern (str): File pattern to match (supports glob-style wildcards).
             Examples: '*.py', '*.txt', 'test_*.py'
+        workers (Optional[int], optional): Walk the top-level subdirectories
+            concurrently with this many threads; worthwhile on slow network
+            filesystems. Defaults to None (sequential).
 
     Yields:
         Path: Paths to files matching the pattern, excluding skipped directories.
@@ -206,7 +1457,7 @@ def all_source(path: Path, pattern: str) -> Iterator[Path]:
         /project/tests/test_main.py
 
     Note:
-        Automatically skips the following directories:
+        Automatically skips the following directories (SOURCE_SKIP):
         - Virtual environments: .venv, venv, env, .env, ENV
         - Version control: .git
         - Python cache: __pycache__, .pytest_cache, .mypy_cache, .ruff_cache
@@ -215,40 +1466,319 @@ def all_source(path: Path, pattern: str) -> Iterator[Path]:
         - IDE/editor: .idea, .vscode, node_modules
     """
 
-    # Walk through directory tree
-    for root, dirs, files in os.walk(path):
-        # Remove directories we want to skip from the dirs list
-        # This prevents os.walk from descending into them
-        for skip in {
-            ".tox",
-            ".venv",
-            "__pycache__",
-            ".git",
-            ".pytest_cache",
-            ".mypy_cache",
-            ".ruff_cache",
-            "venv",
-            "env",
-            ".env",
-            "ENV",
-            "node_modules",
-            ".idea",
-            ".vscode",
-            "build",
-            "dist",
-            "*.egg-info",
-            ".eggs",
-            "htmlcov",
-            ".coverage",
-            ".hypothesis",
-            ".nox",
-            "site-packages",
-        }:
-            if skip in dirs:
-                dirs.remove(skip)
-
-        # Yield matching files from current directory
-        yield from (Path(root) / f for f in files if fnmatch(f, pattern))
+    # Walk through directory tree, pruning the directories to skip
+    yield from walk(path, pattern, SOURCE_SKIP, workers)
+
+
+# Files larger than this (in bytes) are analyzed apart, in LargeFiles
+LARGE_FILE = 8 * 2**20
+
+# Address space allowed to the LargeFiles worker process, in bytes
+LARGE_MEMORY = 2 * 2**30
+
+# Time allowed for each large file, in seconds
+LARGE_SECONDS = 60.0
+
+
+class Skipped(NamedTuple):
+    """A large file that was not analyzed.
+
+    Attributes:
+        path (Path): The file.
+        size (int): Its size in bytes.
+        reason (str): Which budget it broke.
+    """
+
+    path: Path
+    size: int
+    reason: str
+
+
+class OverBudget(Exception):
+    """A file took longer than its time budget."""
+
+
+def _over_budget(signum: int, frame: Any) -> None:
+    """SIGALRM handler for guarded_imports()."""
+    raise OverBudget
+
+
+def limit_memory(limit: int) -> None:
+    """Cap the address space of this process, where the platform allows.
+
+    Beyond it, allocations raise MemoryError rather than drawing the
+    kernel's out-of-memory killer onto the whole run. A process pool
+    initializer for the LargeFiles worker.
+
+    Args:
+        limit (int): Bytes of address space, kept under the hard limit.
+    """
+    if resource is None:
+        return
+    soft, hard = resource.getrlimit(resource.RLIMIT_AS)
+    if hard != resource.RLIM_INFINITY:
+        limit = min(limit, hard)
+    resource.setrlimit(resource.RLIMIT_AS, (limit, hard))
+
+
+def guarded_imports(
+    path: Path, extractor: Extractor, seconds: float
+) -> tuple[Optional[list[str]], str]:
+    """Find the imports of a large file, within a time budget.
+
+    For the LargeFiles worker. The token extractors use stream_imports(),
+    which never holds the file in memory; Extractor.AST has to read and
+    parse it in full. The time budget is a SIGALRM timer, where the
+    platform has one; Python handles the signal between bytecodes, so a
+    long call into C, such as one regular expression search of the whole
+    file, runs to its end first.
+
+    Args:
+        path (Path): Python source file.
+        extractor (Extractor): The extractor.
+        seconds (float): Time allowed.
+
+    Returns:
+        tuple[Optional[list[str]], str]: The module names in first-seen
+            order and an empty reason, or None and the reason the file
+            was given up.
+
+    Raises:
+        SyntaxError: If the file contains invalid syntax.
+        OSError: If the file can't be read, other than for lack of memory.
+    """
+    timed = hasattr(signal, "setitimer")
+    if timed:
+        signal.signal(signal.SIGALRM, _over_budget)
+        signal.setitimer(signal.ITIMER_REAL, seconds)
+    try:
+        if Extractor(extractor) is Extractor.AST:
+            return ast_imports(path.read_text()), ""
+        return stream_imports(path, extractor is Extractor.NESTED), ""
+    except MemoryError:
+        return None, "over the memory budget"
+    except OSError as error:
+        # Mapping the file for stream_imports() needs its size in budget
+        if error.errno != errno.ENOMEM:
+            raise
+        return None, "over the memory budget"
+    except OverBudget:
+        return None, f"over the {seconds:g}s time budget"
+    finally:
+        if timed:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+
+
+class LargeFiles:
+    """A separate lane for files too large to analyze with the others.
+
+    One generated module of a few hundred megabytes, parsed in a pool
+    worker, can take gigabytes of memory and have the kernel kill the
+    run. hold() takes the files over a size threshold out of a stream of
+    paths; analyze() then handles them one at a time, in a single worker
+    process with a memory budget (its address space, see limit_memory())
+    and a time budget per file. A file over either budget is skipped and
+    listed in skipped. Should the worker die anyway, its file is skipped
+    too, and a new worker takes the next one.
+
+    The budgets rely on resource and SIGALRM, so they are not enforced on
+    Windows; the files are still analyzed one at a time, apart.
+
+    Attributes:
+        threshold (int): Size in bytes above which a file is held.
+        memory (int): Address space of the worker, in bytes.
+        seconds (float): Time allowed per file.
+        held (dict[Path, int]): The files held back, with their sizes.
+        skipped (list[Skipped]): The files analyze() gave up.
+
+    Example:
+        >>> large = LargeFiles(threshold=2**20)
+        >>> roots = SourceRoots([Path('.')])
+        >>> small = list(large.hold(roots.walk(), roots.sizes))
+        >>> results = chain(import_batches(small), large.analyze(Extractor.TOP))
+    """
+
+    def __init__(
+        self,
+        threshold: int = LARGE_FILE,
+        memory: int = LARGE_MEMORY,
+        seconds: float = LARGE_SECONDS,
+    ) -> None:
+        """Set the threshold and budgets.
+
+        Args:
+            threshold (int, optional): Defaults to LARGE_FILE.
+            memory (int, optional): Defaults to LARGE_MEMORY.
+            seconds (float, optional): Defaults to LARGE_SECONDS.
+        """
+        self.threshold = threshold
+        self.memory = memory
+        self.seconds = seconds
+        self.held: dict[Path, int] = {}
+        self.skipped: list[Skipped] = []
+
+    def hold(self, paths: Iterable[Path], sizes: dict[Path, int]) -> Iterator[Path]:
+        """Pass paths through, holding back the files over the threshold.
+
+        Args:
+            paths (Iterable[Path]): Python source files.
+            sizes (dict[Path, int]): Their sizes, e.g. SourceRoots.sizes.
+                Files without one pass through.
+
+        Yields:
+            Path: The files of the threshold size or less.
+        """
+        for path in paths:
+            size = sizes.get(path, 0)
+            if size > self.threshold:
+                self.held[path] = size
+            else:
+                yield path
+
+    def analyze(self, extractor: Extractor) -> Iterator[tuple[Path, list[str]]]:
+        """Analyze the held files, one at a time, within the budgets.
+
+        Args:
+            extractor (Extractor): The extractor.
+
+        Yields:
+            tuple[Path, list[str]]: Each file analyzed, with its module
+                names in first-seen order, as import_batches().
+
+        Raises:
+            SyntaxError: If a file contains invalid syntax.
+        """
+        pool = None
+        try:
+            for path, size in self.held.items():
+                if pool is None:
+                    pool = futures.ProcessPoolExecutor(
+                        1, initializer=limit_memory, initargs=(self.memory,)
+                    )
+                task = pool.submit(guarded_imports, path, extractor, self.seconds)
+                try:
+                    names, reason = task.result()
+                except futures.BrokenExecutor:
+                    pool.shutdown()
+                    pool = None
+                    names, reason = None, "the worker process died"
+                if names is None:
+                    self.skipped.append(Skipped(path, size, reason))
+                else:
+                    yield path, names
+        finally:
+            if pool is not None:
+                pool.shutdown()
+
+    def report(self) -> list[str]:
+        """List the skipped files, one line each.
+
+        Returns:
+            list[str]: E.g. 'Skipped gen/table.py (312.5 MB): over the
+                memory budget'.
+        """
+        return [
+            f"Skipped {path} ({size / 2**20:.1f} MB): {reason}"
+            for path, size, reason in self.skipped
+        ]
+
+
+def byte_size(text: str) -> int:
+    """Parse a size in bytes with an optional K, M or G suffix (powers of 2).
+
+    Example:
+        >>> byte_size('8M'), byte_size('1024')
+        (8388608, 1024)
+    """
+    units = {"K": 2**10, "M": 2**20, "G": 2**30}
+    text = text.strip().upper()
+    scale = units.get(text[-1:], 1)
+    if text[-1:] in units:
+        text = text[:-1]
+    return int(float(text) * scale)
+
+
+class SourceRoots:
+    """Several directories searched as one tree, each file once.
+
+    Roots may overlap (a directory and one of its subdirectories), or
+    reach the same files through a symbolic link or a hard link. walk()
+    identifies each file by its device and inode, so a file is analyzed
+    once, and is attributed to the first root (in the order given) that
+    reached it.
+
+    Attributes:
+        roots (list[Path]): The directories, in the order given.
+        root_of (dict[Path, Path]): Root of each path walk() has yielded.
+        sizes (dict[Path, int]): Size in bytes of each path yielded, from
+            the same stat() call.
+        duplicates (int): Files walk() skipped as already seen.
+
+    Example:
+        >>> roots = SourceRoots([Path('src'), Path('src/pkg'), Path('tests')])
+        >>> results = analyze_batches(list(roots.walk()))
+        >>> {roots.root(result.path) for result in results}
+        {PosixPath('src'), PosixPath('tests')}
+    """
+
+    def __init__(self, roots: Iterable[Path]) -> None:
+        """Start with nothing walked.
+
+        Args:
+            roots (Iterable[Path]): Directories to search.
+        """
+        self.roots = list(dict.fromkeys(roots))
+        self.root_of: dict[Path, Path] = {}
+        self.sizes: dict[Path, int] = {}
+        self.duplicates = 0
+        self.seen: set[tuple[int, int]] = set()
+
+    def walk(self, pattern: str = "*.py") -> Iterator[Path]:
+        """Find the files of every root (see all_source()), skipping repeats.
+
+        A file that can't be stat'ed is yielded as it is, so that the
+        error shows when the file is read.
+
+        Args:
+            pattern (str, optional): File name pattern. Defaults to '*.py'.
+
+        Yields:
+            Path: Each distinct file, root by root, in walk order.
+        """
+        for root in self.roots:
+            for path in all_source(root, pattern):
+                try:
+                    stat = path.stat()
+                except OSError:
+                    pass
+                else:
+                    inode = (stat.st_dev, stat.st_ino)
+                    if inode in self.seen:
+                        self.duplicates += 1
+                        continue
+                    self.seen.add(inode)
+                    self.sizes[path] = stat.st_size
+                self.root_of[path] = root
+                yield path
+
+    def root(self, path: Path) -> Path:
+        """The root a path was found in, or else the first root holding it.
+
+        Args:
+            path (Path): A file under one of the roots.
+
+        Returns:
+            Path: Its root; the first root if none holds it.
+        """
+        if path in self.root_of:
+            return self.root_of[path]
+        for root in self.roots:
+            if path.is_relative_to(root):
+                return root
+        return self.roots[0]
+
+    def __len__(self) -> int:
+        return len(self.roots)
 
 
 def get_options(argv: list[str] = sys.argv[1:]) -> argparse.Namespace:
@@ -266,6 +1796,25 @@ def get_options(argv: list[str] = sys.argv[1:]) -> argparse.Namespace:
         argparse.Namespace: Parsed arguments containing:
             - path (list[Path]): List of directory paths to search.
               Empty list if no paths provided.
+            - backend (Backend): Executor backend, default threads.
+            - workers (Optional[int]): Worker processes, default None.
+            - batch (int): Paths per process pool task.
+            - extractor (Extractor): How imports are found, default ast.
+            - stream (Optional[Output]): Streaming format, default None.
+            - ordered (bool): Stream in walk order.
+            - window (int): Tasks in flight while streaming.
+            - profile (Optional[Path]): Profile report file, default None.
+            - slowest (int): Slowest files in the profile report.
+            - cache (Optional[Path]): Import cache database, default None.
+            - stats (bool): Report the cache hit rate.
+            - large (int): Size in bytes above which files are analyzed
+              apart, within budgets.
+            - memory_budget (int): Their worker's address space, in bytes.
+            - time_budget (float): Seconds allowed per large file.
+
+    Raises:
+        SystemExit: If --stats is given without --cache, --window is less
+            than 1, or two of --cache, --stream and --profile are given.
 
     Example:
         >>> options = get_options(['/project1', '/project2'])
@@ -289,13 +1838,208 @@ def get_options(argv: list[str] = sys.argv[1:]) -> argparse.Namespace:
         nargs="*",
         help="Directory paths to search (defaults to current directory if omitted)",
     )
+    parser.add_argument(
+        "--backend",
+        type=Backend,
+        choices=list(Backend),
+        default=Backend.THREADS,
+        help="threads, processes, or hybrid (threads read, processes parse)",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        help="worker processes for the processes and hybrid backends",
+    )
+    parser.add_argument(
+        "--batch",
+        type=int,
+        default=BATCH_SIZE,
+        help="paths per process pool task",
+    )
+    parser.add_argument(
+        "--extractor",
+        type=Extractor,
+        choices=list(Extractor),
+        default=Extractor.AST,
+        help="ast, or tokens for top-level (top) or all (nested) imports",
+    )
+    parser.add_argument(
+        "--stream",
+        type=Output,
+        choices=list(Output),
+        help="print each file as it is analyzed, as text or ndjson",
+    )
+    parser.add_argument(
+        "--ordered",
+        action="store_true",
+        help="stream in directory walk order rather than completion order",
+    )
+    parser.add_argument(
+        "--window",
+        type=int,
+        default=WINDOW,
+        help="most tasks in flight while streaming",
+    )
+    parser.add_argument(
+        "--profile",
+        type=Path,
+        help="write per-phase timings as JSON to this file ('-' for stderr)",
+    )
+    parser.add_argument(
+        "--slowest",
+        type=int,
+        default=SLOWEST,
+        help="slowest files listed in the profile",
+    )
+    parser.add_argument(
+        "--cache",
+        type=Path,
+        help="SQLite file caching each file's imports between runs",
+    )
+    parser.add_argument(
+        "--stats",
+        action="store_true",
+        help="report the cache hit rate",
+    )
+    parser.add_argument(
+        "--large",
+        type=byte_size,
+        default=LARGE_FILE,
+        metavar="SIZE",
+        help="analyze files larger than this apart, within budgets (e.g. 8M)",
+    )
+    parser.add_argument(
+        "--memory-budget",
+        type=byte_size,
+        default=LARGE_MEMORY,
+        metavar="SIZE",
+        help="address space of the large file worker (e.g. 2G)",
+    )
+    parser.add_argument(
+        "--time-budget",
+        type=float,
+        default=LARGE_SECONDS,
+        metavar="SECONDS",
+        help="time allowed per large file; slower ones are skipped",
+    )
+
+    # Parse and check arguments
+    options = parser.parse_args(argv)
+    if options.stats and options.cache is None:
+        parser.error("--stats reports on the cache, so it needs --cache")
+    if options.window < 1:
+        parser.error("--window must be at least 1")
+    modes = (options.cache, options.stream, options.profile)
+    if sum(mode is not None for mode in modes) > 1:
+        parser.error("--cache, --stream and --profile can't be combined")
+    return options
 
-    # Parse and return arguments
-    return parser.parse_args(argv)
 
+def format_result(
+    result: ImportResult, base: Path, output: Output = Output.TEXT
+) -> str:
+    """Format one file's result as a report line.
+
+    Args:
+        result (ImportResult): The file's result.
+        base (Path): The directory searched; paths are shown relative to it.
+        output (Output, optional): Defaults to Output.TEXT, where files that
+            import modules of interest (ImportResult.focus) are marked with
+            '->'.
+
+    Returns:
+        str: The line, without a newline.
+
+    Example:
+        >>> format_result(ImportResult(Path('/p/a.py'), {'os'}), Path('/p'), 'ndjson')
+        '{"base": "/p", "path": "a.py", "imports": ["os"], "focus": false}'
+    """
+    path = result.path.relative_to(base)
+    if Output(output) is Output.NDJSON:
+        return json.dumps(
+            {
+                "base": str(base),
+                "path": str(path),
+                "imports": sorted(result.imports),
+                "focus": result.focus,
+            }
+        )
+    # Mark focused files with '->' indicator
+    return f"{'->' if result.focus else '':2s} {path} {result.imports}"
+
+
+def stream_main(
+    roots: SourceRoots,
+    backend: Backend,
+    workers: Optional[int],
+    batch: int,
+    extractor: Extractor,
+    output: Output,
+    ordered: bool,
+    window: int,
+    large: LargeFiles,
+) -> None:
+    """Print the files of the roots as they are analyzed; see main().
+
+    The text format keeps main()'s header and summary lines; with several
+    roots, a root's header is printed again whenever the next file comes
+    from another root. With NDJSON the standard output holds only the JSON
+    lines, each naming its root as "base", and the summary goes to stderr.
+    """
+    output = Output(output)
+    summary = sys.stderr if output is Output.NDJSON else sys.stdout
+    shown = None
+    if output is Output.TEXT and len(roots) == 1:
+        shown = roots.roots[0]
+        print(f"\n{shown}")
 
-def main(base: Path = Path.cwd()) -> None:
-    """Analyze all Python files in a directory and report import usage.
+    start = time.perf_counter()
+    count = 0
+    paths = large.hold(roots.walk(), roots.sizes)
+    results = chain(
+        stream_results(paths, backend, workers, batch, extractor, window, ordered),
+        (ImportResult(path, set(names)) for path, names in large.analyze(extractor)),
+    )
+    for result in results:
+        root = roots.root(result.path)
+        if output is Output.TEXT and root != shown:
+            shown = root
+            print(f"\n{root}")
+        print(format_result(result, root, output), flush=True)
+        count += 1
+
+    count += len(large.skipped)
+    for line in large.report():
+        print(line, file=summary)
+    end = time.perf_counter()
+    rate = 1000 * (end - start) / count if count else 0
+    where = searched(roots)
+    print(f"Searched {count} files in {where} ({rate:.3f}ms/file)", file=summary)
+
+
+def searched(roots: SourceRoots) -> str:
+    """Describe the roots for the summary line, with any duplicates skipped."""
+    where = str(roots.roots[0]) if len(roots) == 1 else f"{len(roots)} roots"
+    if roots.duplicates:
+        where += f", {roots.duplicates} duplicate files skipped"
+    return where
+
+
+def main(
+    base: Union[Path, Iterable[Path]] = Path.cwd(),
+    backend: Backend = Backend.THREADS,
+    workers: Optional[int] = None,
+    batch: int = BATCH_SIZE,
+    extractor: Extractor = Extractor.AST,
+    cache: Optional[ImportCache] = None,
+    stats: bool = False,
+    stream: Optional[Output] = None,
+    ordered: bool = False,
+    window: int = WINDOW,
+    profile: Optional[Profile] = None,
+    large: Optional[LargeFiles] = None,
+) -> None:
+    """Analyze all Python files in directories and report import usage.
 
     This is the main entry point that orchestrates the concurrent analysis
     of Python source files. It:
@@ -308,12 +2052,44 @@ def main(base: Path = Path.cwd()) -> None:
     are marked with '->' for easy identification.
 
     Args:
-        base (Path, optional): Root directory to search. Defaults to current
-            working directory.
+        base (Union[Path, Iterable[Path]], optional): Root directory to search,
+            or several, searched as one tree (see SourceRoots): one pool
+            analyzes them all, each file once. Defaults to current working
+            directory.
+        backend (Backend, optional): Executor backend. Defaults to
+            Backend.THREADS; use PROCESSES or HYBRID to parse on several
+            cores (see analyze_batches()).
+        workers (Optional[int], optional): Worker processes for the process
+            backends. Defaults to None (one per CPU).
+        batch (int, optional): Paths per process pool task. Defaults to
+            BATCH_SIZE.
+        extractor (Extractor, optional): Defaults to Extractor.AST; the
+            token extractors are faster but don't check the syntax.
+        cache (Optional[ImportCache], optional): Only parse the files that
+            changed since they were cached, then save the cache. It must
+            be for the same extractor. Defaults to None.
+        stats (bool, optional): Print the cache hit rate. Defaults to False.
+        stream (Optional[Output], optional): Print each file as soon as it
+            is analyzed, in this format, instead of a sorted report (see
+            stream_results()). Defaults to None.
+        ordered (bool, optional): Stream in directory walk order. Defaults
+            to False (completion order).
+        window (int, optional): Most tasks in flight while streaming.
+            Defaults to WINDOW.
+        profile (Optional[Profile], optional): Time each phase of the run
+            into this profile (see Profile). Defaults to None.
+        large (Optional[LargeFiles], optional): Where files over a size
+            threshold are analyzed, apart and within memory and time
+            budgets; the files it skips are listed after the others.
+            Defaults to None (a LargeFiles with the default settings).
 
     Returns:
         None: Results are printed to stdout.
 
+    Raises:
+        ValueError: If cache is for another extractor, or if cache, stream
+            and profile are combined.
+
     Example Output:
         /home/user/project
         -> src/main.py {'os', 'sys', 'typing', 'pathlib'}
@@ -321,54 +2097,121 @@ def main(base: Path = Path.cwd()) -> None:
            tests/test_main.py {'unittest', 'typing'}
         Searched 3 files in /home/user/project (12.456ms/file)
 
+    With several roots, each root's files are listed under it, and the
+    summary line counts them all (e.g. "Searched 9 files in 2 roots").
+
     Performance:
-        Uses ThreadPoolExecutor with 24 workers for concurrent file analysis.
-        Typical performance: 10-50ms per file depending on file size and
-        system I/O performance.
+        By default uses ThreadPoolExecutor with 24 workers for concurrent
+        file analysis. Typical performance: 10-50ms per file depending on
+        file size and system I/O performance. Parsing holds the GIL, so on
+        many-core machines the process backends scale much further.
     """
 
-    # Print the base directory being searched
-    print(f"\n{base}")
+    if cache is not None and cache.extractor is not Extractor(extractor):
+        raise ValueError(f"cache is for the {cache.extractor.value} extractor")
+    if sum(option is not None for option in (cache, stream, profile)) > 1:
+        raise ValueError("cache, stream and profile can't be combined")
+
+    if isinstance(base, (str, os.PathLike)):
+        base = [Path(base)]
+    roots = SourceRoots(base)
+    if large is None:
+        large = LargeFiles()
+
+    if stream is not None:
+        stream_main(
+            roots, backend, workers, batch, extractor, stream, ordered, window, large
+        )
+        return
 
     # Start performance timer
     start = time.perf_counter()
 
-    # Analyze files concurrently using thread pool
-    with futures.ThreadPoolExecutor(24) as pool:
-        # Submit all Python files for analysis
-        analyzers = [
-            pool.submit(find_imports, path) for path in all_source(base, "*.py")
-        ]
-
-        # Collect results as they complete (may finish in any order)
-        analyzed = (worker.result() for worker in futures.as_completed(analyzers))
+    if profile is not None:
+        # Time the walk, and each file's phases in the workers
+        paths = list(profile.walk(large.hold(roots.walk(), roots.sizes)))
+        analyzed = profile.analyze(paths, backend, workers, batch, extractor)
+        count = len(paths)
+    elif cache is not None:
+        # Only the files that changed are parsed, and recorded as they are
+        paths = list(roots.walk())
+        hits, misses = cache.split(paths, roots.roots)
+        misses = list(large.hold(misses, roots.sizes))
+        parsed = cache.record(
+            chain(
+                import_batches(misses, backend, workers, batch, extractor),
+                large.analyze(extractor),
+            )
+        )
+        analyzed = chain(
+            hits, (ImportResult(path, set(names)) for path, names in parsed)
+        )
+        count = len(paths)
+    elif Backend(backend) is Backend.THREADS:
+        # Analyze files concurrently using thread pool
+        with futures.ThreadPoolExecutor(IO_THREADS) as pool:
+            # Submit all Python files for analysis
+            analyzers = [
+                pool.submit(find_imports, path, extractor)
+                for path in large.hold(roots.walk(), roots.sizes)
+            ]
+
+            # Collect results as they complete (may finish in any order)
+            analyzed = (worker.result() for worker in futures.as_completed(analyzers))
+        count = len(analyzers)
+    else:
+        # Parse batches of files in worker processes
+        paths = list(large.hold(roots.walk(), roots.sizes))
+        analyzed = analyze_batches(paths, backend, workers, batch, extractor)
+        count = len(paths)
+
+    if cache is None:
+        # The large files, after the others (the cache sent them on already)
+        count += len(large.held)
+        held = large.analyze(extractor)
+        analyzed = chain(
+            analyzed, (ImportResult(path, set(names)) for path, names in held)
+        )
 
-    # Display results sorted by path
+    # Display results sorted by path, under their roots
+    sections: dict[Path, list[ImportResult]] = {root: [] for root in roots.roots}
     for example in sorted(analyzed):
-        # Mark focused files with '->' indicator
-        print(
-            f"{'->' if example.focus else '':2s} "
-            f"{example.path.relative_to(base)} {example.imports}"
-        )
+        sections[roots.root(example.path)].append(example)
+    for root, examples in sections.items():
+        print(f"\n{root}")
+        for example in examples:
+            print(format_result(example, root))
+    for line in large.report():
+        print(line)
+
+    if cache is not None:
+        cache.save()
+        if stats:
+            print(cache.report())
 
     # Calculate and display performance metrics
     end = time.perf_counter()
-    rate = 1000 * (end - start) / len(analyzers) if analyzers else 0
-    print(f"Searched {len(analyzers)} files in {base} ({rate:.3f}ms/file)")
+    rate = 1000 * (end - start) / count if count else 0
+    print(f"Searched {count} files in {searched(roots)} ({rate:.3f}ms/file)")
 
 
 if __name__ == "__main__":
     """Command-line entry point.
-    
+
     When run as a script, this:
     1. Parses command-line arguments to get search paths
     2. Uses current directory if no paths specified
-    3. Runs analysis on each specified path
-    
+    3. Analyzes the paths together, each file once
+
     Usage:
         python code_search.py                    # Search current directory
         python code_search.py /path/to/project   # Search specific directory
         python code_search.py path1 path2 path3  # Search multiple directories
+        python code_search.py --backend processes  # Parse on every core
+        python code_search.py --extractor top    # Top-level imports, fast
+        python code_search.py --cache .imports.sqlite --stats  # Warm runs
+        python code_search.py --stream ndjson    # One JSON line per file
+        python code_search.py --profile -        # Phase timings to stderr
     """
     # Parse command-line arguments
     options = get_options()
@@ -376,6 +2219,33 @@ if __name__ == "__main__":
     # Use current directory if no paths specified
     paths = options.path or [Path.cwd()]
 
-    # Run analysis on each specified path
-    for path in paths:
-        main(path)
+    cache = ImportCache(options.cache, options.extractor) if options.cache else None
+    profile = Profile(options.slowest) if options.profile else None
+    large = LargeFiles(options.large, options.memory_budget, options.time_budget)
+
+    # One scan of all the paths
+    try:
+        main(
+            paths,
+            options.backend,
+            options.workers,
+            options.batch,
+            options.extractor,
+            cache,
+            options.stats,
+            options.stream,
+            options.ordered,
+            options.window,
+            profile,
+            large,
+        )
+    finally:
+        if cache is not None:
+            cache.close()
+
+    if profile is not None:
+        report = json.dumps(profile.report(), indent=2)
+        if str(options.profile) == "-":
+            print(report, file=sys.stderr)
+        else:
+            options.profile.write_text(report + "\n")
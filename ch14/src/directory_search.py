@@ -25,8 +25,44 @@ Performance Benefits:
 Key Components:
     - DirectorySearch: Main coordinator class managing workers
     - search(): Worker function running in separate process
+    - mapped_search(): Worker function scanning a shared memory-mapped corpus
+    - build_corpus(): Packs source files into a single corpus file
+    - build_trigram_index(), TrigramIndex: Optional trigram index over a corpus
+    - partition(): Size- or line-balanced assignment of files to workers
     - all_source(): Generator for finding Python files
-    - Queue-based communication for queries and results
+    - Queue-based communication for queries and results; Request and
+      Result tag both with a query id so several queries can be in flight
+
+Corpus File Format:
+    In corpus mode, setup_search() packs every file into one binary file
+    that all workers map read-only. The page cache holds a single copy of
+    the text, shared by every worker process:
+
+    - Header: CORPUS_HEADER (magic, format version, line count, blob size,
+      file table size)
+    - Blob: every line, right-stripped, UTF-8 encoded, terminated by b"\n"
+    - Offsets: line_count + 1 unsigned 64-bit file positions; line i
+      occupies bytes offsets[i] to offsets[i + 1] - 1 (excluding the b"\n")
+    - File table: JSON list of [path, size, mtime_ns, line count], one
+      CorpusFile per packed file, in blob order
+
+    The corpus is also an on-disk cache. On the next start build_corpus()
+    copies the lines of every file whose (path, size, mtime_ns) is
+    unchanged and only re-reads the others; if nothing changed, the file
+    is used as it is. A corpus of another CORPUS_VERSION is rebuilt.
+
+Trigram Index Format:
+    With index=True, setup_search() also writes "<corpus>.trigrams", an
+    inverted index from every 3-byte window of a line to the sorted line
+    numbers containing it. A query of three or more bytes is answered by
+    intersecting the posting lists of its trigrams and verifying only the
+    surviving lines; shorter queries fall back to the full scan.
+
+    - Header: INDEX_HEADER (magic, format version, trigram count, line
+      count, digest of the corpus file table)
+    - Keys: sorted trigrams as big-endian uint32
+    - Starts: trigram count + 1 uint64 positions into the postings
+    - Postings: uint32 line numbers, ascending within each trigram
 
 Example Usage:
     >>> ds = DirectorySearch()
@@ -37,39 +73,546 @@ Example Usage:
     >>> ds.teardown_search()
 
 Note:
-    This implementation loads all file contents into memory for each worker.
-    For very large codebases, consider memory-mapped files or chunked reading.
+    By default each worker loads its files into a private list of lines.
+    For very large codebases, pass corpus= to setup_search() so workers
+    share one memory-mapped corpus file instead.
 """
 
 from __future__ import annotations
+from array import array
+import asyncio
+from bisect import bisect_left, bisect_right
+from collections import defaultdict, deque
+from contextlib import ExitStack
+from enum import Enum
+from functools import lru_cache, partial
+from hashlib import blake2b
+import heapq
+from itertools import chain, count, islice
+import json
+import mmap
 from pathlib import Path
-from typing import List, Iterator, Optional, Union, TYPE_CHECKING
-
+from queue import Empty
+import re
+import struct
+import threading
+from typing import (
+    AsyncIterator,
+    Callable,
+    List,
+    Iterable,
+    Iterator,
+    NamedTuple,
+    Optional,
+    Union,
+    TYPE_CHECKING,
+)
 
 if TYPE_CHECKING:
-    Query_Q = Queue[Union[str, None]]
-    Result_Q = Queue[List[str]]
+    Query_Q = Queue[Union[str, "Query", "Request", "Command", None]]
+    Result_Q = Queue[Union["Result", Optional[List[str]]]]
+
+
+class Kind(str, Enum):
+    """How the text of a Query is matched against each line.
+
+    Attributes:
+        LITERAL: Case-sensitive substring match (the default).
+        REGEX: re.search() with the query's flags.
+        CASEFOLD: Case-insensitive substring match.
+    """
+
+    LITERAL = "literal"
+    REGEX = "regex"
+    CASEFOLD = "casefold"
+
+
+class Query(NamedTuple):
+    """Query envelope sent to the workers over their query queue.
+
+    Workers answer a Query with a stream of result chunks followed by an
+    end-of-query marker (see stream_results()). A bare string is still
+    accepted and answered the original way: one list of every match.
+
+    Attributes:
+        text (str): Substring or regular expression to look for.
+        kind (Kind): How text is matched. Defaults to Kind.LITERAL.
+        flags (int): re flags for regex queries (e.g. re.IGNORECASE).
+
+    Example:
+        >>> query_q.put(Query("def [a-z_]+[(]self", Kind.REGEX))
+        >>> query_q.put(Query("todo", Kind.CASEFOLD))
+    """
+
+    text: str
+    kind: Kind = Kind.LITERAL
+    flags: int = 0
+
+
+# Characters with a special meaning in a regular expression
+REGEX_SPECIAL = frozenset(".^$*+?{}[]|()\\")
+
+
+def literal_prefix(pattern: str, flags: int = 0) -> str:
+    """Return literal text that every match of a regular expression starts with.
+
+    The prefix lets workers reject lines cheaply with a substring test
+    (or bytes.find() over a corpus) before running the regex engine.
+    Extraction is conservative: it stops at the first metacharacter, drops
+    a final character made optional by a quantifier, and gives up on
+    alternation and case-insensitive patterns.
+
+    Args:
+        pattern (str): Regular expression source.
+        flags (int, optional): re flags the pattern is compiled with.
+
+    Returns:
+        str: A required literal prefix, possibly empty.
+
+    Example:
+        >>> literal_prefix("class [A-Z]")
+        'class '
+        >>> literal_prefix("colou?r")
+        'colo'
+        >>> literal_prefix("foo|bar")
+        ''
+    """
+
+    if flags & (re.IGNORECASE | re.VERBOSE) or "|" in pattern:
+        return ""
+
+    prefix: list[str] = []
+    i = 0
+    while i < len(pattern):
+        char = pattern[i]
+        if char == "\\" and i + 1 < len(pattern) and not pattern[i + 1].isalnum():
+            # An escaped punctuation character is a literal
+            char, i = pattern[i + 1], i + 1
+        elif char in REGEX_SPECIAL:
+            if char in "*?{" and prefix:
+                prefix.pop()
+            break
+        prefix.append(char)
+        i += 1
 
+    return "".join(prefix)
 
-def search(paths: list[Path], query_q: Query_Q, results_q: Result_Q) -> None:
+
+@lru_cache(maxsize=256)
+def compile_query(query: Query) -> tuple[re.Pattern[str], str]:
+    """Compile a non-literal query, caching the result per process.
+
+    Each worker process has its own cache, so a query repeated by users
+    is compiled once per worker rather than once per request.
+
+    Args:
+        query (Query): A Kind.REGEX or Kind.CASEFOLD query.
+
+    Returns:
+        tuple[re.Pattern[str], str]: The compiled pattern and the literal
+            prefix every match contains (empty if there is none).
+
+    Raises:
+        re.error: If a regex query is not a valid regular expression.
+    """
+
+    if query.kind is Kind.CASEFOLD:
+        return re.compile(re.escape(query.text), query.flags | re.IGNORECASE), ""
+    return re.compile(query.text, query.flags), literal_prefix(query.text, query.flags)
+
+
+class Command(NamedTuple):
+    """Control message sent to the workers over their query queue.
+
+    Attributes:
+        action (str): What to do: "cancel" stops the query in progress;
+            "drop" forgets the files in args; "load" (re)reads them.
+        args (tuple): Arguments for the action.
+    """
+
+    action: str
+    args: tuple[object, ...] = ()
+
+
+# Ask a worker to stop streaming the current query; Command("cancel", (qid,))
+# stops (or skips) only the Request with that id
+CANCEL = Command("cancel")
+
+
+class Request(NamedTuple):
+    """A Query tagged with an id, so several can be in flight at once.
+
+    Workers answer a Request with Result messages carrying the same id,
+    which lets DirectorySearch route the chunks of concurrent queries
+    sharing one results queue to the right caller.
+
+    Attributes:
+        qid (int): Id unique within one DirectorySearch.
+        query (Query): The query to run.
+    """
+
+    qid: int
+    query: Query
+
+
+class Result(NamedTuple):
+    """A chunk of matching lines for a Request, or its end marker.
+
+    Attributes:
+        qid (int): Id of the Request being answered.
+        lines (Optional[list[str]]): Matching lines, or None once the
+            worker has finished (or cancelled) the request.
+    """
+
+    qid: int
+    lines: Optional[list[str]]
+
+
+class Stamp(NamedTuple):
+    """What refresh() compares to decide whether a file has changed."""
+
+    size: int
+    mtime_ns: int
+
+    @classmethod
+    def of(cls, path: Path) -> Stamp:
+        """Stat a file."""
+        status = path.stat()
+        return cls(status.st_size, status.st_mtime_ns)
+
+
+class Refresh(NamedTuple):
+    """The files refresh() found added, changed and removed."""
+
+    added: list[Path]
+    changed: list[Path]
+    removed: list[Path]
+
+
+# Bounds on one result message; whichever is reached first closes a chunk
+CHUNK_LINES = 1000
+CHUNK_CHARS = 1 << 20
+
+# Lines a worker scans between two checks for a CANCEL, however few match
+SCAN_POLL = 10_000
+
+
+def scan(
+    lines: Iterable[str], keep: Callable[[str], object]
+) -> Iterator[Optional[str]]:
+    """Lazily yield the lines keep() accepts, and None every SCAN_POLL lines.
+
+    The None markers let stream_results() check for a CANCEL while a
+    sparse query scans many lines without filling a chunk.
+    """
+    lines = iter(lines)
+    while batch := list(islice(lines, SCAN_POLL)):
+        yield from filter(keep, batch)
+        yield None
+
+
+def next_message(query_q: Query_Q, pending: deque[object]) -> object:
+    """Return the next message for a worker, preferring held-back ones."""
+    return pending.popleft() if pending else query_q.get()
+
+
+def cancelled(
+    query_q: Query_Q,
+    results_q: Result_Q,
+    pending: deque[object],
+    qid: Optional[int] = None,
+) -> bool:
+    """Check, without blocking, whether the current query has been cancelled.
+
+    A plain CANCEL, or a cancel carrying the current qid, stops the current
+    query. A cancel for a Request still held back in pending removes it
+    and sends its end marker at once, so it's never run. Any other message
+    that arrives meanwhile (the next query, or the shutdown signal) is
+    held back in pending, in order.
+    """
+    while True:
+        try:
+            message = query_q.get_nowait()
+        except Empty:
+            return False
+        if not isinstance(message, Command) or message.action != "cancel":
+            pending.append(message)
+        elif not message.args or message.args[0] == qid:
+            return True
+        else:
+            for request in list(pending):
+                if isinstance(request, Request) and request.qid == message.args[0]:
+                    pending.remove(request)
+                    results_q.put(Result(request.qid, None))
+
+
+def stream_results(
+    lines: Iterable[Optional[str]],
+    query_q: Query_Q,
+    results_q: Result_Q,
+    pending: deque[object],
+    qid: Optional[int] = None,
+) -> None:
+    """Send matching lines in bounded chunks, then the end-of-query marker.
+
+    A chunk is sent as soon as it holds CHUNK_LINES lines or CHUNK_CHARS
+    characters, so no single message grows with the result set and the
+    coordinator can start yielding before the scan finishes. After each
+    chunk, and at each None in lines (see scan()), the worker checks for a
+    CANCEL and, if one arrived, abandons the (lazy) scan. Whatever
+    happens, None is sent last to end the query.
+
+    Args:
+        lines (Iterable[Optional[str]]): Lazily produced matching lines,
+            with None markers where the scan may be cancelled.
+        query_q (Queue): The worker's query queue, polled for CANCEL.
+        results_q (Queue): Queue the chunks and the end marker are sent to.
+        pending (deque): Messages held back by cancelled().
+        qid (Optional[int]): For a Request, its id: every chunk and the
+            end marker are then wrapped in a Result.
+    """
+
+    def send(lines: Optional[list[str]]) -> None:
+        results_q.put(lines if qid is None else Result(qid, lines))
+
+    chunk: list[str] = []
+    size = 0
+    for line in lines:
+        if line is None:
+            if cancelled(query_q, results_q, pending, qid):
+                break
+            continue
+        chunk.append(line)
+        size += len(line)
+        if len(chunk) >= CHUNK_LINES or size >= CHUNK_CHARS:
+            send(chunk)
+            chunk, size = [], 0
+            if cancelled(query_q, results_q, pending, qid):
+                break
+    if chunk:
+        send(chunk)
+    send(None)
+
+
+def serve_queries(
+    query_q: Query_Q,
+    results_q: Result_Q,
+    matching: Callable[[Query], Iterable[Optional[str]]],
+    apply: Optional[Callable[[Command], None]] = None,
+) -> None:
+    """Answer a worker's queries until it receives the shutdown signal.
+
+    Args:
+        query_q (Queue): The worker's query queue.
+        results_q (Queue): Queue the results are sent to.
+        matching (Callable): Lazily produces the lines matching a Query,
+            with None markers where the scan may be cancelled.
+        apply (Optional[Callable]): Handles Commands other than a cancel
+            that arrived after its query finished (those are dropped).
+    """
+
+    # Messages that arrived while a query was streaming
+    pending: deque[object] = deque()
+
+    # Process queries until termination signal (None)
+    while (message := next_message(query_q, pending)) is not None:
+        if isinstance(message, Command):
+            if apply is not None and message.action != "cancel":
+                apply(message)
+        elif isinstance(message, str):
+            matches = matching(Query(message))
+            results_q.put([line for line in matches if line is not None])
+        elif isinstance(message, Request):
+            lines = matching(message.query)
+            stream_results(lines, query_q, results_q, pending, message.qid)
+        else:
+            stream_results(matching(message), query_q, results_q, pending)
+
+
+class Balance(str, Enum):
+    """How setup_search() spreads files across its workers.
+
+    ROUND_ROBIN deals the files out in order without looking at them. SIZE
+    and LINES weigh every file (by bytes or by line count) and bin-pack the
+    weights with partition().
+    """
+
+    ROUND_ROBIN = "round-robin"
+    SIZE = "size"
+    LINES = "lines"
+
+
+class Shard(NamedTuple):
+    """A byte range of one file, loaded by a single worker.
+
+    The cut points are arbitrary byte positions: a shard owns every line
+    whose first byte lies in [start, stop), so adjacent shards split the
+    file on line boundaries without the coordinator reading it.
+
+    Attributes:
+        path (Path): The file being split.
+        start (int): First byte position owned by the shard.
+        stop (int): Position just past the shard's last owned byte.
+    """
+
+    path: Path
+    start: int
+    stop: int
+
+
+def split_lines(data: bytes) -> list[str]:
+    """Decode a file's bytes and split them into right-stripped lines.
+
+    Lines end at b"\n" only, as count_lines() and the shard readers see them,
+    so a lone "\r", form feed or line separator stays inside its line.
+
+    Args:
+        data (bytes): The contents of a file.
+
+    Returns:
+        list[str]: Each line without its trailing whitespace.
+    """
+    lines = data.split(b"\n")
+    if lines[-1] == b"":
+        lines.pop()
+    return [l.decode().rstrip() for l in lines]
+
+
+def read_lines(source: Union[Path, Shard]) -> Iterator[str]:
+    """Yield the right-stripped lines of a file, or of a shard of one.
+
+    Args:
+        source (Union[Path, Shard]): A whole file, or the byte range of one.
+
+    Yields:
+        str: Each line without its trailing whitespace.
+    """
+    if not isinstance(source, Shard):
+        yield from split_lines(source.read_bytes())
+        return
+    with source.path.open("rb") as file:
+        if source.start:
+            # The line holding byte start - 1 belongs to the previous shard
+            file.seek(source.start - 1)
+            file.readline()
+        while file.tell() < source.stop and (line := file.readline()):
+            yield line.decode().rstrip()
+
+
+def count_lines(path: Path) -> int:
+    """Count the lines of a file without decoding it."""
+    with path.open("rb") as file:
+        count, last = 0, b"\n"
+        for block in iter(partial(file.read, 1 << 20), b""):
+            count += block.count(b"\n")
+            last = block[-1:]
+    # A final line without a terminator still counts
+    return count + (last != b"\n")
+
+
+def partition(
+    paths: list[Path],
+    cpus: int,
+    balance: Balance = Balance.SIZE,
+    split: bool = False,
+) -> tuple[list[list[Union[Path, Shard]]], list[int]]:
+    """Assign files to workers with greedy longest-processing-time scheduling.
+
+    Each file is weighed by its size or line count. Files are then taken
+    heaviest first and each one goes to the currently lightest worker, so
+    a few huge files end up on different workers instead of wherever
+    round-robin happened to deal them. LPT is never worse than 4/3 of the
+    optimal makespan.
+
+    With split=True, any file heavier than an even share (total / cpus) is
+    first cut into that many equal byte-range Shards, so a single huge
+    file is searched by several workers rather than one straggler.
+
+    Args:
+        paths (list[Path]): Files to distribute.
+        cpus (int): Number of workers.
+        balance (Balance, optional): Weigh files by Balance.SIZE (stat,
+            no reading) or Balance.LINES (reads every file). Defaults to
+            Balance.SIZE.
+        split (bool, optional): Cut oversized files into Shards. Defaults
+            to False.
+
+    Returns:
+        tuple: (assignments, worker_bytes), where assignments[i] lists the
+            files and shards for worker i and worker_bytes[i] is the number
+            of bytes assigned to it.
+
+    Example:
+        >>> assignments, worker_bytes = partition(paths, 4, split=True)
+        >>> max(worker_bytes) / (sum(worker_bytes) / 4)  # 1.0 is perfect
+        1.02
+    """
+
+    # (weight, bytes, source) for every file, or every shard of a file
+    items: list[tuple[int, int, Union[Path, Shard]]] = []
+    for path in paths:
+        size = path.stat().st_size
+        weight = count_lines(path) if balance is Balance.LINES else size
+        items.append((weight, size, path))
+
+    share = -(-sum(weight for weight, _, _ in items) // cpus)
+    if split and cpus > 1 and share:
+        whole = []
+        for weight, size, path in items:
+            if weight <= share:
+                whole.append((weight, size, path))
+                continue
+            pieces = -(-weight // share)
+            cuts = [size * i // pieces for i in range(pieces + 1)]
+            whole.extend(
+                (
+                    weight * (stop - start) // size,
+                    stop - start,
+                    Shard(path, start, stop),
+                )
+                for start, stop in zip(cuts, cuts[1:])
+            )
+        items = whole
+
+    # Heaviest first, each to the least loaded worker (ties go to the lowest)
+    items.sort(key=lambda item: item[0], reverse=True)
+    loads = [(0, worker) for worker in range(cpus)]
+    assignments: list[list[Union[Path, Shard]]] = [[] for _ in range(cpus)]
+    worker_bytes = [0] * cpus
+    for weight, size, source in items:
+        load, worker = heapq.heappop(loads)
+        assignments[worker].append(source)
+        worker_bytes[worker] += size
+        heapq.heappush(loads, (load + weight, worker))
+
+    return assignments, worker_bytes
+
+
+def search(
+    paths: list[Union[Path, Shard]], query_q: Query_Q, results_q: Result_Q
+) -> None:
     """Worker process function that searches assigned files for query strings.
 
     This function runs in a separate process and performs the following:
     1. Loads all assigned files into memory
     2. Waits for query strings from the query queue
     3. Searches loaded content for each query
-    4. Sends matching lines back via results queue
+    4. Streams matching lines back via results queue
     5. Continues until receiving termination signal (None)
 
     The function loads all file content upfront, trading memory for speed.
     This approach is efficient for multiple queries on the same file set.
 
     Args:
-        paths (list[Path]): List of file paths assigned to this worker.
-        query_q (Queue): Queue for receiving query strings from main process.
-            A None value signals the worker to terminate.
+        paths (list[Union[Path, Shard]]): Files assigned to this worker; a
+            Shard loads only the lines of its byte range.
+        query_q (Queue): Queue for receiving queries from main process: a
+            literal string, a Query envelope or a Request. A None value
+            signals the worker to terminate.
         results_q (Queue): Queue for sending search results back to main process.
-            Each result is a list of matching lines.
+            A Query is answered with chunks of matching lines followed by
+            None, a Request with the same wrapped in Results, and a bare
+            string with a single list of every match.
 
     Returns:
         None: Function runs until termination signal received.
@@ -90,33 +633,577 @@ def search(paths: list[Path], query_q: Query_Q, results_q: Result_Q) -> None:
     Note:
         - Process ID is printed for debugging/monitoring
         - All file content stored in memory for duration of process
-        - Simple substring matching used (not regex)
+        - "drop" and "load" Commands from refresh() update single files;
+          they are queued behind any query in progress
+        - Literal queries use substring matching; regex and case-folded
+          queries go through compile_query() and its per-process cache
         - Trailing whitespace stripped from lines
     """
 
     # Print worker identification for monitoring
     print(f"PID: {os.getpid()}, paths {len(paths)}")
 
-    # Load all assigned files into memory
-    lines: list[str] = []
-    for path in paths:
-        lines.extend(l.rstrip() for l in path.read_text().splitlines())
+    # Load all assigned files into memory, one line list per file (or shard)
+    # so that refresh() can drop or reload a single file
+    files: dict[Union[Path, Shard], list[str]] = {}
+    for source in paths:
+        files[source] = list(read_lines(source))
+
+    def apply(command: Command) -> None:
+        """Drop or (re)load the files named by a refresh() command."""
+        for source in list(files):
+            if (source.path if isinstance(source, Shard) else source) in command.args:
+                del files[source]
+        if command.action == "load":
+            for path in command.args:
+                try:
+                    files[path] = list(read_lines(path))
+                except FileNotFoundError:
+                    pass  # Removed again since the rescan; the next one drops it
+
+    def matching(query: Query) -> Iterator[Optional[str]]:
+        """Lazily yield the loaded lines matching a query (see scan())."""
+        lines = chain.from_iterable(files.values())
+        if query.kind is Kind.LITERAL:
+            return scan(lines, lambda l: query.text in l)
+        # The literal prefix rejects most lines before the regex runs
+        pattern, prefix = compile_query(query)
+        return scan(lines, lambda l: prefix in l and pattern.search(l))
+
+    # Search loaded lines and send results back to main process
+    serve_queries(query_q, results_q, matching, apply)
+
+
+# Corpus file format constants
+# "<8sIQQQ" means: 8-byte magic, format version, line count, blob size and
+# file table size. Bump CORPUS_VERSION on any layout change: a cached corpus
+# of another version is never reused, only rebuilt.
+CORPUS_MAGIC = b"DSCORPUS"
+CORPUS_VERSION = 2
+CORPUS_HEADER = struct.Struct("<8sIQQQ")
+
+
+class CorpusFile(NamedTuple):
+    """A source file's entry in the corpus file table.
+
+    The (path, size, mtime_ns) triple is the cache key: build_corpus()
+    copies the lines of a file whose key is unchanged from the previous
+    corpus instead of reading it again.
 
-    # Process queries until termination signal
-    while True:
-        # Get next query (blocks until available)
-        if (query_text := query_q.get()) is None:
-            break  # None signals shutdown
+    Attributes:
+        path (str): The file's path, as given to build_corpus().
+        size (int): Size in bytes when it was packed.
+        mtime_ns (int): Modification time when it was packed.
+        lines (int): Number of corpus lines holding the file.
+    """
+
+    path: str
+    size: int
+    mtime_ns: int
+    lines: int
+
+
+def _corpus_layout(line_count: int, blob_size: int) -> tuple[int, int]:
+    """Return the file positions of the offset array and the file table.
+
+    The offset array follows the blob, padded to an 8-byte boundary; the
+    file table (JSON) follows the offsets.
+    """
+    offsets = CORPUS_HEADER.size + blob_size
+    offsets += -offsets % 8
+    return offsets, offsets + 8 * (line_count + 1)
+
+
+def _corpus_table(corpus_map: mmap.mmap) -> bytes:
+    """Return the raw file table of a mapped, validated corpus."""
+    _, _, line_count, blob_size, table_size = CORPUS_HEADER.unpack_from(corpus_map)
+    _, table = _corpus_layout(line_count, blob_size)
+    return corpus_map[table : table + table_size]
+
+
+def _corpus_digest(corpus_map: mmap.mmap) -> bytes:
+    """Identify a corpus by a hash of its file table.
+
+    Two corpora with the same files, sizes and mtimes hold the same lines,
+    so the digest tells an index whether it was built for this corpus.
+    """
+    return blake2b(_corpus_table(corpus_map), digest_size=8).digest()
 
-        # Search for query in all loaded lines
-        results = [l for l in lines if query_text in l]
 
-        # Send results back to main process
-        results_q.put(results)
+def _cached_corpus(
+    target: Path, stack: ExitStack
+) -> Optional[tuple[mmap.mmap, memoryview, list[CorpusFile]]]:
+    """Map an existing corpus for reuse, closed when stack exits.
+
+    Returns:
+        The map, its offset array and its file table, or None if target is
+        missing, empty, or not a corpus of the current format version.
+    """
+    try:
+        with target.open("rb") as corpus_file:
+            corpus_map = mmap.mmap(corpus_file.fileno(), 0, access=mmap.ACCESS_READ)
+        stack.enter_context(corpus_map)
+        offsets = _corpus_offsets(target, corpus_map)
+        stack.callback(offsets.release)
+        table = json.loads(_corpus_table(corpus_map))
+    except (OSError, ValueError, struct.error):
+        return None
+    return corpus_map, offsets, [CorpusFile._make(entry) for entry in table]
+
+
+def build_corpus(paths: list[Path], target: Path, reuse: bool = True) -> array[int]:
+    """Pack the lines of all files into a single memory-mappable corpus file.
+
+    Each file is read once, split into right-stripped lines (exactly as the
+    search() worker does) and appended to the blob as UTF-8 bytes with a
+    b"\\n" terminator. The line-offset array is written after the blob so
+    workers can map any line number to its byte range without scanning,
+    followed by a table of the packed files.
+
+    The corpus doubles as an on-disk cache: with reuse=True, the lines of
+    any file whose (path, size, mtime_ns) matches the table of an existing
+    corpus at target are copied from it rather than re-read and re-split.
+    If nothing changed, the existing file is kept as it is. A corpus of
+    another format version (or any other file) at target is ignored.
+
+    Args:
+        paths (list[Path]): Files to pack, in order.
+        target (Path): Corpus file to create or update. A new corpus is
+            written beside it and renamed over it, so workers still
+            mapping the old one are unaffected.
+        reuse (bool, optional): Reuse unchanged files from an existing
+            corpus at target. Defaults to True.
+
+    Returns:
+        array[int]: The line-offset array ('Q' typecode) of the corpus,
+            line_count + 1 absolute file positions. The coordinator uses it
+            to partition the corpus between workers.
+
+    Raises:
+        FileNotFoundError: If any path doesn't exist.
+        UnicodeDecodeError: If a file is not valid text.
+
+    Example:
+        >>> offsets = build_corpus([Path('a.py'), Path('b.py')], Path('corpus.bin'))
+        >>> line_count = len(offsets) - 1
+
+    Note:
+        Files are stat'ed before they are read, so a file modified while
+        the corpus is built is re-read next time. An edit that keeps both
+        the size and the mtime (to the filesystem's resolution) is not
+        detected; pass reuse=False to force a full rebuild.
+    """
+
+    # Stat first: a change made while reading is caught by the next build
+    stamps = [Stamp.of(path) for path in paths]
+
+    with ExitStack() as stack:
+        cached = _cached_corpus(target, stack) if reuse else None
+        entries: dict[str, tuple[int, CorpusFile]] = {}
+        if cached is not None:
+            old_map, old_offsets, old_files = cached
+            keys = [(str(path), *stamp) for path, stamp in zip(paths, stamps)]
+            if [entry[:3] for entry in old_files] == keys:
+                return array("Q", old_offsets)
+            first = 0
+            for entry in old_files:
+                entries[entry.path] = (first, entry)
+                first += entry.lines
+
+        offsets = array("Q", [CORPUS_HEADER.size])
+        position = CORPUS_HEADER.size
+        files: list[CorpusFile] = []
+        partial_target = target.with_name(target.name + ".partial")
+
+        with partial_target.open("wb") as corpus:
+            # Reserve room for the header; it's rewritten once the sizes are known
+            corpus.write(bytes(CORPUS_HEADER.size))
+
+            for path, stamp in zip(paths, stamps):
+                first, entry = entries.get(str(path), (0, None))
+                if entry is not None and (entry.size, entry.mtime_ns) == stamp:
+                    # Unchanged: copy its lines and shift their offsets
+                    low = old_offsets[first]
+                    high = old_offsets[first + entry.lines]
+                    corpus.write(old_map[low:high])
+                    offsets.extend(
+                        o - low + position
+                        for o in old_offsets[first + 1 : first + entry.lines + 1]
+                    )
+                    position += high - low
+                    files.append(entry)
+                    continue
+
+                encoded = [
+                    l.encode() + b"\n" for l in split_lines(path.read_bytes())
+                ]
+                for line in encoded:
+                    position += len(line)
+                    offsets.append(position)
+                corpus.write(b"".join(encoded))
+                files.append(CorpusFile(str(path), *stamp, len(encoded)))
+
+            # Pad so the offset array is 8-byte aligned for memoryview.cast("Q")
+            corpus.write(bytes(-position % offsets.itemsize))
+            corpus.write(offsets.tobytes())
+            table = json.dumps(files).encode()
+            corpus.write(table)
+
+            corpus.seek(0)
+            corpus.write(
+                CORPUS_HEADER.pack(
+                    CORPUS_MAGIC,
+                    CORPUS_VERSION,
+                    len(offsets) - 1,
+                    position - CORPUS_HEADER.size,
+                    len(table),
+                )
+            )
+
+    # Atomically replace the old corpus; open maps keep the old inode
+    os.replace(partial_target, target)
+    return offsets
+
+
+# Trigram index file format constants
+# "<8sIQQ8s" means: 8-byte magic, format version, trigram count, line count
+# and the digest of the corpus the index was built for
+INDEX_MAGIC = b"DSTRIGRM"
+INDEX_VERSION = 2
+INDEX_HEADER = struct.Struct("<8sIQQ8s")
+
+
+def index_path(corpus: Path) -> Path:
+    """Return the trigram index file stored next to a corpus file."""
+    return corpus.with_name(corpus.name + ".trigrams")
+
+
+def _corpus_offsets(corpus: Path, corpus_map: mmap.mmap) -> memoryview:
+    """Validate a mapped corpus header and return its line-offset array.
+
+    Raises:
+        ValueError: If the file is not a corpus of the supported version.
+    """
+    magic, version, line_count, blob_size, _ = CORPUS_HEADER.unpack_from(corpus_map)
+    if magic != CORPUS_MAGIC or version != CORPUS_VERSION:
+        raise ValueError(f"{corpus} is not a version {CORPUS_VERSION} corpus")
+
+    offsets, table = _corpus_layout(line_count, blob_size)
+    return memoryview(corpus_map)[offsets:table].cast("Q")
+
+
+def _index_layout(key_count: int) -> tuple[int, int, int]:
+    """Return the file positions of the key, start, and posting arrays.
+
+    The keys (uint32) follow the header; the posting starts (uint64) and
+    postings (uint32) follow, with the starts padded to 8-byte alignment.
+    """
+    keys = INDEX_HEADER.size
+    starts = keys + 4 * key_count
+    starts += -starts % 8
+    postings = starts + 8 * (key_count + 1)
+    return keys, starts, postings
+
+
+def build_trigram_index(corpus: Path, target: Path, reuse: bool = True) -> int:
+    """Build an inverted index from byte trigrams to corpus line numbers.
+
+    Every distinct 3-byte window of a line adds the line number to that
+    trigram's posting list. Working on UTF-8 bytes rather than characters
+    is safe: a string is a substring of a line exactly when its encoding is
+    a substring of the line's encoding.
+
+    The index records the digest of the corpus file table it was built
+    from. With reuse=True an existing index at target with a matching
+    digest (same files, sizes and mtimes) is kept instead of rebuilt.
+
+    Args:
+        corpus (Path): Corpus file written by build_corpus().
+        target (Path): Index file to create, usually index_path(corpus).
+            It is written beside target and renamed over it.
+        reuse (bool, optional): Keep a current index at target. Defaults
+            to True.
+
+    Returns:
+        int: Number of distinct trigrams in the index.
+
+    Raises:
+        ValueError: If the file is not a corpus of the supported version.
+
+    Example:
+        >>> build_corpus(paths, Path('corpus.bin'))
+        >>> build_trigram_index(Path('corpus.bin'), index_path(Path('corpus.bin')))
+        4213
+    """
+
+    postings: defaultdict[bytes, array[int]] = defaultdict(lambda: array("I"))
+
+    with corpus.open("rb") as corpus_file:
+        corpus_map = mmap.mmap(corpus_file.fileno(), 0, access=mmap.ACCESS_READ)
+    with corpus_map:
+        offsets = _corpus_offsets(corpus, corpus_map)
+        line_count = len(offsets) - 1
+        digest = _corpus_digest(corpus_map)
+        try:
+            if reuse:
+                try:
+                    with TrigramIndex(target) as existing:
+                        if existing.corpus_digest == digest:
+                            return existing.key_count
+                except (OSError, ValueError):
+                    pass  # Missing, or another format version: rebuild
+            for n in range(line_count):
+                line = corpus_map[offsets[n] : offsets[n + 1] - 1]
+                for trigram in {line[i : i + 3] for i in range(len(line) - 2)}:
+                    postings[trigram].append(n)
+        finally:
+            offsets.release()
+
+    # Keys sort as big-endian integers, i.e. in byte order
+    trigrams = sorted(postings)
+    keys = array("I", (int.from_bytes(t, "big") for t in trigrams))
+    starts = array("Q", [0])
+    for trigram in trigrams:
+        starts.append(starts[-1] + len(postings[trigram]))
+
+    keys_at, starts_at, postings_at = _index_layout(len(keys))
+    partial_target = target.with_name(target.name + ".partial")
+    with partial_target.open("wb") as index:
+        index.write(
+            INDEX_HEADER.pack(INDEX_MAGIC, INDEX_VERSION, len(keys), line_count, digest)
+        )
+        index.write(keys.tobytes())
+        index.write(bytes(starts_at - keys_at - keys.itemsize * len(keys)))
+        index.write(starts.tobytes())
+        for trigram in trigrams:
+            index.write(postings[trigram].tobytes())
+
+    os.replace(partial_target, target)
+    return len(keys)
+
+
+class TrigramIndex:
+    """Read-only, memory-mapped view of a trigram index file.
+
+    Like the corpus, the index is mapped rather than loaded, so every
+    worker shares one copy of it through the page cache. Lookups binary
+    search the sorted key array, then slice posting lists in place.
+
+    Attributes:
+        key_count (int): Number of distinct trigrams.
+        line_count (int): Number of corpus lines the index covers.
+        corpus_digest (bytes): Digest of the corpus it was built for.
+
+    Example:
+        >>> with TrigramIndex(index_path(corpus)) as index:
+        ...     index.candidates(b"import", 0, index.line_count)
+        [0, 4, 17]
+    """
+
+    def __init__(self, path: Path) -> None:
+        """Map the index file and validate its header.
+
+        Args:
+            path (Path): Index file written by build_trigram_index().
+
+        Raises:
+            ValueError: If the file is not an index of the supported version.
+        """
+        with path.open("rb") as index_file:
+            self._map = mmap.mmap(index_file.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            magic, version, *counts, digest = INDEX_HEADER.unpack_from(self._map)
+        except struct.error:
+            magic = version = None
+        if magic != INDEX_MAGIC or version != INDEX_VERSION:
+            self._map.close()
+            raise ValueError(f"{path} is not a version {INDEX_VERSION} index")
+        self.key_count, self.line_count = counts
+        self.corpus_digest = digest
+
+        keys_at, starts_at, postings_at = _index_layout(self.key_count)
+        view = memoryview(self._map)
+        self._keys = view[keys_at : keys_at + 4 * self.key_count].cast("I")
+        self._starts = view[starts_at:postings_at].cast("Q")
+        self._postings = view[postings_at:].cast("I")
+        view.release()
+
+    def postings(self, trigram: bytes) -> memoryview:
+        """Return the sorted line numbers containing a trigram (maybe empty)."""
+        key = int.from_bytes(trigram, "big")
+        i = bisect_left(self._keys, key)
+        if i == len(self._keys) or self._keys[i] != key:
+            return self._postings[0:0]
+        return self._postings[self._starts[i] : self._starts[i + 1]]
+
+    def candidates(self, needle: bytes, start: int, stop: int) -> list[int]:
+        """Return lines in [start, stop) containing every trigram of needle.
+
+        The posting lists are intersected smallest first, so the work is
+        bounded by the rarest trigram. Candidates still need verifying:
+        having all the trigrams doesn't guarantee they are adjacent.
+
+        Args:
+            needle (bytes): Query of at least three bytes.
+            start (int): First line number to consider.
+            stop (int): Line number one past the last line to consider.
+
+        Returns:
+            list[int]: Candidate line numbers in ascending order.
+        """
+        lists = []
+        for trigram in {needle[i : i + 3] for i in range(len(needle) - 2)}:
+            posting = self.postings(trigram)
+            lo = bisect_left(posting, start)
+            lists.append(posting[lo : bisect_left(posting, stop, lo)])
+        lists.sort(key=len)
+
+        candidates = list(lists[0])
+        for posting in lists[1:]:
+            if not candidates:
+                break
+            candidates = [
+                n
+                for n in candidates
+                if (i := bisect_left(posting, n)) < len(posting) and posting[i] == n
+            ]
+        return candidates
+
+    def close(self) -> None:
+        """Release the array views and unmap the index file."""
+        for view in (self._keys, self._starts, self._postings):
+            view.release()
+        self._map.close()
+
+    def __enter__(self) -> TrigramIndex:
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
+
+def mapped_search(
+    corpus: Path,
+    start: int,
+    stop: int,
+    query_q: Query_Q,
+    results_q: Result_Q,
+    index: Optional[Path] = None,
+) -> None:
+    """Worker process function that searches a shared memory-mapped corpus.
+
+    The corpus-mode counterpart of search(). Instead of loading files into
+    a private list of strings, the worker maps the corpus file read-only
+    and scans its assigned line range [start, stop) with mmap.find(). Only
+    the matching lines are ever decoded into Python strings, so resident
+    memory is the shared page cache plus the result lists.
+
+    Args:
+        corpus (Path): Corpus file written by build_corpus().
+        start (int): First line number assigned to this worker.
+        stop (int): Line number one past the last line assigned.
+        query_q (Queue): Queue for receiving queries from main process: a
+            literal string, a Query envelope or a Request. A None value
+            signals the worker to terminate.
+        results_q (Queue): Queue for sending search results back to main process.
+            A Query is answered with chunks of matching lines followed by
+            None, a Request with the same wrapped in Results, and a bare
+            string with a single list of every match.
+        index (Optional[Path], optional): Trigram index for the corpus. When
+            given, queries of three or more bytes only verify the candidate
+            lines from the index instead of scanning the whole range.
+            Defaults to None.
+
+    Returns:
+        None: Function runs until termination signal received.
+
+    Raises:
+        ValueError: If the file is not a corpus of the supported version,
+            or the index doesn't match it.
+
+    Note:
+        - Results are identical to search() over the same files
+        - A query containing a newline can never match a single line
+        - Regex queries use their literal prefix (and the index) to find
+          candidate lines; only those lines are decoded and matched
+    """
+
+    print(f"PID: {os.getpid()}, lines {stop - start}")
+
+    with corpus.open("rb") as corpus_file:
+        corpus_map = mmap.mmap(corpus_file.fileno(), 0, access=mmap.ACCESS_READ)
+
+    with corpus_map, ExitStack() as stack:
+        offsets = _corpus_offsets(corpus, corpus_map)
+        # The mmap can't close while a memoryview still exports it
+        stack.callback(offsets.release)
+
+        trigrams = None
+        if index is not None:
+            trigrams = stack.enter_context(TrigramIndex(index))
+            if trigrams.corpus_digest != _corpus_digest(corpus_map):
+                raise ValueError(f"{index} doesn't match {corpus}")
+
+
+        def containing(needle: bytes) -> Iterator[Optional[int]]:
+            """Yield the numbers of the assigned lines containing needle.
+
+            As scan() does, None is yielded every SCAN_POLL lines, however
+            few match, so the worker can check for a CANCEL: the byte search
+            runs one window of SCAN_POLL lines at a time.
+            """
+            if b"\n" in needle:
+                return
+            if trigrams is not None and len(needle) >= 3:
+                # Only verify the lines holding every trigram of the needle
+                candidates = trigrams.candidates(needle, start, stop)
+                for checked, line in enumerate(candidates, 1):
+                    if corpus_map.find(needle, offsets[line], offsets[line + 1]) != -1:
+                        yield line
+                    if checked % SCAN_POLL == 0:
+                        yield None
+                return
+            for first in range(start, stop, SCAN_POLL):
+                last = min(first + SCAN_POLL, stop)
+                # A match can't span lines, so none crosses the window's end
+                end = offsets[last]
+                position = corpus_map.find(needle, offsets[first], end)
+                # An empty needle is also "found" at the window's end
+                while position != -1 and position < end:
+                    line = bisect_right(offsets, position, first, last) - 1
+                    yield line
+                    # Resume at the next line: one hit per line is enough
+                    position = corpus_map.find(needle, offsets[line + 1], end)
+                yield None
+
+        def decode(line: int) -> str:
+            """Return the text of a corpus line."""
+            return corpus_map[offsets[line] : offsets[line + 1] - 1].decode()
+
+        def matching(query: Query) -> Iterator[Optional[str]]:
+            """Lazily yield the assigned lines matching a query (see scan())."""
+            keep: Optional[Callable[[str], object]] = None
+            needle = query.text
+            if query.kind is not Kind.LITERAL:
+                # Only lines holding the literal prefix are decoded and matched
+                pattern, needle = compile_query(query)
+                keep = pattern.search
+            for line in containing(needle.encode()):
+                if line is None:
+                    yield None
+                    continue
+                text = decode(line)
+                if keep is None or keep(text):
+                    yield text
+
+        serve_queries(query_q, results_q, matching)
 
 
-from fnmatch import fnmatch
 import os
+from source_walker import walk
+
+# Directories all_source() doesn't descend into
+SEARCH_SKIP = (".tox", ".mypy_cache", "__pycache__", ".idea")
 
 
 class DirectorySearch:
@@ -139,18 +1226,34 @@ class DirectorySearch:
         query_queues (list[Queue]): One queue per worker for sending queries.
         results_queue (Queue): Shared queue for receiving results from workers.
         search_workers (list[Process]): List of active worker processes.
+        worker_bytes (list[int]): Bytes of source text assigned to each
+            worker, for checking the balance. Empty with round-robin
+            assignment, which never looks at the files.
+        stamps (dict[Path, Stamp]): Size and mtime of every loaded file,
+            as of setup_search() or the last refresh().
+        owners (dict[Path, dict[int, int]]): For each file, the workers
+            holding it (several when it was split into shards) and how
+            many of its bytes each one holds.
 
     Workflow:
         1. Initialize: ds = DirectorySearch()
         2. Setup: ds.setup_search(file_paths, cpus=4)
         3. Search: for match in ds.search('pattern'): ...
-        4. Cleanup: ds.teardown_search()
+        4. Optionally: ds.refresh(all_source(base, '*.py')) as files change
+        5. Cleanup: ds.teardown_search()
 
     Performance:
         - Scales linearly with CPU cores (up to I/O limits)
         - Each worker operates independently without GIL contention
         - Ideal for searching large codebases (1000+ files)
-        - Overhead: ~100ms setup time, ~10ms per query
+        - Measured by bench_directory_search on 1000 files of 500 lines
+          (34 MB, Python 3.11, one core, 1-2 workers): setup ~0.35-0.45s
+          including the workers' loading; p50 query ~130-150ms with line
+          lists, ~40-65ms with a corpus, and 1-25ms with a trigram index
+          for queries matching up to 1% of lines (building that index
+          took ~30s). Queries matching 10% of lines take ~185-230ms in
+          every mode, dominated by sending the results back. Re-run the
+          benchmark on the target machine rather than trusting these.
 
     Example:
         >>> ds = DirectorySearch()
@@ -165,12 +1268,17 @@ class DirectorySearch:
         >>> ds.teardown_search()
 
     Thread Safety:
-        Not thread-safe. Designed for single-threaded use with
-        multiprocessing for parallelism.
+        search() and asearch() may be called from several threads (or
+        tasks) at once: every query carries an id, and results are routed
+        to the caller that asked. setup_search(), refresh() and
+        teardown_search() are not thread-safe.
 
     Memory Considerations:
         Each worker loads its assigned files into memory. For N workers
         and M total files, each worker uses ~M/N files worth of memory.
+        Per-line string objects cost several times the on-disk size; with
+        setup_search(paths, corpus=...) the workers instead map one packed
+        corpus file, so the text lives once in the shared page cache.
     """
 
     def __init__(self) -> None:
@@ -184,8 +1292,26 @@ class DirectorySearch:
         self.query_queues: list[Query_Q]
         self.results_queue: Result_Q
         self.search_workers: list[Process]
-
-    def setup_search(self, paths: list[Path], cpus: Optional[int] = None) -> None:
+        self.worker_bytes: list[int] = []
+        self.stamps: dict[Path, Stamp] = {}
+        self.owners: dict[Path, dict[int, int]] = {}
+        self.corpus: Optional[Path] = None
+        # Query ids, and the chunks received for each query in flight
+        self._qids = count(1)
+        self._buffers: dict[int, deque[Optional[list[str]]]] = {}
+        self._ready = threading.Condition()
+        self._reading = False
+
+    def setup_search(
+        self,
+        paths: list[Path],
+        cpus: Optional[int] = None,
+        corpus: Optional[Path] = None,
+        index: bool = False,
+        balance: Balance = Balance.ROUND_ROBIN,
+        split: bool = False,
+        reuse: bool = True,
+    ) -> None:
         """Initialize worker processes for parallel searching.
 
         Creates and starts a pool of worker processes, distributing files
@@ -200,11 +1326,37 @@ class DirectorySearch:
         - Worker 1: files [1, 4, 7]
         - Worker 2: files [2, 5, 8]
 
+        Round-robin ignores file sizes, so two huge files can land on the
+        same worker and make it the straggler for every query. With
+        balance="size" or balance="lines" the files are bin-packed by
+        weight instead (see partition()), optionally splitting huge files
+        into line-aligned shards across several workers.
+
         Args:
             paths (list[Path]): All file paths to be searched.
             cpus (Optional[int], optional): Number of worker processes to create.
                 If None, uses cpu_count() to match CPU core count.
                 Defaults to None.
+            corpus (Optional[Path], optional): If given, pack all files into
+                this corpus file and start mapped_search() workers that share
+                it through the page cache. Each worker is assigned a
+                contiguous line range holding about 1/cpus of the bytes.
+                Defaults to None (each worker loads private line lists).
+            index (bool, optional): In corpus mode, also build a trigram
+                index persisted next to the corpus (see index_path()) so
+                each query only verifies candidate lines. Worthwhile when
+                many queries are run against one corpus. Defaults to False.
+            balance (Balance, optional): How to assign files to workers:
+                Balance.ROUND_ROBIN, Balance.SIZE or Balance.LINES (or the
+                strings "round-robin", "size", "lines"). Ignored in corpus
+                mode, which always splits the blob into equal byte ranges.
+                Defaults to Balance.ROUND_ROBIN.
+            split (bool, optional): With SIZE or LINES balance, cut files
+                larger than an even share into byte-range Shards loaded by
+                different workers. Defaults to False.
+            reuse (bool, optional): In corpus mode, treat an existing corpus
+                (and index) as a cache: only files whose size or mtime
+                changed are re-read. Defaults to True.
 
         Returns:
             None
@@ -229,6 +1381,8 @@ class DirectorySearch:
             - Setup time: O(N/P) where N=files, P=processes
             - Memory per worker: ~(total_file_size / cpu_count)
             - Each worker prints its PID and file count
+            - worker_bytes holds the per-worker byte totals (except with
+              round-robin), e.g. max(ds.worker_bytes) / min(ds.worker_bytes)
 
         Note:
             Must be called before search() and only once per instance.
@@ -239,26 +1393,168 @@ class DirectorySearch:
         if cpus is None:
             cpus = cpu_count()
 
-        # Distribute paths evenly across workers using round-robin
-        # worker_paths[i] contains every cpus-th file starting at index i
-        worker_paths = [paths[i::cpus] for i in range(cpus)]
-
         # Create one query queue per worker for sending queries
         self.query_queues = [Queue() for p in range(cpus)]
 
         # Create shared results queue for all workers to return results
         self.results_queue = Queue()
 
-        # Create and configure worker processes
-        self.search_workers = [
-            Process(target=search, args=(paths, q, self.results_queue))
-            for paths, q in zip(worker_paths, self.query_queues)
-        ]
+        balance = Balance(balance)
+        self.corpus = corpus
+        if corpus is None:
+            # Stat before the workers read, so a change in between is seen
+            # by the first refresh()
+            self.stamps = {path: Stamp.of(path) for path in paths}
+            if balance is Balance.ROUND_ROBIN:
+                # Distribute paths evenly across workers using round-robin
+                # worker_paths[i] contains every cpus-th file starting at index i
+                worker_paths = [paths[i::cpus] for i in range(cpus)]
+                self.worker_bytes = []
+            else:
+                worker_paths, self.worker_bytes = partition(paths, cpus, balance, split)
+            self.owners = defaultdict(dict)
+            for worker, sources in enumerate(worker_paths):
+                for source in sources:
+                    if isinstance(source, Shard):
+                        held = self.owners[source.path].get(worker, 0)
+                        size = held + source.stop - source.start
+                        self.owners[source.path][worker] = size
+                    else:
+                        self.owners[source][worker] = self.stamps[source].size
+
+            # Create and configure worker processes
+            self.search_workers = [
+                Process(target=search, args=(paths, q, self.results_queue))
+                for paths, q in zip(worker_paths, self.query_queues)
+            ]
+        else:
+            # Pack the files once, then cut the blob into equal byte ranges
+            # aligned on line boundaries
+            offsets = build_corpus(paths, corpus, reuse)
+            line_count = len(offsets) - 1
+            first, last = offsets[0], offsets[-1]
+            bounds = [0]
+            for i in range(1, cpus):
+                target = first + (last - first) * i // cpus
+                bounds.append(max(bounds[-1], bisect_right(offsets, target) - 1))
+            bounds.append(line_count)
+            self.worker_bytes = [
+                offsets[stop] - offsets[start]
+                for start, stop in zip(bounds, bounds[1:])
+            ]
+
+            trigrams = None
+            if index:
+                trigrams = index_path(corpus)
+                build_trigram_index(corpus, trigrams, reuse)
+
+            self.search_workers = [
+                Process(
+                    target=mapped_search,
+                    args=(corpus, start, stop, q, self.results_queue, trigrams),
+                )
+                for start, stop, q in zip(bounds, bounds[1:], self.query_queues)
+            ]
 
         # Start all worker processes
         for proc in self.search_workers:
             proc.start()
 
+    def refresh(self, paths: Iterable[Path]) -> Refresh:
+        """Bring long-lived workers up to date with the files on disk.
+
+        Compares the size and mtime of every file in paths (typically a
+        fresh all_source() scan) with the snapshot taken when the files
+        were loaded, and sends only the affected workers a "drop" or
+        "load" Command:
+        - A changed file is reloaded by the worker that holds it; a file
+          split into shards is dropped by all its workers and reloaded
+          whole by the least loaded one
+        - An added file is loaded by the least loaded worker
+        - A removed file is dropped by its workers
+
+        The commands queue behind any query in progress, and each worker
+        applies its own commands between two queries. So a query sees
+        either the old or the new version of a whole file that stays with
+        one worker, never a mix. A file moving between workers (a split
+        file reloaded whole, or a new file) has no such guarantee: the
+        query can reach each worker before or after its command, and see
+        only some of the old shards, none of the file, or old shards next
+        to the new version. Search again after refresh() returns when that
+        matters.
+
+        Args:
+            paths (Iterable[Path]): Every file that should now be searched.
+
+        Returns:
+            Refresh: The added, changed and removed files.
+
+        Raises:
+            RuntimeError: In corpus mode, where the workers share one
+                packed file that can't be patched in place.
+
+        Example:
+            >>> ds.setup_search(list(all_source(base, '*.py')))
+            >>> # ... an hour later ...
+            >>> report = ds.refresh(all_source(base, '*.py'))
+            >>> print(f"{len(report.changed)} files reloaded")
+        """
+
+        if self.corpus is not None:
+            raise RuntimeError("refresh() needs list workers, not a corpus")
+
+        current: dict[Path, Stamp] = {}
+        for path in paths:
+            try:
+                current[path] = Stamp.of(path)
+            except FileNotFoundError:
+                pass  # Removed since the scan, so it's gone
+        report = Refresh(
+            added=[path for path in current if path not in self.stamps],
+            changed=[
+                path
+                for path, stamp in current.items()
+                if path in self.stamps and stamp != self.stamps[path]
+            ],
+            removed=[path for path in self.stamps if path not in current],
+        )
+
+        # Each worker's load is the bytes of the files (or shards) it holds
+        loads = [0] * len(self.query_queues)
+        for held in self.owners.values():
+            for worker, size in held.items():
+                loads[worker] += size
+
+        drops: defaultdict[int, list[Path]] = defaultdict(list)
+        reloads: defaultdict[int, list[Path]] = defaultdict(list)
+        for path in report.removed + report.changed + report.added:
+            held = self.owners.pop(path, {})
+            for worker, size in held.items():
+                loads[worker] -= size
+            if path in current and len(held) == 1:
+                # A whole file is reloaded where it is
+                (worker,) = held
+            else:
+                for worker in held:
+                    drops[worker].append(path)
+                if path not in current:
+                    continue
+                # A new or previously split file goes to the lightest worker
+                worker = min(range(len(loads)), key=loads.__getitem__)
+            loads[worker] += current[path].size
+            self.owners[path] = {worker: current[path].size}
+            reloads[worker].append(path)
+
+        for worker, dropped in drops.items():
+            self.query_queues[worker].put(Command("drop", tuple(dropped)))
+        for worker, loaded in reloads.items():
+            self.query_queues[worker].put(Command("load", tuple(loaded)))
+
+        self.stamps = current
+        if self.worker_bytes:
+            self.worker_bytes = loads
+        return report
+
     def teardown_search(self) -> None:
         """Gracefully shutdown all worker processes.
 
@@ -309,22 +1605,100 @@ class DirectorySearch:
         for proc in self.search_workers:
             proc.join()  # Blocks until process terminates
 
-    def search(self, target: str) -> Iterator[str]:
+    def _submit(self, query: Query) -> int:
+        """Send a query to every worker under a new id, and start its buffer."""
+        if query.kind is not Kind.LITERAL:
+            # Fail here on a bad pattern rather than inside every worker
+            compile_query(query)
+        with self._ready:
+            qid = next(self._qids)
+            self._buffers[qid] = deque()
+        for q in self.query_queues:
+            q.put(Request(qid, query))
+        return qid
+
+    def _receive(self, qid: int) -> Optional[list[str]]:
+        """Return the next chunk, or end marker (None), for one query.
+
+        Queries share the results queue, so whichever caller finds its
+        buffer empty becomes the reader: it takes one Result off the queue
+        and appends it to the buffer of the query it belongs to, while the
+        other callers wait to be woken. Results of queries that were
+        already finished or cancelled are dropped.
+        """
+        with self._ready:
+            # A query forgotten meanwhile (its caller went away) has ended
+            while (buffer := self._buffers.get(qid)) is not None and not buffer:
+                if self._reading:
+                    self._ready.wait()
+                    continue
+                self._reading = True
+                self._ready.release()
+                try:
+                    result = self.results_queue.get()
+                finally:
+                    self._ready.acquire()
+                    self._reading = False
+                    self._ready.notify_all()
+                if result.qid in self._buffers:
+                    self._buffers[result.qid].append(result.lines)
+            return buffer.popleft() if buffer else None
+
+    def _finish(self, qid: int, running: int) -> None:
+        """Forget a query, cancelling and draining it on the workers still running it.
+
+        A worker process can't exit while results it queued are unread, so
+        the chunks still in flight are read and dropped, up to the end
+        marker of every running worker; left on the queue, they would make
+        teardown_search() wait forever.
+        """
+        try:
+            for q in self.query_queues if running else ():
+                q.put(Command("cancel", (qid,)))
+            while running:
+                if self._receive(qid) is None:
+                    running -= 1
+        finally:
+            with self._ready:
+                del self._buffers[qid]
+                self._ready.notify_all()
+
+    def search(
+        self,
+        target: str,
+        kind: Kind = Kind.LITERAL,
+        flags: int = 0,
+        limit: Optional[int] = None,
+    ) -> Iterator[str]:
         """Search all loaded files for a target string.
 
         Distributes the search query to all worker processes and yields
         matching lines as they arrive. Each worker:
-        1. Receives the query from its queue
+        1. Receives the query, tagged with a query id, from its queue
         2. Searches its loaded files for the target string
-        3. Returns matching lines via the results queue
+        3. Streams matching lines via the results queue in bounded chunks,
+           then sends an end-of-query marker, each tagged with the id
 
         The method sends the query to all workers simultaneously, allowing
-        parallel searching across different file subsets. Results are collected
-        and yielded as they become available.
+        parallel searching across different file subsets. Lines are yielded
+        as soon as any worker's chunk arrives, without waiting for the
+        slowest worker to finish.
+
+        Several searches may be in flight at once, from different threads
+        or by interleaving generators: the workers queue them, and the ids
+        route each chunk to the search it belongs to.
 
         Args:
             target (str): The text string to search for in files.
-                Uses simple substring matching (case-sensitive).
+                Uses simple substring matching (case-sensitive) unless
+                kind says otherwise.
+            kind (Kind, optional): Kind.LITERAL, Kind.REGEX (target is a
+                regular expression) or Kind.CASEFOLD (case-insensitive
+                substring). Defaults to Kind.LITERAL.
+            flags (int, optional): re flags for regex queries, e.g.
+                re.IGNORECASE | re.ASCII. Defaults to 0.
+            limit (Optional[int], optional): Stop after this many lines and
+                cancel the workers still scanning. Defaults to None (all).
 
         Yields:
             str: Lines containing the target string, one at a time.
@@ -333,6 +1707,9 @@ class DirectorySearch:
         Returns:
             Iterator[str]: Generator yielding matching lines.
 
+        Raises:
+            re.error: If a regex query is not a valid regular expression.
+
         Example:
             >>> ds = DirectorySearch()
             >>> ds.setup_search(paths)
@@ -345,6 +1722,17 @@ class DirectorySearch:
             >>> # Count matches
             >>> match_count = sum(1 for _ in ds.search('class'))
             >>> print(f"Found {match_count} class definitions")
+            >>>
+            >>> # Alternation and case-insensitive matching in one pass
+            >>> hits = list(ds.search('^(class|def) ', Kind.REGEX))
+            >>> todos = list(ds.search('todo', Kind.CASEFOLD))
+            >>>
+            >>> # First page of a broad query; the rest is never produced
+            >>> first_page = list(ds.search('import', limit=50))
+            >>>
+            >>> # Concurrent callers share the pool
+            >>> with ThreadPoolExecutor(8) as pool:
+            ...     counts = list(pool.map(lambda t: len(list(ds.search(t))), terms))
 
         Performance:
             - Time complexity: O(N/P) where N=total lines, P=processes
@@ -357,28 +1745,83 @@ class DirectorySearch:
             file order. This is non-deterministic between runs.
 
         Thread Safety:
-            Not thread-safe. Call from the same thread that called
-            setup_search().
+            Safe to call from several threads at once, once setup_search()
+            has returned. Don't call refresh() or teardown_search() while
+            searches are running.
 
         Note:
             - Must call setup_search() before using this method
             - Can be called multiple times with different queries
             - Each query is independent (stateless)
-            - Simple substring matching (consider regex for complex patterns)
+            - The query is sent when iteration starts
+            - Closing the generator early (break, limit) cancels the query
+              on the workers; chunks still in flight are read and discarded
+              before the generator closes
         """
 
         # Debug output showing active query queues
         print(f"search queues={self.query_queues}")
 
-        # Send query to all workers simultaneously
-        for q in self.query_queues:
-            q.put(target)
+        qid = self._submit(Query(target, Kind(kind), flags))
+
+        # Collect chunks until every worker has sent its end marker
+        running = len(self.query_queues)
+        yielded = 0
+        try:
+            while running and yielded != limit:
+                # Get this query's next chunk (blocks until available)
+                if (chunk := self._receive(qid)) is None:
+                    running -= 1
+                    continue
+                for match in chunk[: None if limit is None else limit - yielded]:
+                    yield match
+                    yielded += 1
+        finally:
+            self._finish(qid, running)
+
+    async def asearch(
+        self,
+        target: str,
+        kind: Kind = Kind.LITERAL,
+        flags: int = 0,
+        limit: Optional[int] = None,
+    ) -> AsyncIterator[str]:
+        """Asynchronous version of search() for asyncio front ends.
+
+        Waiting for each chunk happens in a thread (asyncio.to_thread), so
+        the event loop keeps serving other requests, each of which can
+        have its own query in flight.
+
+        Args:
+            target (str): The text to search for.
+            kind (Kind, optional): How target is matched. Defaults to
+                Kind.LITERAL.
+            flags (int, optional): re flags for regex queries. Defaults to 0.
+            limit (Optional[int], optional): Stop after this many lines.
+                Defaults to None (all).
 
-        # Collect results from all workers
-        for i in range(len(self.query_queues)):
-            # Get results from one worker (blocks until available)
-            for match in self.results_queue.get():
-                yield match
+        Yields:
+            str: Matching lines, as the workers return them.
+
+        Example:
+            >>> async def handler(request):
+            ...     return [line async for line in ds.asearch(request.query, limit=100)]
+        """
+
+        qid = self._submit(Query(target, Kind(kind), flags))
+        running = len(self.query_queues)
+        yielded = 0
+        try:
+            while running and yielded != limit:
+                if (chunk := await asyncio.to_thread(self._receive, qid)) is None:
+                    running -= 1
+                    continue
+                for match in chunk[: None if limit is None else limit - yielded]:
+                    yield match
+                    yielded += 1
+        finally:
+            # Draining waits for the workers, so off the event loop
+            await asyncio.to_thread(self._finish, qid, running)
 
 
 def all_source(path: Path, pattern: str) -> Iterator[Path]:
@@ -388,9 +1831,9 @@ def all_source(path: Path, pattern: str) -> Iterator[Path]:
     specified pattern. Automatically skips common directories that typically
     don't contain source code (caches, virtual environments, IDE directories).
 
-    The function modifies the dirs list in-place during os.walk to prevent
-    descending into excluded directories, improving performance on large
-    directory trees.
+    The walk itself is done by source_walker.walk(), which prunes excluded
+    directories without listing them, using os.scandir and a compiled
+    skip pattern.
 
     Args:
         path (Path): Root directory to start searching from.
@@ -422,9 +1865,9 @@ def all_source(path: Path, pattern: str) -> Iterator[Path]:
         - .idea: PyCharm/IntelliJ IDE directory
 
     Performance:
-        - Efficient tree traversal using os.walk
-        - In-place dir list modification prevents unnecessary recursion
-        - Pattern matching uses fnmatch (shell-style wildcards)
+        - Efficient tree traversal using os.scandir (cached entry types)
+        - Excluded directories are never listed
+        - Pattern matching uses one precompiled regular expression
 
     Note:
         This is significantly faster than using Path.glob('**/*.py') with
@@ -436,16 +1879,8 @@ def all_source(path: Path, pattern: str) -> Iterator[Path]:
         Pythonic but much slower due to inefficient filtering.
     """
 
-    # Walk through directory tree
-    for root, dirs, files in os.walk(path):
-        # Remove directories to skip from the dirs list in-place
-        # This prevents os.walk from descending into them
-        for skip in {".tox", ".mypy_cache", "__pycache__", ".idea"}:
-            if skip in dirs:
-                dirs.remove(skip)
-
-        # Yield matching files from current directory
-        yield from (Path(root) / f for f in files if fnmatch(f, pattern))
+    # Walk through directory tree, pruning the directories to skip
+    yield from walk(path, pattern, SEARCH_SKIP)
 
 
 # Alternative Implementation: Path.glob-based approach
@@ -457,7 +1892,7 @@ def all_source(path: Path, pattern: str) -> Iterator[Path]:
 # 2. Checks every path component for exclusion criteria
 # 3. Cannot prune excluded directories during traversal
 #
-# The os.walk-based implementation above is 5-10x faster for typical
+# The pruning walk used above is 5-10x faster for typical
 # projects with virtual environments and cache directories.
 #
 # def all_source(path: Path) -> Iterator[Path]:
@@ -525,19 +1960,19 @@ if __name__ == "__main__":
     # Search for common Python keywords and measure performance
     for target in ("import", "class", "def"):
         start = time.perf_counter()
-        count = 0
+        matches = 0
 
         # Perform search and count results
         for line in ds.search(target):
             # print(line)  # Uncomment to see matching lines
-            count += 1
+            matches += 1
 
         # Calculate elapsed time in milliseconds
         milliseconds = 1000 * (time.perf_counter() - start)
 
         # Report results
         print(
-            f"Found {count} {target!r} in {len(all_paths)} files "
+            f"Found {matches} {target!r} in {len(all_paths)} files "
             f"in {milliseconds:.3f}ms"
         )
 
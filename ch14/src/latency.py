@@ -0,0 +1,51 @@
+"""Percentile Summaries of Timing Samples.
+
+This module holds the one quantile helper shared by the benchmarks and the
+profilers: bench_directory_search reports query latency with it, and
+code_search's profile summarizes per-phase timings with it, so both agree
+on how a percentile is computed.
+
+Percentiles use statistics.quantiles() with the "inclusive" method, which
+treats the samples as the whole population: p50 of three samples is the
+middle one, and no percentile exceeds the largest sample. A single sample
+is every percentile.
+
+Example Usage:
+    >>> from latency import percentiles
+    >>> percentiles([0.010, 0.020, 0.030])
+    {'p50_ms': 20.0, 'p95_ms': 29.0, 'p99_ms': 29.8}
+"""
+
+import statistics
+from typing import Iterable
+
+# Percentiles reported unless others are asked for
+PERCENTILES = (50, 95, 99)
+
+
+def percentiles(
+    samples: list[float], points: Iterable[int] = PERCENTILES
+) -> dict[str, float]:
+    """Summarize durations as percentiles, in milliseconds.
+
+    Args:
+        samples (list[float]): Durations in seconds; at least one.
+        points (Iterable[int], optional): Percentiles to report, each from
+            1 to 99. Defaults to PERCENTILES.
+
+    Returns:
+        dict[str, float]: A "p<N>_ms" key per percentile, rounded to the
+            microsecond.
+
+    Raises:
+        statistics.StatisticsError: If samples is empty.
+
+    Example:
+        >>> percentiles([0.010, 0.020, 0.030], (50, 90))
+        {'p50_ms': 20.0, 'p90_ms': 28.0}
+    """
+    if len(samples) == 1:
+        cuts = samples * 99
+    else:
+        cuts = statistics.quantiles(samples, n=100, method="inclusive")
+    return {f"p{p}_ms": round(1000 * cuts[p - 1], 3) for p in points}
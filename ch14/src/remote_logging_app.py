@@ -16,7 +16,8 @@ Key Features:
 Logging Architecture:
     - Each process creates a logger with name "app_{pid}"
     - Each Sorter instance creates a child logger "app_{pid}.{ClassName}"
-    - SocketHandler sends pickled LogRecords to remote server
+    - SocketHandler sends pickled LogRecords to remote server (or
+      JSONSocketHandler sends them as JSON objects)
     - StreamHandler outputs to stderr for local debugging
     - Both handlers configured at INFO level
 
@@ -52,6 +53,8 @@ Performance Notes:
 
 Security Warning:
     - SocketHandler sends pickled objects over network
+    - JSONSocketHandler sends plain JSON, which a server can read without
+      unpickling anything
     - Only use with trusted log servers
     - Consider encrypting connections for sensitive data
 """
@@ -59,10 +62,12 @@ Security Warning:
 from __future__ import annotations
 import abc
 from itertools import permutations
+import json
 import logging
 import logging.handlers
 import os
 import random
+import struct
 import time
 import sys
 from typing import Iterable
@@ -70,6 +75,41 @@ from typing import Iterable
 logger = logging.getLogger(f"app_{os.getpid()}")
 
 
+# The same handler as in ch13/src/remote_logging_app.py: each chapter stands
+# alone, so a fix to one copy goes in both (TestChapterCopies)
+class JSONSocketHandler(logging.handlers.SocketHandler):
+    """A SocketHandler that sends each record as a compact JSON object.
+
+    The frames are those of SocketHandler, a 4-byte big-endian length and
+    the payload, and the record's dict is prepared the same way (message
+    formatted, args and exc_info dropped, traceback in exc_text). Only the
+    payload differs: JSON text, which log_catcher writes to its log as it
+    is, instead of a pickle it has to load and dump again. log_catcher
+    tells the formats apart by the first payload of each connection.
+
+    Attributes whose values aren't JSON types, e.g. objects passed in
+    extra=, are sent as their str().
+
+    Example:
+        >>> handler = JSONSocketHandler("localhost", 18842)
+        >>> logging.basicConfig(handlers=[handler], level=logging.INFO)
+    """
+
+    def makePickle(self, record: logging.LogRecord) -> bytes:
+        """Frame the record as JSON (the name is SocketHandler's hook)."""
+        if record.exc_info:
+            # Formats the traceback into record.exc_text
+            self.format(record)
+        record_dict = dict(record.__dict__)
+        record_dict["msg"] = record.getMessage()
+        record_dict["args"] = None
+        record_dict["exc_info"] = None
+        record_dict.pop("message", None)
+        payload = json.dumps(record_dict, default=str, separators=(",", ":"))
+        data = payload.encode("utf-8")
+        return struct.pack(">L", len(data)) + data
+
+
 class Sorter(abc.ABC):
     """Abstract base class for sorting algorithms with integrated logging.
 
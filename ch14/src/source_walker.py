@@ -0,0 +1,183 @@
+"""Fast Source Tree Walker with Compiled Ignore Rules.
+
+This module provides the directory walker shared by directory_search and
+code_search. Both used to run os.walk and, in every directory, loop over a
+set of names to skip with dirs.remove() and call fnmatch() on each file
+name. That costs a Python-level loop per directory and a pattern
+translation per file, and it silently ignored glob entries such as
+"*.egg-info", which were only ever compared as literal names.
+
+Instead, walk():
+    - Uses os.scandir, whose DirEntry objects cache the file type reported
+      by the directory listing, so telling files from directories usually
+      needs no extra stat() call
+    - Compiles all skip patterns into one regular expression, and the file
+      pattern into another, once per walk
+    - Can fan out across top-level subdirectories with a thread pool, which
+      pays off on cold network filesystems where every listing waits on a
+      round trip rather than on the CPU
+
+Traversal order matches os.walk (top-down): a directory's matching files
+come first, then its subdirectories in listing order. Symbolic links to
+directories are not followed, as with os.walk's default.
+
+Example Usage:
+    >>> from source_walker import walk, SOURCE_SKIP
+    >>> for path in walk(Path('/project'), '*.py'):
+    ...     print(path)
+    >>>
+    >>> # Cold NFS checkout: list up to 16 top-level directories at once
+    >>> paths = list(walk(Path('/mnt/src'), '*.py', workers=16))
+"""
+
+from concurrent import futures
+from fnmatch import translate
+import os
+from pathlib import Path
+import re
+from typing import Iterable, Iterator, Optional
+
+# Directories that typically don't contain project source code
+# Entries are glob patterns matched against the directory name
+SOURCE_SKIP = (
+    # Virtual environments
+    ".venv",
+    "venv",
+    "env",
+    ".env",
+    "ENV",
+    # Version control
+    ".git",
+    # Python caches
+    "__pycache__",
+    ".pytest_cache",
+    ".mypy_cache",
+    ".ruff_cache",
+    # Build and distribution artifacts
+    "build",
+    "dist",
+    "*.egg-info",
+    ".eggs",
+    "site-packages",
+    # Testing and coverage
+    ".tox",
+    ".nox",
+    ".hypothesis",
+    ".coverage",
+    "htmlcov",
+    # IDE and editor directories
+    ".idea",
+    ".vscode",
+    "node_modules",
+)
+
+
+def compile_globs(patterns: Iterable[str]) -> re.Pattern[str]:
+    """Combine glob patterns into a single compiled regular expression.
+
+    Each pattern is translated with fnmatch.translate() and the results are
+    joined into one alternation, so a name is tested against every pattern
+    with a single match() call.
+
+    Args:
+        patterns (Iterable[str]): Shell-style patterns, e.g. '*.egg-info'.
+
+    Returns:
+        re.Pattern[str]: Matches a name fitting any of the patterns. With
+            no patterns, it matches nothing.
+
+    Example:
+        >>> skip = compile_globs(['.git', '*.egg-info'])
+        >>> bool(skip.match('demo.egg-info')), bool(skip.match('src'))
+        (True, False)
+
+    Note:
+        Matching is case-sensitive on every platform (like fnmatchcase).
+    """
+    translated = [translate(pattern) for pattern in patterns]
+    return re.compile("|".join(translated) if translated else "(?!)")
+
+
+def _scan(
+    directory: str, matches: re.Pattern[str], skip: re.Pattern[str]
+) -> tuple[list[str], list[str]]:
+    """List one directory: the matching files and the subdirectories to visit."""
+    files, subdirs = [], []
+    with os.scandir(directory) as entries:
+        for entry in entries:
+            # DirEntry caches the type from the listing; no stat() needed
+            if entry.is_dir():
+                if not entry.is_symlink() and not skip.match(entry.name):
+                    subdirs.append(entry.path)
+            elif matches.match(entry.name):
+                files.append(entry.path)
+    return files, subdirs
+
+
+def _walk_tree(
+    top: str, matches: re.Pattern[str], skip: re.Pattern[str]
+) -> Iterator[str]:
+    """Yield the matching files under top, depth first, in os.walk order."""
+    stack = [top]
+    while stack:
+        directory = stack.pop()
+        try:
+            files, subdirs = _scan(directory, matches, skip)
+        except OSError:
+            continue  # Unreadable or vanished, as os.walk skips it
+        yield from files
+        # Reversed, so the first subdirectory is visited first
+        stack.extend(reversed(subdirs))
+
+
+def walk(
+    path: Path,
+    pattern: str,
+    skip: Iterable[str] = SOURCE_SKIP,
+    workers: Optional[int] = None,
+) -> Iterator[Path]:
+    """Recursively find all files matching a pattern in a directory tree.
+
+    Directories whose name matches any skip pattern are pruned without
+    being listed. Files are matched by name against pattern.
+
+    Args:
+        path (Path): Root directory to start searching from.
+        pattern (str): File name pattern (glob-style), e.g. '*.py'.
+        skip (Iterable[str], optional): Glob patterns of directory names
+            to prune. Defaults to SOURCE_SKIP.
+        workers (Optional[int], optional): If given, walk each top-level
+            subdirectory in a thread pool of this size. Useful on high
+            latency filesystems; on a local disk the sequential walk is
+            usually as fast. Defaults to None (sequential).
+
+    Yields:
+        Path: Matching files, in the same order with or without workers.
+
+    Example:
+        >>> list(walk(Path('/project'), '*.py', skip=['.git', 'build']))
+        [Path('/project/setup.py'), Path('/project/pkg/core.py')]
+
+    Note:
+        With workers, each top-level subtree is collected in full before
+        its files are yielded, so the first result arrives later.
+    """
+    matches = compile_globs([pattern])
+    skip_dirs = compile_globs(skip)
+
+    if workers is None:
+        yield from map(Path, _walk_tree(os.fspath(path), matches, skip_dirs))
+        return
+
+    try:
+        files, subdirs = _scan(os.fspath(path), matches, skip_dirs)
+    except OSError:
+        return
+    yield from map(Path, files)
+
+    with futures.ThreadPoolExecutor(workers) as pool:
+        subtrees = pool.map(
+            lambda top: list(_walk_tree(top, matches, skip_dirs)), subdirs
+        )
+        for subtree in subtrees:
+            yield from map(Path, subtree)
@@ -0,0 +1,148 @@
+"""Test suite for the ast_query module.
+
+Covers dotted names, the built-in collectors, dispatch of one walk to
+several collectors, registering new collectors, aggregation over the
+process pool, and the command-line front end.
+"""
+
+import ast
+from collections import Counter
+import sys
+from pathlib import Path
+
+# Add src directory to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from pytest import fixture, mark, raises
+import ast_query
+from ast_query import MultiVisitor
+
+SOURCE = '''\
+import os, os.path
+from dataclasses import dataclass
+from . import sibling
+
+
+@dataclass
+class Point:
+    x: int
+
+
+class Shape(Base):
+    @property
+    def area(self):
+        return self.width * self.height
+
+    @mark.parametrize("n", [1])
+    async def grow(self, n):
+        self.items.append(len(os.path.join("a", "b")))
+        handlers[0].run()
+'''
+
+
+@fixture
+def project(tmp_path):
+    (tmp_path / "pkg").mkdir()
+    (tmp_path / "pkg" / "shapes.py").write_text(SOURCE)
+    (tmp_path / "main.py").write_text("import os\nprint(len([]))\n")
+    (tmp_path / "more.py").write_text("class Point: pass\nprint()\n")
+    return tmp_path
+
+
+@mark.parametrize(
+    "expression, expected",
+    [
+        ("name", "name"),
+        ("os.path.join", "os.path.join"),
+        ("app.route('/')", "app.route"),
+        ("handlers[0].run", None),
+        ("(lambda: 0)()", None),
+    ],
+)
+def test_dotted(expression, expected):
+    node = ast.parse(expression, mode="eval").body
+    assert ast_query.dotted(node) == expected
+
+
+def test_builtin_collectors():
+    visitor = MultiVisitor(ast_query.COLLECTORS)
+    visitor.visit(ast.parse(SOURCE))
+    counts = visitor.counts
+    assert counts["imports"] == Counter({"os": 1, "os.path": 1, "dataclasses": 1})
+    assert counts["classes"] == Counter({"Point": 1, "Shape": 1})
+    assert counts["decorators"] == Counter(
+        {"dataclass": 1, "property": 1, "mark.parametrize": 1}
+    )
+    # A decorator with arguments is a call too
+    assert counts["calls"] == Counter(
+        {"mark.parametrize": 1, "self.items.append": 1, "len": 1, "os.path.join": 1}
+    )
+    assert counts["attributes"]["append"] == counts["attributes"]["path"] == 1
+    assert counts["attributes"]["run"] == 1
+
+
+def test_one_walk(monkeypatch):
+    """Every collector is served by a single ast.walk()."""
+    walks = []
+    real = ast.walk
+    monkeypatch.setattr(
+        ast_query.ast, "walk", lambda tree: walks.append(tree) or real(tree)
+    )
+    visitor = MultiVisitor(["calls", "classes", "decorators", "calls"])
+    visitor.visit(ast.parse(SOURCE))
+    assert len(walks) == 1
+    assert list(visitor.counts) == ["calls", "classes", "decorators"]
+    assert visitor.counts["calls"]["len"] == 1
+
+
+def test_register(monkeypatch):
+    monkeypatch.setattr(ast_query, "COLLECTORS", dict(ast_query.COLLECTORS))
+
+    @ast_query.register("returns", ast.Return)
+    def returns(node):
+        return [type(node.value).__name__]
+
+    assert returns(ast.parse("return 1").body[0]) == ["Constant"]
+    visitor = MultiVisitor(["returns"])
+    visitor.visit(ast.parse(SOURCE))
+    assert visitor.counts == {"returns": Counter({"BinOp": 1})}
+
+
+def test_unknown_collector():
+    with raises(ValueError, match="unknown collector 'nope'"):
+        MultiVisitor(["calls", "nope"])
+
+
+@mark.parametrize("batch", [1, 2, 64])
+def test_query(project, batch):
+    paths = sorted(ast_query.SourceRoots([project]).walk())
+    counts = ast_query.query(paths, ["calls", "classes"], workers=2, batch=batch)
+    assert list(counts) == ["calls", "classes"]
+    assert counts["classes"] == Counter({"Point": 2, "Shape": 1})
+    assert counts["calls"]["len"] == 2
+    assert counts["calls"]["print"] == 2
+
+
+def test_query_syntax_error(tmp_path):
+    (tmp_path / "bad.py").write_text("def broken(\n")
+    with raises(SyntaxError):
+        ast_query.query([tmp_path / "bad.py"], ["calls"], workers=1)
+
+
+def test_get_options():
+    options = ast_query.get_options(["src", "--collect", "calls", "--top", "3"])
+    assert options.root == [Path("src")]
+    assert options.collect == ["calls"] and options.top == 3
+    assert ast_query.get_options([]).collect == list(ast_query.COLLECTORS)
+
+
+def test_main(project, capsys):
+    ast_query.main([project], ["classes", "imports"], top=1, workers=1)
+    out, err = capsys.readouterr()
+    assert out.splitlines() == [
+        "classes (3 in total, 2 distinct)",
+        "       2 Point",
+        "imports (4 in total, 3 distinct)",
+        "       2 os",
+    ]
+    assert err.startswith("Queried 3 files in ")
@@ -0,0 +1,102 @@
+"""Test suite for the bench_directory_search module.
+
+Covers the synthetic corpus (size, skew and marker selectivity), the
+percentile summary, and one small end-to-end benchmark run with real
+worker processes.
+"""
+
+import json
+import sys
+from pathlib import Path
+
+# Add src directory to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from pytest import *
+import bench_directory_search as bench
+
+
+def test_marker():
+    """Test each selectivity maps to its marker word."""
+
+    assert bench.marker(0.0) == "absent"
+    assert bench.marker(0.001) == "m1000x"
+    assert bench.marker(1.0) == "m1x"
+
+
+@mark.parametrize("skew", ["uniform", "zipf"])
+def test_make_corpus(tmp_path, skew):
+    """Test the corpus has the requested size and marker frequencies."""
+
+    shape = bench.Shape(files=10, lines=100, skew=skew)
+    paths = bench.make_corpus(tmp_path, shape)
+    lines = [l for p in paths for l in p.read_text().splitlines()]
+    sizes = [len(p.read_text().splitlines()) for p in paths]
+
+    assert len(paths) == 10
+    assert abs(len(lines) - 1000) <= 10
+    assert (sizes[0] > 5 * sizes[-1]) == (skew == "zipf")
+    assert sum("m10x" in l.split() for l in lines) == -(-len(lines) // 10)
+    assert sum("m100x" in l.split() for l in lines) == -(-len(lines) // 100)
+    assert not any("absent" in l for l in lines)
+    # Same shape, same corpus
+    assert bench.make_corpus(tmp_path / "again", shape)[0].read_text() == (
+        paths[0].read_text()
+    )
+
+
+def test_percentiles():
+    """Test latency percentiles are reported in milliseconds."""
+
+    assert bench.percentiles([0.010, 0.020, 0.030]) == {
+        "p50_ms": 20.0,
+        "p95_ms": 29.0,
+        "p99_ms": 29.8,
+    }
+    assert bench.percentiles([0.005]) == {
+        "p50_ms": 5.0,
+        "p95_ms": 5.0,
+        "p99_ms": 5.0,
+    }
+
+
+def test_run_benchmark_unknown_mode():
+    """Test an unknown worker mode is rejected before any work."""
+
+    with raises(ValueError):
+        bench.run_benchmark(bench.Shape(files=1), [1], modes=("threads",))
+
+
+def test_run_benchmark_integration(tmp_path):
+    """Test a small real benchmark produces a complete JSON report."""
+
+    report = bench.run_benchmark(
+        bench.Shape(files=8, lines=250),
+        cpus=[1, 2],
+        modes=("lists", "index"),
+        repeat=3,
+        selectivities=(0.0, 0.01, 1.0),
+        work=tmp_path,
+    )
+
+    json.loads(json.dumps(report))
+    assert report["version"] == bench.REPORT_VERSION
+    assert report["shape"]["files"] == 8
+    assert [(r["mode"], r["cpus"]) for r in report["runs"]] == [
+        ("lists", 1),
+        ("lists", 2),
+        ("index", 1),
+        ("index", 2),
+    ]
+    for run in report["runs"]:
+        assert run["setup_s"] > 0
+        assert len(run["worker_peak_rss"]) == run["cpus"]
+        absent, rare, every = run["queries"]
+        assert (absent["matches"], rare["matches"], every["matches"]) == (
+            0,
+            20,
+            2000,
+        )
+        assert absent["p50_ms"] <= absent["p95_ms"] <= absent["p99_ms"]
+        assert 0 < rare["result_bytes"] < every["result_bytes"]
+        assert every["query_bytes"] > 0
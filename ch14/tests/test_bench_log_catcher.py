@@ -0,0 +1,39 @@
+"""Test suite for the bench_log_catcher module.
+
+Covers the frame stream the client sends, and one small end-to-end
+benchmark run of both handlers over a loopback connection.
+"""
+
+import pickle
+import struct
+import sys
+from pathlib import Path
+
+# Add src directory to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from pytest import *
+import bench_log_catcher as bench
+
+
+def test_make_stream():
+    """Test the stream holds the requested frames, of about the given size."""
+
+    data = bench.make_stream(3, 200)
+    (size,) = struct.unpack_from(">L", data)
+    assert len(data) == 3 * (4 + size)
+    assert abs(size - 200) < 10
+    assert pickle.loads(data[4 : 4 + size])["levelname"] == "INFO"
+
+
+def test_run_benchmark(capsys):
+    """Test a small run reports a rate for each handler."""
+
+    report = bench.run_benchmark(frames=2000, size=100, chunk=1000, repeat=1)
+    assert set(report["handlers"]) == {"streams", "protocol"}
+    for result in report["handlers"].values():
+        assert result["min"] <= result["frames_per_s"] <= result["max"]
+        assert result["frames_per_s"] > 0
+    assert report["speedup"] > 0
+    # The handlers' summary lines don't reach stdout
+    assert capsys.readouterr().out == ""
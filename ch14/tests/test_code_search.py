@@ -1,5 +1,14 @@
 import ast
+import asyncio
+from concurrent import futures
+import contextlib
+import json
+import multiprocessing
+import os
+import re
 import sys
+import threading
+import time
 from pathlib import Path
 from pytest import fixture, mark, raises
 from unittest.mock import MagicMock, Mock, sentinel, call
@@ -97,7 +106,7 @@ def test_main(
     assert mock_futures_pool.mock_calls == [call(24)]
     context = mock_futures_pool.return_value.__enter__.return_value
     assert context.submit.mock_calls == [
-        call(code_search.find_imports, tmp_path / "file1.py")
+        call(code_search.find_imports, tmp_path / "file1.py", code_search.Extractor.AST)
     ]
     future = context.submit.return_value
     assert future.result.mock_calls == [call()]
@@ -453,6 +462,26 @@ class TestGetOptions:
         options = code_search.get_options(["./relative/path"])
         assert options.path[0] == Path("./relative/path")
 
+    def test_get_options_backend(self):
+        """Test the executor backend options and their defaults."""
+        options = code_search.get_options([])
+        assert options.backend is code_search.Backend.THREADS
+        assert options.workers is None
+        assert options.batch == code_search.BATCH_SIZE
+
+        options = code_search.get_options(
+            ["--backend", "hybrid", "--workers", "4", "--batch", "8", "src"]
+        )
+        assert options.backend is code_search.Backend.HYBRID
+        assert (options.workers, options.batch) == (4, 8)
+        assert options.path == [Path("src")]
+
+    def test_get_options_extractor(self):
+        """Test the extractor option and its default."""
+        assert code_search.get_options([]).extractor is code_search.Extractor.AST
+        options = code_search.get_options(["--extractor", "top"])
+        assert options.extractor is code_search.Extractor.TOP
+
 
 class TestMainEdgeCases:
     """Edge case tests for main function."""
@@ -553,3 +582,853 @@ class TestPerformance:
         results = [code_search.find_imports(f) for f in files]
         assert len(results) == 10
         assert all("os" in r.imports for r in results)
+
+
+class TestBackends:
+    """Tests for the process pool backends."""
+
+    @fixture
+    def project(self, tmp_path):
+        """Create a project with enough files and imports to need batches."""
+        names = ["os", "sys", "typing", "json", "re", "ast", "abc", "enum"]
+        for i in range(25):
+            package = tmp_path / f"pkg{i % 3}"
+            package.mkdir(exist_ok=True)
+            imports = [names[(i + k) % len(names)] for k in range(i % 6 + 1)]
+            (package / f"mod_{i}.py").write_text(
+                "".join(f"import {name}\n" for name in reversed(imports))
+                + f"from collections import abc as c{i}\n"
+            )
+        return tmp_path
+
+    def test_visitor_order(self):
+        """Test ImportVisitor records names once, in first-seen order."""
+        visitor = code_search.ImportVisitor()
+        visitor.visit(ast.parse("import sys, os\nfrom os import path\nimport abc"))
+        assert visitor.order == ["sys", "os", "abc"]
+        assert set(visitor.order) == visitor.imports
+
+    @mark.parametrize("backend", ["processes", "hybrid"])
+    @mark.parametrize("batch", [1, 4, code_search.BATCH_SIZE])
+    def test_main_output_matches_threads(
+        self, project, backend, batch, capsys, monkeypatch
+    ):
+        """Test every backend prints exactly what the thread backend prints."""
+        monkeypatch.chdir(project)
+        code_search.main(project)
+        expected = capsys.readouterr().out.splitlines()[:-1]
+
+        code_search.main(project, code_search.Backend(backend), 2, batch)
+        actual = capsys.readouterr().out.splitlines()
+
+        assert actual[:-1] == expected
+        assert actual[-1].startswith(f"Searched 25 files in {project} (")
+
+    def test_analyze_batches_syntax_error(self, project):
+        """Test a syntax error in a worker process reaches the caller."""
+        (project / "bad.py").write_text("import os\nif True\n")
+        paths = list(code_search.all_source(project, "*.py"))
+
+        with raises(SyntaxError):
+            list(code_search.analyze_batches(paths, workers=2, batch=4))
+
+
+class TestExtractors:
+    """Tests for the token-based import extractors."""
+
+    SOURCE = (
+        '"""Docstring mentioning\nimport fake\n"""\n'
+        "import os, a.b as c; from . import x\n"
+        "from ..pkg.sub import (y,\n    z)\n"
+        "x = 1; \\\n    import continued\n"
+        "try:\n    import json\nexcept ImportError:\n    json = None\n"
+        "if x: import inline\n"
+        "class A: import in_class\n"
+        "def f():\n    s = 'import nothing'\n    from typing import Any\n"
+        "f = lambda: 0; import after_lambda\n"
+    )
+
+    @mark.parametrize("nested", [False, True])
+    def test_scan_matches_ast(self, nested):
+        """Test the token scan finds the same names, in the same order."""
+        expected = code_search.ast_imports(self.SOURCE, nested)
+        assert code_search.scan_imports(self.SOURCE, nested) == expected
+
+    def test_scan_top_level(self):
+        """Test only module-level imports are found by default."""
+        assert code_search.scan_imports(self.SOURCE) == [
+            "os",
+            "a.b",
+            "pkg.sub",
+            "continued",
+            "after_lambda",
+        ]
+
+    def test_scan_nested(self):
+        """Test nested and conditional imports are found on request."""
+        names = code_search.scan_imports(self.SOURCE, nested=True)
+        assert names[4:] == ["json", "inline", "in_class", "typing", "after_lambda"]
+
+    def test_scan_stops_after_last_import(self, monkeypatch):
+        """Test the tokens after the last possible import are not read."""
+        source = "import os\n\ndef f():\n    return (\n" + "    1,\n" * 1000 + ")\n"
+        generate_tokens = code_search.tokenize.generate_tokens
+        read = []
+
+        def counting(readline):
+            for token in generate_tokens(readline):
+                read.append(token)
+                yield token
+
+        monkeypatch.setattr(code_search.tokenize, "generate_tokens", counting)
+        assert code_search.scan_imports(source) == ["os"]
+        assert len(read) < 20
+
+    def test_scan_soft_keyword_falls_back(self, monkeypatch):
+        """Test an import after a match/case colon is settled by the AST."""
+        source = "match = 3\nmatch: int = 4; import soft\n"
+        ast_imports = Mock(wraps=code_search.ast_imports)
+        monkeypatch.setattr(code_search, "ast_imports", ast_imports)
+        assert code_search.scan_imports(source) == ["soft"]
+        assert ast_imports.mock_calls == [call(source, False)]
+
+    def test_scan_tokenizer_error_falls_back(self):
+        """Test sources the tokenizer rejects are parsed, raising SyntaxError."""
+        with raises(SyntaxError):
+            code_search.scan_imports('import os\ns = """\nimport json\n')
+
+    @mark.parametrize("extractor", ["ast", "top", "nested"])
+    def test_find_imports(self, mock_code_2, extractor):
+        """Test every extractor finds the top-level imports of a file."""
+        actual = code_search.find_imports(mock_code_2, code_search.Extractor(extractor))
+        assert actual == code_search.ImportResult(mock_code_2, {"math", "typing"})
+
+    def test_main_nested_matches_ast(self, tmp_path, capsys, monkeypatch):
+        """Test the nested extractor prints exactly what the AST prints."""
+        for i in range(5):
+            (tmp_path / f"mod_{i}.py").write_text(self.SOURCE * (i + 1))
+        monkeypatch.chdir(tmp_path)
+        code_search.main(tmp_path)
+        expected = capsys.readouterr().out.splitlines()[:-1]
+
+        code_search.main(tmp_path, extractor=code_search.Extractor.NESTED)
+        assert capsys.readouterr().out.splitlines()[:-1] == expected
+
+    def test_analyze_batches_extractor(self, tmp_path):
+        """Test the process pool workers use the requested extractor."""
+        (tmp_path / "mod.py").write_text(self.SOURCE)
+        paths = list(code_search.all_source(tmp_path, "*.py"))
+
+        [result] = code_search.analyze_batches(
+            paths, workers=1, extractor=code_search.Extractor.TOP
+        )
+        assert result.imports == {"os", "a.b", "pkg.sub", "continued", "after_lambda"}
+
+
+class TestImportCache:
+    """Tests for the persistent import cache."""
+
+    @fixture
+    def project(self, tmp_path):
+        """Create a small project, and a place for its cache."""
+        root = tmp_path / "project"
+        root.mkdir()
+        for i in range(6):
+            (root / f"mod_{i}.py").write_text(f"import os\nimport m{i}\nimport sys\n")
+        return root
+
+    @fixture
+    def database(self, tmp_path):
+        return tmp_path / "imports.sqlite"
+
+    def test_warm_run_matches_cold_run(self, project, database, capsys, monkeypatch):
+        """Test a cached run prints what an uncached run prints."""
+        monkeypatch.chdir(project)
+        code_search.main(project)
+        expected = capsys.readouterr().out.splitlines()[:-1]
+
+        for _ in range(2):
+            with code_search.ImportCache(database) as cache:
+                code_search.main(project, cache=cache)
+            assert capsys.readouterr().out.splitlines()[:-1] == expected
+
+    def test_only_changed_files_parsed(self, project, database, monkeypatch):
+        """Test a warm run parses just the modified and new files."""
+        with code_search.ImportCache(database) as cache:
+            code_search.main(project, cache=cache)
+
+        (project / "mod_1.py").write_text("import json\n")
+        (project / "new.py").write_text("import re\n")
+        import_names = Mock(wraps=code_search.import_names)
+        monkeypatch.setattr(code_search, "import_names", import_names)
+
+        with code_search.ImportCache(database) as cache:
+            hits, misses = cache.split(list(code_search.all_source(project, "*.py")))
+            assert sorted(misses) == [project / "mod_1.py", project / "new.py"]
+            assert (cache.stat_hits, cache.hash_hits, cache.misses) == (5, 0, 2)
+            parsed = dict(cache.record(code_search.import_batches(misses, "threads")))
+            cache.save()
+        assert import_names.call_count == 2
+        assert parsed[project / "mod_1.py"] == ["json"]
+
+    def test_content_hash_hit(self, project, database):
+        """Test a file with a new mtime but the same content is a hit."""
+        with code_search.ImportCache(database) as cache:
+            code_search.main(project, cache=cache)
+        path = project / "mod_0.py"
+        os.utime(path, ns=(0, path.stat().st_mtime_ns + 10**9))
+
+        with code_search.ImportCache(database) as cache:
+            hits, misses = cache.split(list(code_search.all_source(project, "*.py")))
+            cache.save()
+        assert misses == []
+        assert (cache.stat_hits, cache.hash_hits) == (5, 1)
+        assert code_search.ImportResult(path, {"os", "m0", "sys"}) in hits
+
+    def test_removed_files_pruned(self, project, database):
+        """Test entries of files deleted under the base are dropped."""
+        with code_search.ImportCache(database) as cache:
+            code_search.main(project, cache=cache)
+        (project / "mod_0.py").unlink()
+
+        with code_search.ImportCache(database) as cache:
+            code_search.main(project, cache=cache)
+        with code_search.ImportCache(database) as cache:
+            assert str(project / "mod_0.py") not in cache.entries
+            assert len(cache.entries) == 5
+
+    def test_entries_per_extractor(self, project, database):
+        """Test each extractor has its own entries."""
+        (project / "nested.py").write_text("def f():\n    import json\n")
+        for extractor in code_search.Extractor:
+            with code_search.ImportCache(database, extractor) as cache:
+                code_search.main(project, extractor=extractor, cache=cache)
+
+        top = code_search.ImportCache(database, code_search.Extractor.TOP)
+        nested = code_search.ImportCache(database, code_search.Extractor.NESTED)
+        key = str(project / "nested.py")
+        assert (top.entries[key].names, nested.entries[key].names) == ("[]", '["json"]')
+        top.close()
+        nested.close()
+
+    def test_extractor_mismatch(self, project, database):
+        """Test main() refuses a cache of another extractor."""
+        with code_search.ImportCache(database, code_search.Extractor.TOP) as cache:
+            with raises(ValueError):
+                code_search.main(project, cache=cache)
+
+    def test_other_version_discarded(self, project, database, monkeypatch):
+        """Test a database of another cache version starts empty."""
+        with code_search.ImportCache(database) as cache:
+            code_search.main(project, cache=cache)
+        monkeypatch.setattr(code_search, "CACHE_VERSION", code_search.CACHE_VERSION + 1)
+
+        with code_search.ImportCache(database) as cache:
+            assert cache.entries == {}
+
+    def test_stats(self, project, database, capsys):
+        """Test --stats style reporting of the hit rate."""
+        with code_search.ImportCache(database) as cache:
+            code_search.main(project, cache=cache, stats=True)
+            code_search.main(project, cache=cache, stats=True)
+        reports = [
+            line for line in capsys.readouterr().out.splitlines() if "hit rate" in line
+        ]
+        assert reports == [
+            f"Cache {database}: 0 of 6 files unchanged (0.0% hit rate, 0 by content)"
+            ", 6 parsed",
+            f"Cache {database}: 6 of 6 files unchanged (100.0% hit rate, 0 by content)"
+            ", 0 parsed",
+        ]
+
+    def test_get_options(self):
+        """Test the cache options and their defaults."""
+        options = code_search.get_options([])
+        assert (options.cache, options.stats) == (None, False)
+        options = code_search.get_options(["--cache", "c.sqlite", "--stats"])
+        assert (options.cache, options.stats) == (Path("c.sqlite"), True)
+        with raises(SystemExit):
+            code_search.get_options(["--stats"])
+
+
+class TestStreaming:
+    """Tests for the streaming mode."""
+
+    @fixture
+    def project(self, tmp_path):
+        """Create a project of 30 files in nested directories."""
+        for i in range(30):
+            package = tmp_path / f"pkg{i % 4}" / f"sub{i % 2}"
+            package.mkdir(parents=True, exist_ok=True)
+            (package / f"mod_{i}.py").write_text(
+                f"import os\nimport m{i}\n" + ("from typing import Any\n" * (i % 2))
+            )
+        return tmp_path
+
+    def test_text_lines_match_report(self, project, capsys, monkeypatch):
+        """Test streaming prints the same lines as the sorted report."""
+        monkeypatch.chdir(project)
+        code_search.main(project)
+        expected = capsys.readouterr().out.splitlines()
+
+        code_search.main(project, stream=code_search.Output.TEXT)
+        actual = capsys.readouterr().out.splitlines()
+        assert actual[:2] == expected[:2]
+        assert sorted(actual[2:-1]) == sorted(expected[2:-1])
+        assert actual[-1].startswith(f"Searched 30 files in {project} (")
+
+    @mark.parametrize("backend, batch", [("threads", 1), ("processes", 4)])
+    def test_ordered(self, project, backend, batch):
+        """Test ordered streaming yields in walk order."""
+        paths = list(code_search.all_source(project, "*.py"))
+        results = code_search.stream_results(
+            iter(paths), backend, 2, batch, window=3, ordered=True
+        )
+        assert [result.path for result in results] == paths
+
+    def test_window_bounds_work_in_flight(self, project, monkeypatch):
+        """Test at most window paths are taken ahead of the results."""
+        paths = list(code_search.all_source(project, "*.py"))
+        taken = 0
+
+        def walk():
+            nonlocal taken
+            for path in paths:
+                taken += 1
+                yield path
+
+        seen = []
+        for result in code_search.stream_results(walk(), window=4, ordered=True):
+            seen.append(result.path)
+            # The paths yielded, plus up to window tasks of one path each
+            assert taken <= len(seen) + 4
+        assert seen == paths
+
+    def test_results_match_find_imports(self, project):
+        """Test each streamed result equals the one find_imports() returns."""
+        paths = code_search.all_source(project, "*.py")
+        for result in code_search.stream_results(paths, window=5):
+            assert result == code_search.find_imports(result.path)
+
+    def test_syntax_error(self, project):
+        (project / "bad.py").write_text("import os\nif True\n")
+        with raises(SyntaxError):
+            list(code_search.stream_results(code_search.all_source(project, "*.py")))
+
+    def test_ndjson(self, project, capsys):
+        """Test NDJSON streaming: JSON lines on stdout, summary on stderr."""
+        code_search.main(project, stream="ndjson", ordered=True)
+        out, err = capsys.readouterr()
+        lines = [json.loads(line) for line in out.splitlines()]
+        paths = list(code_search.all_source(project, "*.py"))
+        assert [line["path"] for line in lines] == [
+            str(path.relative_to(project)) for path in paths
+        ]
+        assert lines[1] == {
+            "base": str(project),
+            "path": str(paths[1].relative_to(project)),
+            "imports": sorted(code_search.find_imports(paths[1]).imports),
+            "focus": code_search.find_imports(paths[1]).focus,
+        }
+        assert err.startswith(f"Searched 30 files in {project} (")
+
+    def test_format_result(self, tmp_path):
+        result = code_search.ImportResult(tmp_path / "a.py", {"typing"})
+        assert code_search.format_result(result, tmp_path) == "-> a.py {'typing'}"
+
+    def test_cache_refused(self, project, tmp_path):
+        with code_search.ImportCache(tmp_path / "c.sqlite") as cache:
+            with raises(ValueError):
+                code_search.main(project, cache=cache, stream="text")
+
+    def test_get_options(self):
+        options = code_search.get_options([])
+        assert (options.stream, options.ordered) == (None, False)
+        assert options.window == code_search.WINDOW
+        options = code_search.get_options(
+            ["--stream", "ndjson", "--ordered", "--window", "8"]
+        )
+        assert options.stream is code_search.Output.NDJSON
+        assert (options.ordered, options.window) == (True, 8)
+        for window in ("0", "-1"):
+            with raises(SystemExit):
+                code_search.get_options(["--stream", "text", "--window", window])
+        with raises(SystemExit) as exit:
+            code_search.get_options(["--stream", "text", "--cache", "c.sqlite"])
+        assert exit.value.code == 2
+
+    def test_window_too_small(self, project):
+        """Test a window of no tasks is refused rather than spinning."""
+        paths = code_search.all_source(project, "*.py")
+        with raises(ValueError):
+            next(code_search.stream_results(paths, window=0))
+
+
+class TestProfile:
+    """Tests for the per-phase timing profile."""
+
+    @fixture
+    def project(self, tmp_path):
+        for i in range(8):
+            (tmp_path / f"mod_{i}.py").write_text("import os\n" + "x = 1\n" * 50 * i)
+        return tmp_path
+
+    def test_timed_batch(self, project):
+        """Test timed_batch() finds the same names and times each phase."""
+        paths = sorted(project.glob("*.py"))
+        for extractor in code_search.Extractor:
+            results = code_search.timed_batch(paths, extractor)
+            for path, names, timing in results:
+                assert names == code_search.import_names(path.read_text(), extractor)
+                assert timing.path == str(path)
+                assert timing.size == path.stat().st_size
+                assert min(timing.read, timing.parse, timing.visit) >= 0
+            if extractor is not code_search.Extractor.AST:
+                assert all(timing.visit < 1e-3 for _, _, timing in results)
+
+    def test_summarize(self):
+        summary = code_search.summarize([0.010, 0.020, 0.030])
+        assert summary["total_ms"] == 60.0
+        assert summary["mean_ms"] == summary["p50_ms"] == 20.0
+        assert summary["max_ms"] == 30.0
+        assert code_search.summarize([0.005])["p99_ms"] == 5.0
+
+    def test_walk_timed(self, monkeypatch):
+        """Test only the time spent producing paths is counted."""
+        clock = Mock(side_effect=[0.0, 0.5, 1.0, 1.25, 2.0, 2.5])
+        monkeypatch.setattr(code_search, "time", Mock(perf_counter=clock))
+        profile = code_search.Profile()
+        assert list(profile.walk(["a", "b"])) == ["a", "b"]
+        assert profile.walk_s == 1.25
+
+    @mark.parametrize("backend", ["threads", "processes"])
+    def test_main_report(self, project, backend, capsys, monkeypatch):
+        """Test profiling prints the usual report and fills the profile."""
+        monkeypatch.chdir(project)
+        code_search.main(project)
+        expected = capsys.readouterr().out.splitlines()[:-1]
+
+        profile = code_search.Profile(slowest=3)
+        code_search.main(project, backend, 2, 3, profile=profile)
+        assert capsys.readouterr().out.splitlines()[:-1] == expected
+
+        report = profile.report()
+        assert (report["files"], report["bytes"]) == (
+            8,
+            sum(path.stat().st_size for path in project.glob("*.py")),
+        )
+        assert set(report["phases"]) == {"read", "parse", "visit", "total"}
+        phases = report["phases"]
+        assert phases["total"]["total_ms"] >= phases["parse"]["total_ms"]
+        slowest = report["slowest"]
+        assert len(slowest) == 3
+        assert [entry["total_ms"] for entry in slowest] == sorted(
+            (entry["total_ms"] for entry in slowest), reverse=True
+        )
+        assert set(slowest[0]) == {
+            "path", "size", "read_ms", "parse_ms", "visit_ms", "total_ms"
+        }  # fmt: skip
+        json.dumps(report)
+
+    def test_empty_report(self):
+        report = code_search.Profile().report()
+        assert report["files"] == 0
+        assert (report["phases"], report["slowest"]) == ({}, [])
+
+    def test_combinations_refused(self, project, tmp_path):
+        with raises(ValueError):
+            code_search.main(project, stream="text", profile=code_search.Profile())
+
+    def test_get_options(self):
+        options = code_search.get_options([])
+        assert (options.profile, options.slowest) == (None, code_search.SLOWEST)
+        options = code_search.get_options(["--profile", "-", "--slowest", "3"])
+        assert (options.profile, options.slowest) == (Path("-"), 3)
+        for other in (["--cache", "c.sqlite"], ["--stream", "ndjson"]):
+            with raises(SystemExit) as exit:
+                code_search.get_options(["--profile", "-", *other])
+            assert exit.value.code == 2
+
+
+class TestAsyncScan:
+    """Test the asyncio scan() API."""
+
+    @fixture
+    def tree(self, tmp_path):
+        for i in range(12):
+            (tmp_path / f"m{i}.py").write_text(f"import os\nimport mod{i}\n")
+        (tmp_path / "pkg").mkdir()
+        (tmp_path / "pkg" / "a.py").write_text("from typing import Any\n")
+        return tmp_path
+
+    @staticmethod
+    def collect(*args, **kwargs):
+        async def run():
+            return [result async for result in code_search.scan(*args, **kwargs)]
+
+        return asyncio.run(run())
+
+    @staticmethod
+    async def drain(results):
+        return [result async for result in results]
+
+    def test_matches_find_imports(self, tree):
+        extra = tree / "pkg" / "a.py"
+        with futures.ThreadPoolExecutor(2) as pool:
+            results = self.collect([tree, extra], executor=pool)
+        assert sorted(str(r.path) for r in results) == sorted(
+            [str(p) for p in tree.glob("**/*.py")] + [str(extra)]
+        )
+        for result in results:
+            assert result == code_search.find_imports(result.path)
+
+    def test_process_pool(self, tree):
+        results = self.collect([tree / "pkg"], workers=1)
+        assert results == [code_search.ImportResult(tree / "pkg" / "a.py", {"typing"})]
+
+    def test_concurrency_bound(self, tree, monkeypatch):
+        active = peak = 0
+        lock = threading.Lock()
+        real = code_search.import_names
+
+        def tracking(text, extractor):
+            nonlocal active, peak
+            with lock:
+                active += 1
+                peak = max(peak, active)
+            time.sleep(0.01)
+            with lock:
+                active -= 1
+            return real(text, extractor)
+
+        monkeypatch.setattr(code_search, "import_names", tracking)
+        with futures.ThreadPoolExecutor(8) as pool:
+            results = self.collect([tree], concurrency=3, executor=pool)
+        assert len(results) == 13
+        assert peak <= 3
+
+    def test_close_stops_submission(self, tree, monkeypatch):
+        reads = []
+        real = Path.read_text
+
+        def counting(self, *args, **kwargs):
+            reads.append(self)
+            return real(self, *args, **kwargs)
+
+        monkeypatch.setattr(Path, "read_text", counting)
+
+        async def first():
+            scan = code_search.scan([tree], concurrency=2, executor=pool)
+            async with contextlib.aclosing(scan) as results:
+                async for result in results:
+                    return result
+
+        with futures.ThreadPoolExecutor(2) as pool:
+            result = asyncio.run(first())
+            assert result.imports
+            # One taken, at most two more started before the slot freed
+            assert len(reads) <= 3
+            # A caller's executor is left running
+            assert pool.submit(int, "1").result() == 1
+
+    def test_cancel_stops_submission(self, tree, monkeypatch):
+        started = []
+        real = code_search.import_names
+
+        def slow(text, extractor):
+            started.append(text)
+            time.sleep(0.05)
+            return real(text, extractor)
+
+        monkeypatch.setattr(code_search, "import_names", slow)
+
+        async def consume():
+            async for _ in code_search.scan([tree], concurrency=2, executor=pool):
+                pass
+
+        async def cancel_soon():
+            task = asyncio.create_task(consume())
+            await asyncio.sleep(0.02)
+            task.cancel()
+            with raises(asyncio.CancelledError):
+                await task
+
+        with futures.ThreadPoolExecutor(2) as pool:
+            asyncio.run(cancel_soon())
+        assert len(started) <= 2
+
+    def test_syntax_error(self, tmp_path):
+        (tmp_path / "bad.py").write_text("def broken(\n")
+        with futures.ThreadPoolExecutor(1) as pool:
+            with raises(SyntaxError):
+                self.collect([tmp_path], executor=pool)
+
+    def test_paths_error(self, tree):
+        """Test an error from the paths iterable ends the scan, not hangs it."""
+
+        def paths():
+            yield tree / "pkg"
+            raise OSError("listing failed")
+
+        async def run():
+            results = code_search.scan(paths(), executor=pool)
+            await asyncio.wait_for(self.drain(results), timeout=5)
+
+        with futures.ThreadPoolExecutor(1) as pool:
+            with raises(OSError, match="listing failed"):
+                asyncio.run(run())
+
+    def test_stat_off_loop(self, tree, monkeypatch):
+        """Test telling directories from files doesn't run on the loop."""
+        threads = []
+        real = Path.is_dir
+
+        def recording(self):
+            threads.append(threading.current_thread())
+            return real(self)
+
+        monkeypatch.setattr(Path, "is_dir", recording)
+        with futures.ThreadPoolExecutor(1) as pool:
+            results = self.collect([tree / "pkg", tree / "m0.py"], executor=pool)
+        assert len(results) == 2
+        assert threads and threading.main_thread() not in threads
+
+
+class TestSourceRoots:
+    """Test scanning several roots as one tree."""
+
+    @fixture
+    def roots(self, tmp_path):
+        (tmp_path / "app" / "pkg").mkdir(parents=True)
+        (tmp_path / "app" / "main.py").write_text("import os\n")
+        (tmp_path / "app" / "pkg" / "core.py").write_text("import typing\n")
+        (tmp_path / "lib").mkdir()
+        (tmp_path / "lib" / "util.py").write_text("import json\n")
+        os.link(tmp_path / "lib" / "util.py", tmp_path / "lib" / "copy.py")
+        (tmp_path / "alias").symlink_to(tmp_path / "app")
+        return tmp_path
+
+    def test_walk_skips_repeats(self, roots):
+        app, lib = roots / "app", roots / "lib"
+        found = code_search.SourceRoots([app, app / "pkg", roots / "alias", lib])
+        paths = list(found.walk())
+        assert len(paths) == 3
+        assert found.duplicates == 4
+        assert found.root_of[app / "pkg" / "core.py"] == app
+        assert {found.root(path) for path in paths} == {app, lib}
+
+    def test_root_fallback(self, roots):
+        found = code_search.SourceRoots([roots / "app", roots / "lib"])
+        assert found.root(roots / "lib" / "new.py") == roots / "lib"
+        assert found.root(roots / "elsewhere.py") == roots / "app"
+
+    def test_missing_file_is_kept(self, tmp_path, monkeypatch):
+        gone = tmp_path / "gone.py"
+        monkeypatch.setattr(code_search, "all_source", lambda root, pattern: [gone])
+        found = code_search.SourceRoots([tmp_path])
+        assert list(found.walk()) == [gone]
+
+    @mark.parametrize("backend", ["threads", "processes"])
+    def test_main_several_roots(self, roots, backend, capsys, monkeypatch):
+        monkeypatch.chdir(roots)
+        app, lib = roots / "app", roots / "lib"
+        code_search.main([app, roots / "alias", lib], backend, workers=2)
+        out = capsys.readouterr().out.splitlines()
+        # The hard links are one file, listed under whichever name came first
+        assert out[-2] in ("   copy.py {'json'}", "   util.py {'json'}")
+        assert out[:-2] == [
+            "",
+            str(app),
+            "   main.py {'os'}",
+            f"-> {os.path.join('pkg', 'core.py')} {{'typing'}}",
+            "",
+            str(roots / "alias"),
+            "",
+            str(lib),
+        ]
+        assert out[-1].startswith("Searched 3 files in 3 roots, 3 duplicate files")
+
+    def test_stream_several_roots(self, roots, capsys):
+        app, lib = roots / "app", roots / "lib"
+        code_search.main([app, lib, app], stream="ndjson", ordered=True)
+        out, err = capsys.readouterr()
+        lines = [json.loads(line) for line in out.splitlines()]
+        assert [(line["base"], line["path"]) for line in lines][:2] == [
+            (str(app), "main.py"),
+            (str(app), os.path.join("pkg", "core.py")),
+        ]
+        assert [line["base"] for line in lines[2:]] == [str(lib)]
+        assert err.startswith("Searched 3 files in 2 roots, 1 duplicate files")
+
+    def test_cache_prunes_every_root(self, roots, tmp_path, capsys):
+        app, lib = roots / "app", roots / "lib"
+        with code_search.ImportCache(tmp_path / "cache.sqlite") as cache:
+            code_search.main([app, lib], cache=cache)
+        (app / "main.py").unlink()
+        (lib / "copy.py").unlink()
+        with code_search.ImportCache(tmp_path / "cache.sqlite") as cache:
+            code_search.main([app, lib], cache=cache)
+            assert sorted(cache.entries) == [
+                str(app / "pkg" / "core.py"),
+                str(lib / "util.py"),
+            ]
+
+
+class TestLargeFiles:
+    """Test the lane for large files, and its budgets."""
+
+    @mark.parametrize("nested", [False, True])
+    def test_stream_matches_scan(self, tmp_path, nested):
+        path = tmp_path / "mod.py"
+        path.write_text(TestExtractors.SOURCE)
+        expected = code_search.scan_imports(TestExtractors.SOURCE, nested)
+        assert code_search.stream_imports(path, nested) == expected
+
+    def test_stream_stops_early(self, tmp_path, monkeypatch):
+        path = tmp_path / "table.py"
+        path.write_text("import os\nTABLE = [\n" + "    1,\n" * 1000 + "]\n")
+        rows = []
+        real = code_search._scan_tokens
+
+        def counting(tokens, nested, more):
+            return real((rows.append(t.start[0]) or t for t in tokens), nested, more)
+
+        monkeypatch.setattr(code_search, "_scan_tokens", counting)
+        assert code_search.stream_imports(path) == ["os"]
+        assert max(rows) < 10
+
+    def test_stream_edge_cases(self, tmp_path):
+        empty = tmp_path / "empty.py"
+        empty.write_text("")
+        assert code_search.stream_imports(empty) == []
+        # The tokenizer rejects the cookie; the AST fallback reads it all
+        cookie = tmp_path / "cookie.py"
+        cookie.write_text("# -*- coding: uft-8 -*-\nimport os\n")
+        assert code_search.stream_imports(cookie) == ["os"]
+        latin = tmp_path / "latin.py"
+        latin.write_bytes(b"# coding: latin-1\ns = '\xe9'\nimport os\n")
+        assert code_search.stream_imports(latin) == ["os"]
+
+    def test_hold(self, tmp_path):
+        paths = [tmp_path / name for name in ("a.py", "b.py", "c.py")]
+        sizes = {paths[0]: 10, paths[1]: 11}
+        large = code_search.LargeFiles(threshold=10)
+        assert list(large.hold(paths, sizes)) == [paths[0], paths[2]]
+        assert large.held == {paths[1]: 11}
+
+    def test_time_budget(self, tmp_path, monkeypatch):
+        def endless(path, nested):
+            while True:
+                pass
+
+        monkeypatch.setattr(code_search, "stream_imports", endless)
+        names, reason = code_search.guarded_imports(
+            tmp_path / "x.py", code_search.Extractor.TOP, 0.05
+        )
+        assert names is None and reason == "over the 0.05s time budget"
+
+    def test_memory_budget(self, tmp_path, monkeypatch):
+        def exhausted(text, nested=True):
+            raise MemoryError
+
+        path = tmp_path / "x.py"
+        path.write_text("import os\n")
+        monkeypatch.setattr(code_search, "ast_imports", exhausted)
+        assert code_search.guarded_imports(path, "ast", 1) == (
+            None,
+            "over the memory budget",
+        )
+
+    @mark.skipif(
+        not Path("/proc/self/status").exists() or code_search.resource is None,
+        reason="needs /proc and resource",
+    )
+    def test_memory_budget_mapping(self, tmp_path):
+        """Test a real RLIMIT_AS below the file's size skips the file."""
+        status = Path("/proc/self/status").read_text()
+        used = int(re.search(r"VmSize:\s*(\d+) kB", status)[1]) * 1024
+        # Room for the worker to run, but not to map the (sparse) file
+        budget = used + 256 * 2**20
+        path = tmp_path / "big.py"
+        with path.open("wb") as file:
+            file.write(b"import os\n")
+            file.truncate(budget + 2**30)
+        (tmp_path / "b.py").write_text("import os\n")
+
+        large = code_search.LargeFiles(threshold=0, memory=budget)
+        large.held = {path: path.stat().st_size, tmp_path / "b.py": 10}
+        assert list(large.analyze(code_search.Extractor.TOP)) == [
+            (tmp_path / "b.py", ["os"])
+        ]
+        assert [reason for _, _, reason in large.skipped] == [
+            "over the memory budget"
+        ]
+
+    @mark.skipif(not hasattr(os, "mkfifo"), reason="needs named pipes")
+    def test_worker_died(self, tmp_path):
+        """Test a worker killed mid-file skips only that file.
+
+        The worker blocks reading a named pipe and is killed from here, so
+        it works with any start method: nothing relies on the worker
+        inheriting this process's patches.
+        """
+        fifo = tmp_path / "a.py"
+        os.mkfifo(fifo)
+        (tmp_path / "b.py").write_text("import os\n")
+        before = set(multiprocessing.active_children())
+
+        def kill_reader():
+            # Opening for writing waits until the worker opens the pipe
+            with fifo.open("wb"):
+                for child in set(multiprocessing.active_children()) - before:
+                    child.kill()
+                    child.join()
+
+        threading.Thread(target=kill_reader, daemon=True).start()
+        large = code_search.LargeFiles(threshold=0)
+        large.held = {fifo: 0, tmp_path / "b.py": 10}
+        assert list(large.analyze(code_search.Extractor.AST)) == [
+            (tmp_path / "b.py", ["os"])
+        ]
+        assert large.report() == [
+            f"Skipped {fifo} (0.0 MB): the worker process died"
+        ]
+
+    @mark.parametrize("extractor", ["ast", "top"])
+    def test_main_output_unchanged(self, tmp_path, extractor, capsys, monkeypatch):
+        monkeypatch.chdir(tmp_path)
+        (tmp_path / "a.py").write_text("import typing\n" + "x = 1\n" * 100)
+        (tmp_path / "b.py").write_text("import os\n")
+        code_search.main(tmp_path, extractor=extractor)
+        expected = capsys.readouterr().out.splitlines()[:-1]
+        large = code_search.LargeFiles(threshold=100)
+        code_search.main(tmp_path, extractor=extractor, large=large)
+        out = capsys.readouterr().out.splitlines()
+        assert list(large.held) == [tmp_path / "a.py"]
+        assert out[:-1] == expected
+        assert out[-1].startswith("Searched 2 files")
+
+    def test_main_reports_skipped(self, tmp_path, capsys, monkeypatch):
+        monkeypatch.chdir(tmp_path)
+        (tmp_path / "a.py").write_text("import typing\n")
+        large = code_search.LargeFiles(threshold=0)
+
+        def analyze(extractor):
+            large.skipped.append(code_search.Skipped(tmp_path / "a.py", 14, "slow"))
+            return iter(())
+
+        large.analyze = analyze
+        code_search.main(tmp_path, stream="ndjson", large=large)
+        out, err = capsys.readouterr()
+        assert out == ""
+        assert err.splitlines()[0] == f"Skipped {tmp_path / 'a.py'} (0.0 MB): slow"
+        assert err.splitlines()[1].startswith("Searched 1 files")
+
+    def test_byte_size(self):
+        assert code_search.byte_size("8M") == 8 * 2**20
+        assert code_search.byte_size("1.5g") == 3 * 2**29
+        assert code_search.byte_size("512") == 512
+        with raises(ValueError):
+            code_search.byte_size("lots")
+        options = code_search.get_options(["--large", "1K", "--time-budget", "2"])
+        assert options.large == 1024 and options.time_budget == 2.0
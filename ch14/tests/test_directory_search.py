@@ -31,7 +31,14 @@ Fixtures:
     - mock_process: Mocked Process class for testing setup/teardown
 """
 
+import inspect
+import itertools
+import json
+import os
+import queue
+import re
 import sys
+import threading
 from pathlib import Path
 
 # Add src directory to path for imports
@@ -132,11 +139,22 @@ def mock_queue(monkeypatch):
         monkeypatch: pytest fixture for patching imports.
 
     Returns:
-        Mock: Mocked Queue class returning configured queue instances.
+        Mock: Mocked Queue class returning configured queue instances. Each
+            get() alternates a one-line chunk and a worker's end marker,
+            tagged with the id of the last Request put on a queue.
     """
 
+    sent = []
+    replies = itertools.cycle([["line with text"], None])
+
+    def reply():
+        requests = [m for m in sent if isinstance(m, directory_search.Request)]
+        return directory_search.Result(requests[-1].qid, next(replies))
+
     mock_instance = Mock(
-        name="mock Queue", put=Mock(), get=Mock(return_value=["line with text"])
+        name="mock Queue",
+        put=Mock(side_effect=sent.append),
+        get=Mock(side_effect=reply),
     )
     mock_queue_class = Mock(return_value=mock_instance)
     monkeypatch.setattr(directory_search, "Queue", mock_queue_class)
@@ -198,14 +216,15 @@ def test_directory_search(mock_queue, mock_process, mock_paths):
 
     result = list(ds_instance.search("text"))
 
+    query = directory_search.Request(1, directory_search.Query("text"))
     assert result == ["line with text", "line with text"]
-    assert mock_queue.return_value.put.mock_calls == [call("text"), call("text")]
-    assert mock_queue.return_value.get.mock_calls == [call(), call()]
+    assert mock_queue.return_value.put.mock_calls == [call(query), call(query)]
+    assert mock_queue.return_value.get.mock_calls == [call()] * 4
 
     ds_instance.teardown_search()
     assert mock_queue.return_value.put.mock_calls == [
-        call("text"),
-        call("text"),
+        call(query),
+        call(query),
         call(None),
         call(None),
     ]
@@ -631,6 +650,17 @@ def test_directory_search_many_cpus(mock_queue, mock_process, mock_paths):
     assert len(ds.search_workers) == 10
 
 
+def test_setup_search_positional_order():
+    """Test options added later follow the ones positional callers rely on."""
+
+    parameters = inspect.signature(
+        directory_search.DirectorySearch.setup_search
+    ).parameters
+    assert list(parameters) == [
+        "self", "paths", "cpus", "corpus", "index", "balance", "split", "reuse"
+    ]
+
+
 def test_directory_search_default_cpus(
     mock_queue, mock_process, mock_paths, monkeypatch
 ):
@@ -669,7 +699,7 @@ def test_directory_search_no_results(mock_queue, mock_process, mock_paths):
 
     mock_queue_instance = Mock(
         put=Mock(),
-        get=Mock(return_value=[]),  # Empty results
+        get=Mock(return_value=directory_search.Result(1, None)),  # End markers only
     )
     mock_queue.return_value = mock_queue_instance
 
@@ -687,18 +717,13 @@ def test_directory_search_multiple_searches(mock_queue, mock_process, mock_paths
     leveraging pre-loaded file content for efficiency.
     """
 
-    call_count = [0]
-
-    def get_side_effect():
-        call_count[0] += 1
-        if call_count[0] <= 2:
-            return ["result1"]
-        elif call_count[0] <= 4:
-            return ["result2"]
-        else:
-            return ["result3"]
-
-    mock_queue_instance = Mock(put=Mock(), get=Mock(side_effect=get_side_effect))
+    # Each search gets one chunk and one end marker from each worker
+    chunks = [
+        directory_search.Result(n, [f"result{n}"] if i % 2 == 0 else None)
+        for n in (1, 2, 3)
+        for i in range(4)
+    ]
+    mock_queue_instance = Mock(put=Mock(), get=Mock(side_effect=chunks))
     mock_queue.return_value = mock_queue_instance
 
     ds = directory_search.DirectorySearch()
@@ -721,7 +746,16 @@ def test_directory_search_large_result_set(mock_queue, mock_process, mock_paths)
     """
 
     large_results = [f"line {i}" for i in range(1000)]
-    mock_queue_instance = Mock(put=Mock(), get=Mock(return_value=large_results))
+    mock_queue_instance = Mock(
+        put=Mock(),
+        get=Mock(
+            side_effect=[
+                directory_search.Result(1, large_results),
+                directory_search.Result(1, None),
+            ]
+            * 2
+        ),
+    )
     mock_queue.return_value = mock_queue_instance
 
     ds = directory_search.DirectorySearch()
@@ -978,3 +1012,1217 @@ def test_stress_many_workers(tmp_path):
     assert len(results) == 20
 
     ds.teardown_search()
+
+
+# Corpus (memory-mapped) Mode Tests
+# ============================================================================
+
+
+def test_build_corpus_layout(mock_paths, tmp_path):
+    """Test build_corpus writes header, right-stripped lines, and offsets.
+
+    Verifies the offset array maps each line number to its byte range.
+    """
+
+    corpus = tmp_path / "corpus.bin"
+    offsets = directory_search.build_corpus(mock_paths, corpus)
+
+    data = corpus.read_bytes()
+    magic, version, line_count, blob_size, table_size = (
+        directory_search.CORPUS_HEADER.unpack_from(data)
+    )
+    assert magic == directory_search.CORPUS_MAGIC
+    assert version == directory_search.CORPUS_VERSION
+    assert line_count == 2
+    assert list(offsets) == [36, 49, 70]
+    assert blob_size == offsets[-1] - offsets[0]
+    assert [data[offsets[i] : offsets[i + 1] - 1] for i in range(2)] == [
+        b"not in file1",
+        b"file2 contains xyzzy",
+    ]
+    stamps = [directory_search.Stamp.of(path) for path in mock_paths]
+    assert json.loads(data[-table_size:]) == [
+        [str(path), size, mtime_ns, 1]
+        for path, (size, mtime_ns) in zip(mock_paths, stamps)
+    ]
+
+
+def test_mapped_search(mock_paths, tmp_path, mock_query_queue, mock_result_queue):
+    """Test mapped_search worker finds the same lines as search()."""
+
+    corpus = tmp_path / "corpus.bin"
+    directory_search.build_corpus(mock_paths, corpus)
+
+    directory_search.mapped_search(corpus, 0, 2, mock_query_queue, mock_result_queue)
+    assert mock_query_queue.get.mock_calls == [call(), call()]
+    assert mock_result_queue.put.mock_calls == [call(["file2 contains xyzzy"])]
+
+
+def test_mapped_search_line_range(tmp_path, mock_result_queue):
+    """Test mapped_search only reports lines inside its assigned range.
+
+    Verifies one hit per line, empty queries, Unicode, and that a query
+    spanning a line break never matches.
+    """
+
+    file1 = tmp_path / "file1.txt"
+    file1.write_text("import os  \nimport sys\nx = 'import import'\né 🎉\n")
+    corpus = tmp_path / "corpus.bin"
+    directory_search.build_corpus([file1], corpus)
+
+    mock_queue = Mock(get=Mock(side_effect=["import", "", "🎉", "os\nimport", None]))
+    directory_search.mapped_search(corpus, 1, 4, mock_queue, mock_result_queue)
+
+    assert mock_result_queue.put.mock_calls == [
+        call(["import sys", "x = 'import import'"]),
+        call(["import sys", "x = 'import import'", "é 🎉"]),
+        call(["é 🎉"]),
+        call([]),
+    ]
+
+
+def test_mapped_search_rejects_other_files(tmp_path, mock_query_queue):
+    """Test mapped_search refuses a file that isn't a corpus."""
+
+    bogus = tmp_path / "bogus.bin"
+    bogus.write_bytes(bytes(64))
+
+    with raises(ValueError):
+        directory_search.mapped_search(bogus, 0, 0, mock_query_queue, Mock())
+
+
+def test_directory_search_corpus_partition(mock_queue, mock_process, tmp_path):
+    """Test corpus mode splits the lines into contiguous, byte-balanced ranges."""
+
+    files = []
+    for i in range(4):
+        path = tmp_path / f"file{i}.py"
+        path.write_text("".join(f"line {i} {n}\n" for n in range(10)))
+        files.append(path)
+    corpus = tmp_path / "corpus.bin"
+
+    ds = directory_search.DirectorySearch()
+    ds.setup_search(files, cpus=4, corpus=corpus)
+
+    ranges = [c.kwargs["args"][1:3] for c in mock_process.mock_calls]
+    assert ranges == [(0, 10), (10, 20), (20, 30), (30, 40)]
+    assert all(
+        c.kwargs["target"] is directory_search.mapped_search
+        for c in mock_process.mock_calls
+    )
+
+
+def test_integration_corpus_mode(tmp_path):
+    """Integration test: corpus mode returns the same lines as list mode."""
+
+    for i in range(20):
+        (tmp_path / f"file{i}.py").write_text(
+            f"import module_{i}\nclass C{i}:\n    pass   \n"
+        )
+    paths = list(directory_search.all_source(tmp_path, "*.py"))
+
+    ds = directory_search.DirectorySearch()
+    ds.setup_search(paths, cpus=3, corpus=tmp_path / "corpus.bin")
+
+    assert sorted(ds.search("import")) == sorted(
+        f"import module_{i}" for i in range(20)
+    )
+    assert len(list(ds.search("pass"))) == 20
+    assert list(ds.search("xyzzy")) == []
+
+    ds.teardown_search()
+
+
+# Trigram Index Tests
+# ============================================================================
+
+
+@fixture
+def mock_corpus(tmp_path):
+    """Create a small corpus and trigram index.
+
+    Returns:
+        tuple[Path, Path]: The corpus file and its index file.
+    """
+
+    source = tmp_path / "source.py"
+    source.write_text(
+        "import os\nimport sys\nclass Importer:\n    pass\nx = 'ab'\nreport()\n"
+    )
+    corpus = tmp_path / "corpus.bin"
+    directory_search.build_corpus([source], corpus)
+    index = directory_search.index_path(corpus)
+    directory_search.build_trigram_index(corpus, index)
+    return corpus, index
+
+
+def test_index_path():
+    """Test the index file lives next to the corpus."""
+
+    assert directory_search.index_path(Path("/d/corpus.bin")) == Path(
+        "/d/corpus.bin.trigrams"
+    )
+
+
+def test_trigram_index_postings(mock_corpus):
+    """Test posting lists hold the sorted lines containing each trigram."""
+
+    corpus, index = mock_corpus
+    with directory_search.TrigramIndex(index) as trigrams:
+        assert trigrams.line_count == 6
+        assert list(trigrams.postings(b"imp")) == [0, 1]
+        assert list(trigrams.postings(b"por")) == [0, 1, 2, 5]
+        assert list(trigrams.postings(b"zzz")) == []
+
+
+def test_trigram_index_candidates(mock_corpus):
+    """Test candidates intersect posting lists within a line range."""
+
+    corpus, index = mock_corpus
+    with directory_search.TrigramIndex(index) as trigrams:
+        assert trigrams.candidates(b"import", 0, 6) == [0, 1]
+        assert trigrams.candidates(b"import", 1, 6) == [1]
+        assert trigrams.candidates(b"port", 0, 6) == [0, 1, 2, 5]
+        assert trigrams.candidates(b"xyzzy", 0, 6) == []
+
+
+def test_trigram_index_rejects_other_files(tmp_path):
+    """Test TrigramIndex refuses a file that isn't an index."""
+
+    bogus = tmp_path / "bogus.trigrams"
+    bogus.write_bytes(bytes(64))
+
+    with raises(ValueError):
+        directory_search.TrigramIndex(bogus)
+
+
+def test_mapped_search_with_index(mock_corpus, mock_result_queue):
+    """Test indexed queries match the full scan, including short queries."""
+
+    corpus, index = mock_corpus
+    queries = ["import", "mport", "port", "ab", "", "Importer:", "xyzzy", None]
+    mock_queue = Mock(get=Mock(side_effect=queries))
+    directory_search.mapped_search(corpus, 0, 6, mock_queue, mock_result_queue, index)
+
+    unindexed = Mock(put=Mock())
+    mock_queue = Mock(get=Mock(side_effect=queries))
+    directory_search.mapped_search(corpus, 0, 6, mock_queue, unindexed)
+
+    assert mock_result_queue.put.mock_calls == unindexed.put.mock_calls
+    assert mock_result_queue.put.mock_calls[2] == call(
+        ["import os", "import sys", "class Importer:", "report()"]
+    )
+
+
+def test_mapped_search_index_mismatch(mock_corpus, mock_paths, mock_query_queue):
+    """Test mapped_search refuses an index built for a different corpus."""
+
+    corpus, index = mock_corpus
+    other = corpus.with_name("other.bin")
+    directory_search.build_corpus(mock_paths, other)
+
+    with raises(ValueError):
+        directory_search.mapped_search(other, 0, 2, mock_query_queue, Mock(), index)
+
+
+def test_integration_trigram_index(tmp_path):
+    """Integration test: indexed corpus mode returns the same lines."""
+
+    for i in range(20):
+        (tmp_path / f"file{i}.py").write_text(f"import module_{i}\nx = {i}\n")
+    paths = list(directory_search.all_source(tmp_path, "*.py"))
+    corpus = tmp_path / "corpus.bin"
+
+    ds = directory_search.DirectorySearch()
+    ds.setup_search(paths, cpus=3, corpus=corpus, index=True)
+
+    assert directory_search.index_path(corpus).exists()
+    assert sorted(ds.search("module_1")) == sorted(
+        ["import module_1"] + [f"import module_{i}" for i in range(10, 20)]
+    )
+    assert len(list(ds.search("x ="))) == 20
+
+    ds.teardown_search()
+
+
+# Query Envelope Tests
+# ============================================================================
+
+
+def test_literal_prefix():
+    """Test literal prefix extraction is conservative and correct."""
+
+    assert directory_search.literal_prefix("import os") == "import os"
+    assert directory_search.literal_prefix(r"import\s+(\w+)") == "import"
+    assert directory_search.literal_prefix("colou?r") == "colo"
+    assert directory_search.literal_prefix("ab*c") == "a"
+    assert directory_search.literal_prefix("ab+c") == "ab"
+    assert directory_search.literal_prefix(r"a\.b") == "a.b"
+    assert directory_search.literal_prefix("foo|bar") == ""
+    assert directory_search.literal_prefix("^def") == ""
+    assert directory_search.literal_prefix("def", re.IGNORECASE) == ""
+
+
+def test_compile_query_is_cached():
+    """Test compiled patterns are reused for repeated queries."""
+
+    query = directory_search.Query(r"x\d+", directory_search.Kind.REGEX)
+    directory_search.compile_query.cache_clear()
+
+    first = directory_search.compile_query(query)
+    second = directory_search.compile_query(directory_search.Query(*query))
+
+    assert first is second
+    assert directory_search.compile_query.cache_info().hits == 1
+    assert first[1] == "x"
+
+
+@fixture
+def mock_source(tmp_path):
+    """Create a source file for envelope queries.
+
+    Returns:
+        Path: File with mixed-case and regex-relevant lines.
+    """
+
+    source = tmp_path / "source.py"
+    source.write_text(
+        "import os\nfrom sys import path\nIMPORT_ALL = True\n"
+        "def setup(self):\nclass Importer:\n# TODO: fix\n"
+    )
+    return source
+
+
+ENVELOPE_QUERIES = [
+    directory_search.Query("^(from|import) ", directory_search.Kind.REGEX),
+    directory_search.Query(r"def \w+\(self", directory_search.Kind.REGEX),
+    directory_search.Query("import", directory_search.Kind.CASEFOLD),
+    directory_search.Query("todo", directory_search.Kind.REGEX, re.IGNORECASE),
+    directory_search.Query("import", directory_search.Kind.LITERAL),
+    "import",
+    None,
+]
+
+# Each envelope is answered by a chunk and an end marker; bare strings by a list
+ENVELOPE_RESULTS = [
+    call(["import os", "from sys import path"]),
+    call(None),
+    call(["def setup(self):"]),
+    call(None),
+    call(["import os", "from sys import path", "IMPORT_ALL = True", "class Importer:"]),
+    call(None),
+    call(["# TODO: fix"]),
+    call(None),
+    call(["import os", "from sys import path"]),
+    call(None),
+    call(["import os", "from sys import path"]),
+]
+
+
+def loaded_queue(*messages):
+    """Return a real queue.Queue holding messages, for non-blocking polls."""
+
+    q = queue.Queue()
+    for message in messages:
+        q.put(message)
+    return q
+
+
+def test_search_query_envelopes(mock_source, mock_result_queue):
+    """Test the list worker handles regex, case-folded and literal envelopes."""
+
+    query_q = loaded_queue(*ENVELOPE_QUERIES)
+    directory_search.search([mock_source], query_q, mock_result_queue)
+
+    assert mock_result_queue.put.mock_calls == ENVELOPE_RESULTS
+
+
+@mark.parametrize("indexed", [False, True])
+def test_mapped_search_query_envelopes(
+    mock_source, tmp_path, mock_result_queue, indexed
+):
+    """Test the corpus worker gives the same envelope results, with or without index."""
+
+    corpus = tmp_path / "corpus.bin"
+    directory_search.build_corpus([mock_source], corpus)
+    index = None
+    if indexed:
+        index = directory_search.index_path(corpus)
+        directory_search.build_trigram_index(corpus, index)
+
+    query_q = loaded_queue(*ENVELOPE_QUERIES)
+    directory_search.mapped_search(corpus, 0, 6, query_q, mock_result_queue, index)
+
+    assert mock_result_queue.put.mock_calls == ENVELOPE_RESULTS
+
+
+def test_directory_search_sends_envelopes(mock_queue, mock_process, mock_paths):
+    """Test search() sends every query, literal ones included, as a Request."""
+
+    ds = directory_search.DirectorySearch()
+    ds.setup_search(mock_paths, cpus=1)
+
+    list(ds.search("text"))
+    list(ds.search("te.t", directory_search.Kind.REGEX, re.ASCII))
+    list(ds.search("TEXT", "casefold"))
+
+    Request, Query, Kind = (
+        directory_search.Request,
+        directory_search.Query,
+        directory_search.Kind,
+    )
+    assert mock_queue.return_value.put.mock_calls == [
+        call(Request(1, Query("text"))),
+        call(Request(2, Query("te.t", Kind.REGEX, re.ASCII))),
+        call(Request(3, Query("TEXT", Kind.CASEFOLD))),
+    ]
+
+
+def test_directory_search_rejects_bad_regex(mock_queue, mock_process, mock_paths):
+    """Test an invalid pattern fails before being sent to the workers."""
+
+    ds = directory_search.DirectorySearch()
+    ds.setup_search(mock_paths, cpus=1)
+
+    with raises(re.error):
+        list(ds.search("(unclosed", directory_search.Kind.REGEX))
+    mock_queue.return_value.put.assert_not_called()
+
+
+def test_search_streams_chunks(tmp_path, mock_result_queue, monkeypatch):
+    """Test matches are sent in bounded chunks followed by an end marker."""
+
+    source = tmp_path / "source"
+    source.write_text("".join(f"match {i}\n" for i in range(5)))
+    monkeypatch.setattr(directory_search, "CHUNK_LINES", 2)
+
+    query_q = loaded_queue(directory_search.Query("match"), None)
+    directory_search.search([source], query_q, mock_result_queue)
+
+    assert mock_result_queue.put.mock_calls == [
+        call(["match 0", "match 1"]),
+        call(["match 2", "match 3"]),
+        call(["match 4"]),
+        call(None),
+    ]
+
+
+def test_search_streams_chunks_by_size(tmp_path, mock_result_queue, monkeypatch):
+    """Test a chunk is also closed once it holds CHUNK_CHARS characters."""
+
+    source = tmp_path / "source"
+    source.write_text("abc\nabcdef\nab\n")
+    monkeypatch.setattr(directory_search, "CHUNK_CHARS", 8)
+
+    query_q = loaded_queue(directory_search.Query("ab"), None)
+    directory_search.search([source], query_q, mock_result_queue)
+
+    assert mock_result_queue.put.mock_calls == [
+        call(["abc", "abcdef"]),
+        call(["ab"]),
+        call(None),
+    ]
+
+
+@mark.parametrize("mapped", [False, True])
+def test_worker_cancel(tmp_path, mock_result_queue, monkeypatch, mapped):
+    """Test a CANCEL stops the scan after the current chunk.
+
+    The query and shutdown signal queued behind the CANCEL are held back and
+    handled in order once the cancelled query has been ended.
+    """
+
+    source = tmp_path / "source"
+    source.write_text("".join(f"match {i}\n" for i in range(5)))
+    monkeypatch.setattr(directory_search, "CHUNK_LINES", 2)
+    query_q = loaded_queue(
+        directory_search.Query("match"),
+        directory_search.Query("match 4"),
+        directory_search.CANCEL,
+        None,
+    )
+
+    # The first get() takes the query; the rest is found by the cancel poll
+    if mapped:
+        corpus = tmp_path / "corpus.bin"
+        directory_search.build_corpus([source], corpus)
+        directory_search.mapped_search(corpus, 0, 5, query_q, mock_result_queue)
+    else:
+        directory_search.search([source], query_q, mock_result_queue)
+
+    assert mock_result_queue.put.mock_calls == [
+        call(["match 0", "match 1"]),
+        call(None),
+        call(["match 4"]),
+        call(None),
+    ]
+
+
+@mark.parametrize(
+    "mode, kind",
+    [
+        ("lists", "literal"),
+        ("lists", "regex"),
+        ("corpus", "literal"),
+        ("corpus", "regex"),
+        # With an index, a literal only verifies its few candidate lines
+        ("index", "regex"),
+    ],
+)
+def test_worker_cancel_sparse_query(
+    tmp_path, mock_result_queue, monkeypatch, mode, kind
+):
+    """Test a CANCEL stops a scan that never fills a chunk.
+
+    Every SCAN_POLL lines scanned, the worker checks for a CANCEL even
+    though no chunk has been sent.
+    """
+
+    source = tmp_path / "source"
+    source.write_text("".join(f"line {i}\n" for i in range(100)) + "needle\n")
+    monkeypatch.setattr(directory_search, "SCAN_POLL", 10)
+    # Every line holds the regex's literal prefix, "line ", but none matches
+    target = "needle" if kind == "literal" else r"line \d+x"
+    query_q = loaded_queue(
+        directory_search.Query(target, directory_search.Kind(kind)),
+        directory_search.CANCEL,
+        None,
+    )
+
+    if mode == "lists":
+        directory_search.search([source], query_q, mock_result_queue)
+    else:
+        corpus = tmp_path / "corpus.bin"
+        directory_search.build_corpus([source], corpus)
+        index = None
+        if mode == "index":
+            index = tmp_path / "corpus.trigrams"
+            directory_search.build_trigram_index(corpus, index)
+        directory_search.mapped_search(
+            corpus, 0, 101, query_q, mock_result_queue, index
+        )
+
+    assert mock_result_queue.put.mock_calls == [call(None)]
+
+
+def test_worker_ignores_stale_cancel(tmp_path, mock_result_queue):
+    """Test a CANCEL arriving after its query ended is discarded."""
+
+    source = tmp_path / "source"
+    source.write_text("match\n")
+    query_q = loaded_queue(
+        directory_search.CANCEL, directory_search.Query("match"), None
+    )
+    directory_search.search([source], query_q, mock_result_queue)
+
+    assert mock_result_queue.put.mock_calls == [call(["match"]), call(None)]
+
+
+def test_directory_search_limit(mock_queue, mock_process, mock_paths):
+    """Test limit stops early and cancels the query on the workers."""
+
+    Result = directory_search.Result
+    mock_queue.return_value.get = Mock(
+        side_effect=[
+            Result(1, ["a", "b", "c"]),
+            Result(1, ["d"]),
+            Result(1, None),
+            Result(1, None),
+        ]
+    )
+    ds = directory_search.DirectorySearch()
+    ds.setup_search(mock_paths, cpus=2)
+
+    assert list(ds.search("text", limit=2)) == ["a", "b"]
+    request = directory_search.Request(1, directory_search.Query("text"))
+    cancel = directory_search.Command("cancel", (1,))
+    assert mock_queue.return_value.put.mock_calls == [
+        call(request),
+        call(request),
+        call(cancel),
+        call(cancel),
+    ]
+    # Chunks still in flight are drained, up to both end markers
+    assert mock_queue.return_value.get.call_count == 4
+    assert ds._buffers == {}
+
+
+def test_directory_search_abandoned_generator(mock_queue, mock_process, mock_paths):
+    """Test closing the result generator early also cancels the query."""
+
+    Result = directory_search.Result
+    mock_queue.return_value.get = Mock(
+        side_effect=[Result(1, ["a", "b"]), Result(1, None), Result(1, None)]
+    )
+    ds = directory_search.DirectorySearch()
+    ds.setup_search(mock_paths, cpus=2)
+
+    results = ds.search("text")
+    assert next(results) == "a"
+    results.close()
+
+    cancel = directory_search.Command("cancel", (1,))
+    assert mock_queue.return_value.put.mock_calls[-2:] == [call(cancel), call(cancel)]
+    assert mock_queue.return_value.get.call_count == 3
+
+
+def test_directory_search_complete_without_cancel(mock_queue, mock_process, mock_paths):
+    """Test a search that reaches every end marker sends no cancel."""
+
+    ds = directory_search.DirectorySearch()
+    ds.setup_search(mock_paths, cpus=2)
+
+    assert len(list(ds.search("text", limit=5))) == 2
+    assert not [
+        c
+        for c in mock_queue.return_value.put.mock_calls
+        if isinstance(c.args[0], directory_search.Command)
+    ]
+
+
+def test_integration_limit(tmp_path):
+    """Test limit with real workers, followed by a complete search."""
+
+    paths = []
+    for i in range(3):
+        path = tmp_path / f"file{i}.txt"
+        path.write_text("".join(f"needle {i} {n}\n" for n in range(50)))
+        paths.append(path)
+
+    ds = directory_search.DirectorySearch()
+    ds.setup_search(paths, cpus=3)
+    try:
+        first = list(ds.search("needle", limit=10))
+        everything = list(ds.search("needle"))
+    finally:
+        ds.teardown_search()
+
+    assert len(first) == 10
+    assert set(first) <= set(everything)
+    assert len(everything) == 150
+
+
+def test_integration_teardown_after_limit(tmp_path):
+    """Test the pool tears down after a search stopped by its limit.
+
+    A worker can't exit while chunks it queued are unread, so the search
+    must drain them before it returns.
+    """
+
+    paths = []
+    for i in range(6):
+        path = tmp_path / f"file{i}.py"
+        path.write_text("import os\n" * 20_000)
+        paths.append(path)
+
+    ds = directory_search.DirectorySearch()
+    ds.setup_search(paths, cpus=2)
+    try:
+        assert len(list(ds.search("import", limit=1))) == 1
+    finally:
+        teardown = threading.Thread(target=ds.teardown_search, daemon=True)
+        teardown.start()
+        teardown.join(30)
+    if teardown.is_alive():
+        for worker in ds.search_workers:
+            worker.kill()
+        fail("teardown_search() hung on undrained results")
+
+
+@fixture
+def mock_sized_paths(tmp_path):
+    """Create files of 900, 500, 400, 300 and 100 bytes.
+
+    Returns:
+        list[Path]: The files, smallest first so round-robin is unbalanced.
+    """
+
+    paths = []
+    for name, lines in (("e", 1), ("d", 3), ("c", 4), ("b", 5), ("a", 9)):
+        path = tmp_path / name
+        path.write_text(f"{name * 99}\n" * lines)
+        paths.append(path)
+    return paths
+
+
+def test_count_lines(tmp_path):
+    """Test line counting with and without a final terminator."""
+
+    path = tmp_path / "file"
+    for text, expected in (("", 0), ("a\n", 1), ("a\nb", 2), ("\n\n", 2)):
+        path.write_text(text)
+        assert directory_search.count_lines(path) == expected
+
+
+def test_partition_longest_processing_time(mock_sized_paths):
+    """Test heaviest files are spread first, each to the lightest worker."""
+
+    e, d, c, b, a = mock_sized_paths
+    assignments, worker_bytes = directory_search.partition(mock_sized_paths, 2)
+
+    # a, b, c (worker 1), d (tie, lowest worker), e
+    assert assignments == [[a, d], [b, c, e]]
+    assert worker_bytes == [1200, 1000]
+
+
+def test_partition_by_lines(mock_sized_paths):
+    """Test Balance.LINES weighs files by line count."""
+
+    e, d, c, b, a = mock_sized_paths
+    d.write_text("d\n" * 20)
+
+    assignments, worker_bytes = directory_search.partition(
+        mock_sized_paths, 2, directory_search.Balance.LINES
+    )
+
+    assert assignments == [[d], [a, b, c, e]]
+    assert worker_bytes == [40, 1900]
+
+
+def test_partition_split(mock_sized_paths):
+    """Test a file bigger than an even share is cut into byte-range shards."""
+
+    e, d, c, b, a = mock_sized_paths
+    assignments, worker_bytes = directory_search.partition(
+        mock_sized_paths, 4, split=True
+    )
+
+    # 2200 bytes over 4 workers: a (900 bytes) becomes two 450-byte shards
+    shards = [s for sources in assignments for s in sources if s not in (b, c, d, e)]
+    assert sorted(shards) == [
+        directory_search.Shard(a, 0, 450),
+        directory_search.Shard(a, 450, 900),
+    ]
+    # b, both shards, c, then d and e on the lightest workers
+    assert worker_bytes == [500, 550, 450, 700]
+
+
+def test_read_lines_shards(tmp_path):
+    """Test shards cut at any byte positions cover every line exactly once."""
+
+    path = tmp_path / "file"
+    lines = [f"line {i} " + "x" * (i % 7) for i in range(40)]
+    path.write_text("\n".join(lines) + "\n")
+    size = path.stat().st_size
+
+    for pieces in (1, 2, 3, 7, size):
+        cuts = [size * i // pieces for i in range(pieces + 1)]
+        found = [
+            line
+            for start, stop in zip(cuts, cuts[1:])
+            for line in directory_search.read_lines(
+                directory_search.Shard(path, start, stop)
+            )
+        ]
+        assert found == [line.rstrip() for line in lines]
+
+
+def test_read_lines_one_definition(tmp_path):
+    """Test a whole file and its shards break lines at the same places."""
+
+    path = tmp_path / "file"
+    path.write_bytes(
+        "a\rb\r\nc\x0bd\x0ce\u2028f\ng\x1ch\n".encode() + b"last"
+    )
+    size = path.stat().st_size
+
+    whole = list(directory_search.read_lines(path))
+    assert whole == ["a\rb", "c\x0bd\x0ce\u2028f", "g\x1ch", "last"]
+    for cut in range(size + 1):
+        shards = [
+            directory_search.Shard(path, 0, cut),
+            directory_search.Shard(path, cut, size),
+        ]
+        found = [l for s in shards for l in directory_search.read_lines(s)]
+        assert found == whole
+
+
+def test_search_loads_shards(tmp_path, mock_result_queue):
+    """Test the list worker loads only the lines of its shard."""
+
+    path = tmp_path / "file"
+    path.write_text("xyzzy 1\nxyzzy 2\nxyzzy 3\n")
+    query_q = Mock(get=Mock(side_effect=["xyzzy", None]))
+
+    directory_search.search(
+        [directory_search.Shard(path, 3, 12)], query_q, mock_result_queue
+    )
+
+    assert mock_result_queue.put.mock_calls == [call(["xyzzy 2"])]
+
+
+def test_directory_search_balance(mock_queue, mock_process, mock_sized_paths):
+    """Test setup_search() assigns balanced partitions and reports bytes."""
+
+    e, d, c, b, a = mock_sized_paths
+    ds = directory_search.DirectorySearch()
+    ds.setup_search(mock_sized_paths, cpus=2, balance="size")
+
+    assert [c.kwargs["args"][0] for c in mock_process.mock_calls] == [
+        [a, d],
+        [b, c, e],
+    ]
+    assert ds.worker_bytes == [1200, 1000]
+
+
+def test_directory_search_round_robin_by_default(
+    mock_queue, mock_process, mock_sized_paths
+):
+    """Test round-robin stays the default and doesn't weigh the files."""
+
+    ds = directory_search.DirectorySearch()
+    ds.setup_search(mock_sized_paths, cpus=2)
+
+    assert [c.kwargs["args"][0] for c in mock_process.mock_calls] == [
+        mock_sized_paths[0::2],
+        mock_sized_paths[1::2],
+    ]
+    assert ds.worker_bytes == []
+
+
+def test_integration_split(tmp_path):
+    """Test one huge file split across workers still yields every match once."""
+
+    path = tmp_path / "huge.txt"
+    path.write_text("".join(f"needle {n}\n" for n in range(500)))
+    small = tmp_path / "small.txt"
+    small.write_text("needle small\n")
+
+    ds = directory_search.DirectorySearch()
+    ds.setup_search([path, small], cpus=3, balance="size", split=True)
+    try:
+        results = list(ds.search("needle"))
+    finally:
+        ds.teardown_search()
+
+    assert len(ds.worker_bytes) == 3
+    assert sorted(results) == sorted(
+        [f"needle {n}" for n in range(500)] + ["needle small"]
+    )
+
+
+def test_search_drop_and_load(tmp_path, mock_result_queue):
+    """Test the list worker drops and (re)loads single files on command."""
+
+    old, new = tmp_path / "old", tmp_path / "new"
+    old.write_text("xyzzy old\n")
+    new.write_text("xyzzy new\n")
+    query_q = loaded_queue(
+        "xyzzy",
+        directory_search.Command("load", (new,)),
+        directory_search.Command("drop", (old,)),
+        "xyzzy",
+        directory_search.Command("load", (tmp_path / "vanished",)),
+        None,
+    )
+
+    directory_search.search([old], query_q, mock_result_queue)
+
+    assert mock_result_queue.put.mock_calls == [
+        call(["xyzzy old"]),
+        call(["xyzzy new"]),
+    ]
+
+
+def test_search_drop_shards(tmp_path, mock_result_queue):
+    """Test dropping a file also drops the shards of it a worker holds."""
+
+    path = tmp_path / "file"
+    path.write_text("xyzzy 1\nxyzzy 2\n")
+    query_q = loaded_queue(directory_search.Command("drop", (path,)), "xyzzy", None)
+
+    directory_search.search(
+        [directory_search.Shard(path, 0, 8)], query_q, mock_result_queue
+    )
+
+    assert mock_result_queue.put.mock_calls == [call([])]
+
+
+@fixture
+def separate_queues(mock_queue):
+    """Make each Queue() call return its own mock queue."""
+
+    mock_queue.side_effect = lambda: Mock(name="mock Queue")
+    return mock_queue
+
+
+def test_directory_search_refresh(separate_queues, mock_process, mock_sized_paths):
+    """Test refresh() only tells the workers holding affected files."""
+
+    e, d, c, b, a = mock_sized_paths
+    ds = directory_search.DirectorySearch()
+    ds.setup_search(mock_sized_paths, cpus=2, balance="size")
+    first, second = ds.query_queues
+
+    c.write_text("changed\n")
+    added = a.parent / "added"
+    added.write_text("added\n")
+    d.unlink()
+    report = ds.refresh([a, b, c, e, added])
+
+    assert report == directory_search.Refresh([added], [c], [d])
+    # Worker 0 held a and d; worker 1 held b, c and e and is now lighter
+    assert first.put.mock_calls == [call(directory_search.Command("drop", (d,)))]
+    assert second.put.mock_calls == [call(directory_search.Command("load", (c, added)))]
+    assert ds.worker_bytes == [900, 614]
+    assert ds.owners[added] == {1: 6}
+
+
+def test_directory_search_refresh_unchanged(
+    separate_queues, mock_process, mock_sized_paths
+):
+    """Test refresh() sends nothing when no file changed."""
+
+    ds = directory_search.DirectorySearch()
+    ds.setup_search(mock_sized_paths, cpus=2)
+
+    assert ds.refresh(mock_sized_paths) == directory_search.Refresh([], [], [])
+    for q in ds.query_queues:
+        q.put.assert_not_called()
+
+
+def test_directory_search_refresh_split_file(
+    separate_queues, mock_process, mock_sized_paths
+):
+    """Test a changed, split file is dropped everywhere and reloaded whole."""
+
+    e, d, c, b, a = mock_sized_paths
+    ds = directory_search.DirectorySearch()
+    ds.setup_search(mock_sized_paths, cpus=4, balance="size", split=True)
+    assert sorted(ds.owners[a]) == [1, 2]
+
+    a.write_text("short\n")
+    ds.refresh(mock_sized_paths)
+
+    drop = call(directory_search.Command("drop", (a,)))
+    assert drop in ds.query_queues[1].put.mock_calls
+    assert drop in ds.query_queues[2].put.mock_calls
+    # Worker 2 held only its 450-byte shard, so it is now the lightest
+    assert ds.owners[a] == {2: 6}
+    assert ds.query_queues[2].put.mock_calls[-1] == call(
+        directory_search.Command("load", (a,))
+    )
+
+
+def test_directory_search_refresh_corpus(
+    mock_queue, mock_process, mock_paths, tmp_path
+):
+    """Test refresh() refuses corpus mode."""
+
+    ds = directory_search.DirectorySearch()
+    ds.setup_search(mock_paths, cpus=1, corpus=tmp_path / "corpus.bin")
+
+    with raises(RuntimeError):
+        ds.refresh(mock_paths)
+
+
+def test_integration_refresh(tmp_path):
+    """Test real workers see changed, added and removed files after refresh()."""
+
+    paths = []
+    for i in range(4):
+        path = tmp_path / f"file{i}.txt"
+        path.write_text(f"needle {i}\n")
+        paths.append(path)
+
+    ds = directory_search.DirectorySearch()
+    ds.setup_search(paths, cpus=2)
+    try:
+        assert sorted(ds.search("needle")) == [f"needle {i}" for i in range(4)]
+
+        paths[0].write_text("needle 0 changed\n")
+        paths[3].unlink()
+        added = tmp_path / "file4.txt"
+        added.write_text("needle 4\n")
+        ds.refresh(directory_search.all_source(tmp_path, "*.txt"))
+
+        assert sorted(ds.search("needle")) == [
+            "needle 0 changed",
+            "needle 1",
+            "needle 2",
+            "needle 4",
+        ]
+    finally:
+        ds.teardown_search()
+
+
+@fixture
+def cached_sources(tmp_path):
+    """Create three source files and a corpus of them.
+
+    Returns:
+        tuple[list[Path], Path]: The files and the corpus file.
+    """
+
+    paths = []
+    for name in ("a", "b", "c"):
+        path = tmp_path / f"{name}.py"
+        path.write_text(f"{name} = 1\n{name} += 1\n")
+        paths.append(path)
+    corpus = tmp_path / "corpus.bin"
+    directory_search.build_corpus(paths, corpus)
+    return paths, corpus
+
+
+def rewrite_keeping_stamp(path, text):
+    """Change a file's content without changing its size or mtime."""
+
+    status = path.stat()
+    path.write_text(text)
+    os.utime(path, ns=(status.st_atime_ns, status.st_mtime_ns))
+
+
+def test_build_corpus_unchanged_keeps_file(cached_sources):
+    """Test an up-to-date corpus is used as it is, not rewritten."""
+
+    paths, corpus = cached_sources
+    before = corpus.stat()
+
+    offsets = directory_search.build_corpus(paths, corpus)
+
+    assert corpus.stat().st_ino == before.st_ino
+    assert list(offsets) == [36, 42, 49, 55, 62, 68, 75]
+
+
+def test_build_corpus_reuses_unchanged_files(cached_sources, tmp_path):
+    """Test only files whose size or mtime changed are read again."""
+
+    a, b, c = paths = cached_sources[0]
+    corpus = cached_sources[1]
+    # Same size and mtime: the cached lines are kept
+    rewrite_keeping_stamp(a, "A = 1\nA += 1\n")
+    b.write_text("b = 'changed'\n")
+
+    offsets = directory_search.build_corpus(paths, corpus)
+
+    data = corpus.read_bytes()
+    lines = [data[offsets[i] : offsets[i + 1] - 1] for i in range(len(offsets) - 1)]
+    assert lines == [b"a = 1", b"a += 1", b"b = 'changed'", b"c = 1", b"c += 1"]
+
+    # The result is laid out exactly like a fresh build of the same lines
+    fresh = tmp_path / "fresh.bin"
+    rewrite_keeping_stamp(a, "a = 1\na += 1\n")
+    directory_search.build_corpus(paths, fresh, reuse=False)
+    assert fresh.read_bytes() == data
+
+
+def test_build_corpus_without_reuse(cached_sources):
+    """Test reuse=False reads every file again."""
+
+    paths, corpus = cached_sources
+    rewrite_keeping_stamp(paths[0], "A = 1\nA += 1\n")
+
+    offsets = directory_search.build_corpus(paths, corpus, reuse=False)
+
+    assert corpus.read_bytes()[offsets[0] : offsets[1] - 1] == b"A = 1"
+
+
+def test_build_corpus_rebuilds_other_versions(cached_sources):
+    """Test a corpus of another format version is rebuilt, not reused."""
+
+    paths, corpus = cached_sources
+    data = bytearray(corpus.read_bytes())
+    data[8:12] = (1).to_bytes(4, "little")
+    corpus.write_bytes(bytes(data))
+    rewrite_keeping_stamp(paths[0], "A = 1\nA += 1\n")
+
+    offsets = directory_search.build_corpus(paths, corpus)
+
+    header = directory_search.CORPUS_HEADER.unpack_from(corpus.read_bytes())
+    assert header[1] == directory_search.CORPUS_VERSION
+    assert corpus.read_bytes()[offsets[0] : offsets[1] - 1] == b"A = 1"
+
+
+def test_build_corpus_ignores_other_files(tmp_path, mock_paths):
+    """Test an empty or foreign file at the target is simply replaced."""
+
+    corpus = tmp_path / "corpus.bin"
+    for junk in (b"", b"not a corpus"):
+        corpus.write_bytes(junk)
+        offsets = directory_search.build_corpus(mock_paths, corpus)
+        assert len(offsets) == 3
+
+
+def test_build_trigram_index_reuse(cached_sources):
+    """Test a current index is kept and a stale one rebuilt."""
+
+    paths, corpus = cached_sources
+    index = directory_search.index_path(corpus)
+    keys = directory_search.build_trigram_index(corpus, index)
+    before = index.stat()
+
+    assert directory_search.build_trigram_index(corpus, index) == keys
+    assert index.stat().st_ino == before.st_ino
+
+    paths[2].write_text("c = 'changed'\n")
+    directory_search.build_corpus(paths, corpus)
+    directory_search.build_trigram_index(corpus, index)
+
+    assert index.stat().st_ino != before.st_ino
+    with directory_search.TrigramIndex(index) as trigrams:
+        assert trigrams.line_count == 5
+        assert list(trigrams.postings(b"cha")) == [4]
+
+
+def test_integration_restart_from_cache(cached_sources):
+    """Test a restarted pool picks up changed files from the cached corpus."""
+
+    paths, corpus = cached_sources
+    paths[1].write_text("b = 'restarted'\n")
+
+    ds = directory_search.DirectorySearch()
+    ds.setup_search(paths, cpus=2, corpus=corpus, index=True)
+    try:
+        assert sorted(ds.search(" = ")) == ["a = 1", "b = 'restarted'", "c = 1"]
+    finally:
+        ds.teardown_search()
+
+
+def test_directory_search_interleaved_queries(mock_queue, mock_process, mock_paths):
+    """Test chunks of two queries in flight are routed by query id.
+
+    Draining a query stopped by its limit routes the other query's chunks
+    on the way, and drops its own.
+    """
+
+    Result = directory_search.Result
+    mock_queue.return_value.get = Mock(
+        side_effect=[
+            Result(1, ["first 1", "first 2"]),
+            Result(2, ["second 1"]),
+            Result(1, ["first 3"]),
+            Result(2, None),
+            Result(2, ["second 2"]),
+            Result(1, None),
+            Result(1, None),
+            Result(2, None),
+        ]
+    )
+    ds = directory_search.DirectorySearch()
+    ds.setup_search(mock_paths, cpus=2)
+
+    # Each query is sent when its generator starts
+    first = ds.search("first", limit=1)
+    second = ds.search("second")
+    assert next(first) == "first 1"
+    assert next(second) == "second 1"
+    assert list(first) == []
+    assert list(second) == ["second 2"]
+    assert ds._buffers == {}
+
+
+def test_search_tags_request_results(mock_source, mock_result_queue):
+    """Test the worker answers a Request with Results carrying its id."""
+
+    Request, Result = directory_search.Request, directory_search.Result
+    query_q = loaded_queue(
+        Request(7, directory_search.Query("import")),
+        Request(8, directory_search.Query("xyzzy")),
+        None,
+    )
+    directory_search.search([mock_source], query_q, mock_result_queue)
+
+    assert mock_result_queue.put.mock_calls == [
+        call(Result(7, ["import os", "from sys import path"])),
+        call(Result(7, None)),
+        call(Result(8, None)),
+    ]
+
+
+@mark.parametrize("mapped", [False, True])
+def test_worker_cancel_by_id(tmp_path, mock_result_queue, monkeypatch, mapped):
+    """Test cancels name the query they stop or skip.
+
+    Request 1 is stopped after its first chunk; request 2, still waiting
+    behind it, is answered with just its end marker; a cancel for a query
+    that already finished is ignored.
+    """
+
+    Request, Result, Query = (
+        directory_search.Request,
+        directory_search.Result,
+        directory_search.Query,
+    )
+    source = tmp_path / "source"
+    source.write_text("".join(f"match {i}\n" for i in range(5)))
+    monkeypatch.setattr(directory_search, "CHUNK_LINES", 2)
+    query_q = loaded_queue(
+        Request(1, Query("match")),
+        Request(2, Query("match")),
+        Request(3, Query("match 4")),
+        directory_search.Command("cancel", (2,)),
+        directory_search.Command("cancel", (1,)),
+        directory_search.Command("cancel", (1,)),
+        None,
+    )
+
+    if mapped:
+        corpus = tmp_path / "corpus.bin"
+        directory_search.build_corpus([source], corpus)
+        directory_search.mapped_search(corpus, 0, 5, query_q, mock_result_queue)
+    else:
+        directory_search.search([source], query_q, mock_result_queue)
+
+    assert mock_result_queue.put.mock_calls == [
+        call(Result(1, ["match 0", "match 1"])),
+        call(Result(2, None)),
+        call(Result(1, None)),
+        call(Result(3, ["match 4"])),
+        call(Result(3, None)),
+    ]
+
+
+def test_integration_concurrent_queries(tmp_path):
+    """Test queries from several threads at once get their own results."""
+
+    from concurrent.futures import ThreadPoolExecutor
+
+    paths = []
+    for i in range(4):
+        path = tmp_path / f"file{i}.txt"
+        path.write_text("".join(f"term{n} line {i}\n" for n in range(8)))
+        paths.append(path)
+
+    ds = directory_search.DirectorySearch()
+    ds.setup_search(paths, cpus=2)
+    try:
+        with ThreadPoolExecutor(8) as pool:
+            results = list(pool.map(lambda n: sorted(ds.search(f"term{n} ")), range(8)))
+    finally:
+        ds.teardown_search()
+
+    assert results == [[f"term{n} line {i}" for i in range(4)] for n in range(8)]
+
+
+def test_integration_asearch(tmp_path):
+    """Test asyncio callers can run queries concurrently with asearch()."""
+
+    import asyncio
+
+    paths = []
+    for i in range(3):
+        path = tmp_path / f"file{i}.txt"
+        path.write_text("".join(f"word{n} {i}\n" for n in range(20)))
+        paths.append(path)
+
+    async def collect(ds, term, limit=None):
+        return sorted([line async for line in ds.asearch(term, limit=limit)])
+
+    async def main(ds):
+        return await asyncio.gather(
+            collect(ds, "word1 "), collect(ds, "word2 "), collect(ds, "word", limit=5)
+        )
+
+    ds = directory_search.DirectorySearch()
+    ds.setup_search(paths, cpus=3)
+    try:
+        first, second, limited = asyncio.run(main(ds))
+        # The pool is still usable after a cancelled query
+        after = sorted(ds.search("word3 "))
+    finally:
+        ds.teardown_search()
+
+    assert first == [f"word1 {i}" for i in range(3)]
+    assert second == [f"word2 {i}" for i in range(3)]
+    assert len(limited) == 5
+    assert after == [f"word3 {i}" for i in range(3)]
@@ -0,0 +1,217 @@
+"""Test suite for the import_graph module.
+
+Covers module naming under package roots, relative import resolution,
+the graph's edges (packages, submodules, external modules), transitive
+queries in both directions, and the command-line front end.
+"""
+
+import ast
+import sys
+from pathlib import Path
+
+# Add src directory to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from pytest import fixture, mark, raises
+import import_graph
+from import_graph import ImportStatement, ModuleGraph
+
+
+@fixture
+def project(tmp_path):
+    """Create a src layout with a package, a CLI module and tests.
+
+    Returns:
+        Path: Root of the project; the package roots are src and tests.
+    """
+    files = {
+        "src/pkg/__init__.py": "from .core import run\n",
+        "src/pkg/core.py": "import os\nfrom . import util\n",
+        "src/pkg/util.py": "import typing\n",
+        "src/pkg/cli.py": "import argparse\nfrom pkg.core import run\n",
+        "src/pkg/sub/__init__.py": "",
+        "src/pkg/sub/deep.py": "from ..util import helper\nfrom .. import *\n",
+        "src/standalone.py": "import pkg.sub.deep\n",
+        "tests/test_core.py": "from pkg import core\nimport pytest\n",
+        "tests/test_util.py": "import pkg.util as u\n",
+    }
+    for name, text in files.items():
+        path = tmp_path / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(text)
+    return tmp_path
+
+
+@fixture
+def graph(project):
+    roots = [project / "src", project / "tests"]
+    paths = [p for root in roots for p in import_graph.all_source(root, "*.py")]
+    return ModuleGraph.build(paths, roots)
+
+
+def test_statement_visitor():
+    visitor = import_graph.StatementVisitor()
+    visitor.visit(ast.parse("import a.b, c\nfrom ..d import e, f\nfrom . import g"))
+    assert visitor.statements == [
+        ImportStatement("a.b", 0, ()),
+        ImportStatement("c", 0, ()),
+        ImportStatement("d", 2, ("e", "f")),
+        ImportStatement("", 1, ("g",)),
+    ]
+    # Still an ImportVisitor
+    assert visitor.order == ["a.b", "c", "d"]
+
+
+@mark.parametrize(
+    "relative, expected",
+    [
+        ("src/pkg/core.py", "pkg.core"),
+        ("src/pkg/__init__.py", "pkg"),
+        ("src/top.py", "top"),
+        ("src/__init__.py", ""),
+    ],
+)
+def test_module_name(tmp_path, relative, expected):
+    assert import_graph.module_name(tmp_path / relative, tmp_path / "src") == expected
+
+
+@mark.parametrize(
+    "statement, importer, is_package, expected",
+    [
+        (ImportStatement("os.path", 0, ()), "pkg.core", False, ("os.path", [])),
+        (
+            ImportStatement("util", 1, ("x",)),
+            "pkg.core",
+            False,
+            ("pkg.util", ["pkg.util.x"]),
+        ),
+        (ImportStatement("", 1, ("util",)), "pkg.core", False, ("pkg", ["pkg.util"])),
+        (ImportStatement("core", 1, ()), "pkg", True, ("pkg.core", [])),
+        (ImportStatement("", 2, ("a", "*")), "pkg.sub.deep", False, ("pkg", ["pkg.a"])),
+        (ImportStatement("x", 1, ()), "top", False, None),
+        (ImportStatement("", 3, ("x",)), "pkg.core", False, None),
+    ],
+)
+def test_resolve(statement, importer, is_package, expected):
+    assert import_graph.resolve(statement, importer, is_package) == expected
+
+
+def test_local_modules_first(graph, project):
+    local = graph.names[: len(graph.paths)]
+    assert sorted(local) == [
+        "pkg",
+        "pkg.cli",
+        "pkg.core",
+        "pkg.sub",
+        "pkg.sub.deep",
+        "pkg.util",
+        "standalone",
+        "test_core",
+        "test_util",
+    ]
+    assert sorted(graph.names[len(graph.paths) :]) == [
+        "argparse",
+        "os",
+        "pytest",
+        "typing",
+    ]
+    assert graph.module_of(project / "src" / "pkg" / "__init__.py") == "pkg"
+    assert "pkg.core" in graph and "json" not in graph
+
+
+def test_direct_edges(graph):
+    assert graph.imports("pkg") == ["pkg.core"]
+    # "from . import util" links the submodule, and its package
+    assert graph.imports("pkg.core") == ["os", "pkg", "pkg.util"]
+    # Importing pkg.sub.deep runs pkg and pkg.sub too
+    assert graph.imports("standalone") == ["pkg", "pkg.sub", "pkg.sub.deep"]
+    assert graph.imports("test_core") == ["pkg", "pkg.core", "pytest"]
+    assert graph.importers("pkg.util") == ["pkg.core", "pkg.sub.deep", "test_util"]
+    assert graph.importers("typing") == ["pkg.util"]
+
+
+def test_dependents(graph):
+    assert graph.dependents("pkg.sub.deep") == {"standalone"}
+    # pkg and pkg.core import each other, so each depends on itself
+    assert graph.dependents("pkg.core") == {
+        "pkg",
+        "pkg.cli",
+        "pkg.core",
+        "pkg.sub.deep",
+        "standalone",
+        "test_core",
+        "test_util",
+    }
+    assert graph.dependents("typing") == graph.dependents("pkg.util") | {"pkg.util"}
+    assert graph.dependents("argparse", "pytest") == {"pkg.cli", "test_core"}
+
+
+def test_dependencies(graph):
+    assert graph.dependencies("test_util") == {
+        "pkg",
+        "pkg.util",
+        "pkg.core",
+        "os",
+        "typing",
+    }
+
+
+def test_files(graph, project):
+    assert graph.files({"test_core", "pytest", "pkg.cli"}) == [
+        project / "src" / "pkg" / "cli.py",
+        project / "tests" / "test_core.py",
+    ]
+
+
+def test_unknown_module(graph):
+    with raises(KeyError, match="no module 'nope'"):
+        graph.dependents("nope")
+
+
+def test_nested_roots(project):
+    """Test files are named after their deepest root."""
+    roots = [project, project / "src"]
+    paths = list(import_graph.all_source(project, "*.py"))
+    graph = ModuleGraph.build(paths + paths[:2], roots)
+    assert "pkg.core" in graph and "src.pkg.core" not in graph
+    assert "tests.test_core" in graph
+    assert len(graph.paths) == 9
+
+
+def test_path_outside_roots(project):
+    with raises(ValueError):
+        ModuleGraph.build([project / "tests" / "test_core.py"], [project / "src"])
+
+
+def test_build_workers(graph, project):
+    roots = [project / "src", project / "tests"]
+    paths = [p for root in roots for p in import_graph.all_source(root, "*.py")]
+    parallel = ModuleGraph.build(paths, roots, workers=2)
+    assert parallel.names == graph.names
+    assert parallel.forward == graph.forward
+    assert parallel.reverse == graph.reverse
+
+
+def test_compressed_arrays(graph):
+    offsets, targets = graph.forward
+    assert offsets.typecode == targets.typecode == "I"
+    assert len(offsets) == len(graph) + 1
+    assert offsets[-1] == len(targets) == len(graph.reverse[1])
+
+
+def test_get_options():
+    options = import_graph.get_options(["src", "--dependents", "a", "b", "--files"])
+    assert options.root == [Path("src")]
+    assert options.dependents == ["a", "b"]
+    assert options.files and options.workers is None
+
+
+def test_main(project, capsys):
+    roots = [project / "src", project / "tests"]
+    import_graph.main(roots, ["pkg.util"], files=True)
+    out, err = capsys.readouterr()
+    assert out.splitlines()[-2:] == [
+        str(project / "tests" / "test_core.py"),
+        str(project / "tests" / "test_util.py"),
+    ]
+    assert err.startswith("Graph of 13 modules, ")
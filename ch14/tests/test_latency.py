@@ -0,0 +1,41 @@
+"""Test suite for the latency module.
+
+Covers the percentile summary shared by the directory search benchmark
+and code_search's profile.
+"""
+
+import sys
+from pathlib import Path
+
+# Add src directory to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from pytest import *
+import latency
+
+
+def test_percentiles():
+    """Test percentiles are reported in milliseconds, for any points."""
+
+    samples = [0.010, 0.020, 0.030]
+    assert latency.percentiles(samples) == {
+        "p50_ms": 20.0,
+        "p95_ms": 29.0,
+        "p99_ms": 29.8,
+    }
+    assert latency.percentiles(samples, (50, 90)) == {"p50_ms": 20.0, "p90_ms": 28.0}
+
+
+def test_single_sample():
+    """Test one sample is every percentile."""
+
+    assert latency.percentiles([0.005], (1, 50, 99)) == {
+        "p1_ms": 5.0,
+        "p50_ms": 5.0,
+        "p99_ms": 5.0,
+    }
+
+
+def test_no_samples():
+    with raises(latency.statistics.StatisticsError):
+        latency.percentiles([])
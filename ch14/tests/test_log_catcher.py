@@ -1,5 +1,8 @@
 import asyncio
+import importlib.util
 import json
+import logging
+import logging.handlers
 from pathlib import Path
 from pytest import fixture, mark, raises
 import pickle
@@ -11,6 +14,10 @@ from unittest.mock import AsyncMock, Mock, call, patch, MagicMock
 sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
 
 import log_catcher
+import remote_logging_app
+
+# What readexactly() raises at the end of the stream, between frames
+END = asyncio.IncompleteReadError(b"", 4)
 
 
 @fixture
@@ -39,7 +46,7 @@ def mock_stream():
     payload = pickle.dumps("message")
     size = struct.pack(">L", len(payload))
     stream = Mock(
-        read=AsyncMock(side_effect=[size, payload, None]),
+        readexactly=AsyncMock(side_effect=[size, payload, END]),
         get_extra_info=Mock(return_value=mock_socket),
     )
     return payload, stream
@@ -49,7 +56,7 @@ def test_log_catcher(mock_log_writer, mock_stream):
     payload, stream = mock_stream
     asyncio.run(log_catcher.log_catcher(stream, stream))
     # Depends on len(payload)
-    assert stream.read.mock_calls == [call(4), call(22), call(4)]
+    assert stream.readexactly.mock_calls == [call(4), call(22), call(4)]
     mock_log_writer.assert_awaited_with(payload)
 
 
@@ -204,21 +211,21 @@ class TestLogCatcher:
         payloads = [pickle.dumps(msg) for msg in messages]
         sizes = [struct.pack(">L", len(p)) for p in payloads]
 
-        # Create read side effects: size1, payload1, size2, payload2, size3, payload3, None
+        # Create read side effects: size1, payload1, ..., payload3, end of stream
         read_effects = []
         for size, payload in zip(sizes, payloads):
             read_effects.extend([size, payload])
-        read_effects.append(None)  # End of stream
+        read_effects.append(END)  # End of stream
 
         stream = Mock(
-            read=AsyncMock(side_effect=read_effects),
+            readexactly=AsyncMock(side_effect=read_effects),
             get_extra_info=Mock(return_value=mock_socket),
         )
 
         asyncio.run(log_catcher.log_catcher(stream, stream))
 
         # Should have read: size, payload for each message, plus final None
-        assert stream.read.call_count == 7  # 3 * (size + payload) + 1 (end)
+        assert stream.readexactly.call_count == 7  # 3 * (size + payload) + 1 (end)
         assert mock_log_writer.await_count == 3
 
     def test_log_catcher_empty_stream(self, mock_log_writer, capsys):
@@ -226,7 +233,7 @@ class TestLogCatcher:
         mock_socket = Mock(getpeername=Mock(return_value=("127.0.0.1", 12342)))
 
         stream = Mock(
-            read=AsyncMock(side_effect=[None]),  # Immediate disconnect
+            readexactly=AsyncMock(side_effect=[END]),  # Immediate disconnect
             get_extra_info=Mock(return_value=mock_socket),
         )
 
@@ -245,7 +252,7 @@ class TestLogCatcher:
         size = struct.pack(">L", len(payload))
 
         stream = Mock(
-            read=AsyncMock(side_effect=[size, payload, None]),
+            readexactly=AsyncMock(side_effect=[size, payload, END]),
             get_extra_info=Mock(return_value=mock_socket),
         )
 
@@ -268,10 +275,10 @@ class TestLogCatcher:
         for payload in payloads:
             size = struct.pack(">L", len(payload))
             read_effects.extend([size, payload])
-        read_effects.append(None)
+        read_effects.append(END)
 
         stream = Mock(
-            read=AsyncMock(side_effect=read_effects),
+            readexactly=AsyncMock(side_effect=read_effects),
             get_extra_info=Mock(return_value=mock_socket),
         )
 
@@ -287,7 +294,7 @@ class TestLogCatcher:
         size = struct.pack(">L", len(payload))
 
         stream = Mock(
-            read=AsyncMock(side_effect=[size, payload, None]),
+            readexactly=AsyncMock(side_effect=[size, payload, END]),
             get_extra_info=Mock(return_value=mock_socket),
         )
 
@@ -359,7 +366,7 @@ class TestEdgeCases:
         size = struct.pack(">L", 0)
 
         stream = Mock(
-            read=AsyncMock(side_effect=[size, payload, None]),
+            readexactly=AsyncMock(side_effect=[size, payload, END]),
             get_extra_info=Mock(return_value=mock_socket),
         )
 
@@ -379,10 +386,10 @@ class TestEdgeCases:
         for payload in payloads:
             size = struct.pack(">L", len(payload))
             read_effects.extend([size, payload])
-        read_effects.append(None)
+        read_effects.append(END)
 
         stream = Mock(
-            read=AsyncMock(side_effect=read_effects),
+            readexactly=AsyncMock(side_effect=read_effects),
             get_extra_info=Mock(return_value=mock_socket),
         )
 
@@ -496,10 +503,10 @@ class TestPerformance:
             size = struct.pack(">L", len(payload))
             read_effects.extend([size, payload])
 
-        read_effects.append(None)
+        read_effects.append(END)
 
         stream = Mock(
-            read=AsyncMock(side_effect=read_effects),
+            readexactly=AsyncMock(side_effect=read_effects),
             get_extra_info=Mock(return_value=mock_socket),
         )
 
@@ -512,3 +519,709 @@ class TestPerformance:
         # Should process 100 messages quickly (async should be fast)
         assert mock_log_writer.await_count == 100
         assert elapsed < 2.0  # Should be much faster than 100 * 0.01 seconds
+
+
+class TestBatchWriter:
+    """Test suite for the batched writer stage."""
+
+    @staticmethod
+    def run_writer(payloads, **kwargs):
+        async def write():
+            writer = log_catcher.BatchWriter(**kwargs)
+            writer.start()
+            for payload in payloads:
+                await writer.put(payload)
+            await writer.close()
+            return writer
+
+        return asyncio.run(write())
+
+    def test_batches(self, mock_target):
+        payloads = [pickle.dumps({"id": i}) for i in range(10)]
+        writer = self.run_writer(payloads, batch_size=4, linger=0)
+        sizes = [len(c.args[0]) for c in mock_target.writelines.mock_calls]
+        assert sum(sizes) == 10 and max(sizes) <= 4
+        lines = [line for c in mock_target.writelines.mock_calls for line in c.args[0]]
+        assert lines == [json.dumps({"id": i}) + "\n" for i in range(10)]
+        assert writer.errors == 0
+        mock_target.write.assert_not_called()
+
+    def test_linger_fills_batch(self, mock_target):
+        async def trickle():
+            writer = log_catcher.BatchWriter(batch_size=100, linger=0.2)
+            writer.start()
+            for i in range(5):
+                await writer.put(pickle.dumps(i))
+                await asyncio.sleep(0.01)
+            await asyncio.sleep(0.3)
+            # Written after lingering, without waiting for close()
+            assert len(mock_target.writelines.mock_calls) == 1
+            await writer.close()
+
+        asyncio.run(trickle())
+        assert mock_target.writelines.mock_calls == [
+            call(["0\n", "1\n", "2\n", "3\n", "4\n"])
+        ]
+
+    def test_full_batch_ends_linger(self, mock_target):
+        async def fill():
+            writer = log_catcher.BatchWriter(batch_size=3, linger=60)
+            writer.start()
+            await writer.put(pickle.dumps(0))
+            await asyncio.sleep(0.01)  # The writer lingers
+            await writer.put(pickle.dumps(1))
+            await writer.put(pickle.dumps(2))
+            await asyncio.wait_for(self.written(mock_target), 1)
+            await writer.close()
+
+        asyncio.run(fill())
+        assert mock_target.writelines.mock_calls == [call(["0\n", "1\n", "2\n"])]
+
+    @staticmethod
+    async def written(mock_target):
+        while not mock_target.writelines.called:
+            await asyncio.sleep(0.01)
+
+    def test_bad_payload_skipped(self, mock_target):
+        payloads = [pickle.dumps("a"), b"not a pickle", pickle.dumps("b")]
+        writer = self.run_writer(payloads, linger=0)
+        assert mock_target.writelines.mock_calls == [call(['"a"\n', '"b"\n'])]
+        assert writer.errors == 1
+
+    def test_close_without_start(self):
+        async def close():
+            await log_catcher.BatchWriter().close()
+
+        asyncio.run(close())
+
+    def test_write_error_keeps_draining(self, mock_target, capsys):
+        """A batch that can't be written is dropped; the next ones aren't."""
+        mock_target.writelines.side_effect = [OSError(28, "No space"), None, None]
+        payloads = [pickle.dumps(i) for i in range(6)]
+        writer = self.run_writer(payloads, batch_size=2, linger=0)
+        written = [c.args[0] for c in mock_target.writelines.mock_calls]
+        assert written[1:] == [["2\n", "3\n"], ["4\n", "5\n"]]
+        assert writer.errors == 2
+        assert "Dropped a batch of 2 records: OSError(28" in capsys.readouterr().err
+
+    def test_dead_writer_raises(self, monkeypatch):
+        """put() and close() raise the writer's error rather than block."""
+
+        def broken(self, batch):
+            raise RuntimeError("broken")
+
+        monkeypatch.setattr(log_catcher.BatchWriter, "drain", broken)
+
+        async def write():
+            writer = log_catcher.BatchWriter(batch_size=2, linger=0)
+            writer.start()
+            with raises(RuntimeError, match="broken"):
+                # Far more than the queue holds
+                for i in range(100):
+                    await asyncio.wait_for(writer.put(pickle.dumps(i)), 1)
+            with raises(RuntimeError, match="broken"):
+                await asyncio.wait_for(writer.close(), 1)
+
+        asyncio.run(write())
+
+    def test_put_after_close(self, mock_target):
+        async def write():
+            writer = log_catcher.BatchWriter(linger=0)
+            writer.start()
+            await writer.close()
+            with raises(RuntimeError, match="stopped"):
+                await writer.put(pickle.dumps(0))
+            await writer.close()
+
+        asyncio.run(write())
+
+    def test_log_writer_uses_writer(self, mock_target, monkeypatch):
+        log_catcher.LINE_COUNT = 0
+
+        async def write():
+            writer = log_catcher.BatchWriter(linger=0)
+            monkeypatch.setattr(log_catcher, "WRITER", writer)
+            writer.start()
+            for i in range(3):
+                await log_catcher.log_writer(pickle.dumps(i))
+            await writer.close()
+
+        asyncio.run(write())
+        assert log_catcher.LINE_COUNT == 3
+        mock_target.write.assert_not_called()
+        lines = [line for c in mock_target.writelines.mock_calls for line in c.args[0]]
+        assert lines == ["0\n", "1\n", "2\n"]
+
+    def test_main_flushes_on_shutdown(self, tmp_path, monkeypatch):
+        """Records still queued when the server closes are written."""
+        target = (tmp_path / "one.log").open("w")
+        monkeypatch.setattr(log_catcher, "TARGET", target)
+        log_catcher.LINE_COUNT = 0
+
+        async def serve_and_send():
+            serving = asyncio.create_task(
+                log_catcher.main("127.0.0.1", 0, batch_size=1000, linger=60)
+            )
+            while log_catcher.WRITER is None:
+                await asyncio.sleep(0.01)
+            port = log_catcher.server.sockets[0].getsockname()[1]
+            _, writer = await asyncio.open_connection("127.0.0.1", port)
+            for i in range(20):
+                payload = pickle.dumps({"id": i})
+                writer.write(struct.pack(">L", len(payload)) + payload)
+            await writer.drain()
+            writer.close()
+            await writer.wait_closed()
+            while log_catcher.LINE_COUNT < 20:
+                await asyncio.sleep(0.01)
+            log_catcher.server.close()
+            with raises(asyncio.CancelledError):
+                await serving
+
+        asyncio.run(serve_and_send())
+        target.close()
+        lines = (tmp_path / "one.log").read_text().splitlines()
+        assert [json.loads(line) for line in lines] == [{"id": i} for i in range(20)]
+        assert log_catcher.WRITER is None
+
+
+def frame(payload):
+    return struct.pack(">L", len(payload)) + payload
+
+
+class TestFraming:
+    """Test suite for exact-length framing."""
+
+    def test_readexactly_partial_frame(self, mock_log_writer, capsys):
+        mock_socket = Mock(getpeername=Mock(return_value=("127.0.0.1", 12342)))
+        stream = Mock(
+            readexactly=AsyncMock(
+                side_effect=[
+                    struct.pack(">L", 10),
+                    asyncio.IncompleteReadError(b"abc", 10),
+                ]
+            ),
+            get_extra_info=Mock(return_value=mock_socket),
+        )
+        asyncio.run(log_catcher.log_catcher(stream, stream))
+        out, _ = capsys.readouterr()
+        assert out.splitlines() == [
+            "Dropped an incomplete frame of 3 bytes",
+            "From ('127.0.0.1', 12342): 0 lines",
+        ]
+        mock_log_writer.assert_not_awaited()
+
+    @mark.parametrize("step", [1, 3, 4, 5, 1000])
+    def test_parser_split_and_coalesced(self, step):
+        payloads = [b"", b"a", b"hello" * 20, bytes(range(256))]
+        data = b"".join(frame(p) for p in payloads) * 3
+        parser = log_catcher.FrameParser(size=16)
+        found = []
+        for start in range(0, len(data), step):
+            found.extend(parser.write(data[start : start + step]))
+        assert found == payloads * 3
+        assert parser.start == parser.end == 0
+
+    def test_parser_buffer_reuse(self):
+        parser = log_catcher.FrameParser(size=32)
+        buffer = parser.buffer
+        head, tail = frame(b"y" * 5)[:3], frame(b"y" * 5)[3:]
+        assert parser.write(frame(b"x" * 10) + head) == [b"x" * 10]
+        for _ in range(100):
+            assert parser.write(tail + frame(b"x" * 10) + head) == [
+                b"y" * 5,
+                b"x" * 10,
+            ]
+        # Compacted in place; small frames never needed a new buffer
+        assert parser.buffer is buffer
+
+    def test_parser_grows_for_large_frame(self):
+        parser = log_catcher.FrameParser(size=16)
+        big = bytes(1000)
+        view = parser.get_buffer()
+        assert len(view) == 16
+        assert parser.write(frame(big)[:100]) == []
+        assert len(parser.buffer) >= 1004
+        assert parser.write(frame(big)[100:]) == [big]
+
+    def test_parser_feed(self):
+        parser = log_catcher.FrameParser()
+        data = frame(b"one") + frame(b"two")
+        view = parser.get_buffer(-1)
+        view[: len(data)] = data
+        assert parser.feed(len(data)) == [b"one", b"two"]
+
+    def test_protocol_pauses_reading(self, monkeypatch, capsys):
+        monkeypatch.setattr(log_catcher, "PENDING_LIMIT", 4)
+        written = []
+
+        async def slow_writer(bytes_payload):
+            written.append(bytes_payload)
+            await asyncio.sleep(0)
+
+        monkeypatch.setattr(log_catcher, "log_writer", slow_writer)
+
+        async def connect():
+            transport = Mock(get_extra_info=Mock(return_value=("10.0.0.1", 5)))
+            protocol = log_catcher.LogCatcherProtocol()
+            protocol.connection_made(transport)
+            data = b"".join(frame(str(i).encode()) for i in range(10))
+            view = protocol.get_buffer(-1)
+            view[: len(data)] = data
+            protocol.buffer_updated(len(data))
+            transport.pause_reading.assert_called_once()
+            protocol.connection_lost(None)
+            await protocol.done
+            return transport
+
+        transport = asyncio.run(connect())
+        assert written == [str(i).encode() for i in range(10)]
+        transport.resume_reading.assert_not_called()  # Closed by then
+        assert capsys.readouterr().out == "From ('10.0.0.1', 5): 10 lines\n"
+
+    @mark.parametrize("streams", [False, True])
+    def test_server_reassembles_frames(self, streams, tmp_path, monkeypatch):
+        """Frames split and coalesced across sends arrive intact."""
+        received = []
+
+        async def collect(bytes_payload):
+            received.append(bytes_payload)
+
+        monkeypatch.setattr(log_catcher, "log_writer", collect)
+        payloads = [pickle.dumps({"id": i, "pad": "x" * (i * 97)}) for i in range(50)]
+        data = b"".join(frame(p) for p in payloads)
+
+        async def serve_and_send():
+            serving = asyncio.create_task(
+                log_catcher.main("127.0.0.1", 0, streams=streams)
+            )
+            while log_catcher.WRITER is None:
+                await asyncio.sleep(0.01)
+            port = log_catcher.server.sockets[0].getsockname()[1]
+            _, writer = await asyncio.open_connection("127.0.0.1", port)
+            for start in range(0, len(data), 777):
+                writer.write(data[start : start + 777])
+                await writer.drain()
+                await asyncio.sleep(0)
+            writer.close()
+            await writer.wait_closed()
+            while len(received) < len(payloads):
+                await asyncio.sleep(0.01)
+            log_catcher.server.close()
+            with raises(asyncio.CancelledError):
+                await serving
+
+        asyncio.run(serve_and_send())
+        assert received == payloads
+
+
+class Exploit:
+    """Runs a command when unpickled with pickle.loads()."""
+
+    def __reduce__(self):
+        import os
+
+        return (os.system, ("echo unpickled",))
+
+
+class TestRecordDecoding:
+    """Test suite for restricted unpickling and the JSON format."""
+
+    def test_load_record_plain_data(self):
+        data = {"msg": "x", "lineno": 42, "created": 1.5, "args": None}
+        for protocol in range(1, pickle.HIGHEST_PROTOCOL + 1):
+            assert log_catcher.load_record(pickle.dumps(data, protocol)) == data
+
+    @mark.parametrize("protocol", range(pickle.HIGHEST_PROTOCOL + 1))
+    def test_load_record_refuses_globals(self, protocol):
+        with raises(pickle.UnpicklingError, match="system' is forbidden"):
+            log_catcher.load_record(pickle.dumps(Exploit(), protocol))
+
+    def test_socket_handler_record(self, mock_target):
+        handler = logging.handlers.SocketHandler("localhost", 0)
+        record = logging.LogRecord("app", logging.INFO, "x.py", 7, "n=%d", (3,), None)
+        log_catcher.serialize(handler.makePickle(record)[4:])
+        text = mock_target.write.mock_calls[0].args[0]
+        assert json.loads(text)["msg"] == "n=3"
+
+    def test_write_batch_skips_exploit(self, mock_target):
+        payloads = [pickle.dumps("a"), pickle.dumps(Exploit()), b'{"b": 1}']
+        assert log_catcher.write_batch(payloads) == 1
+        mock_target.writelines.assert_called_once_with(['"a"\n', '{"b": 1}\n'])
+
+    def test_frame_format(self):
+        assert log_catcher.frame_format(b'{"a": 1}') is log_catcher.Format.JSON
+        for protocol in range(pickle.HIGHEST_PROTOCOL + 1):
+            payload = pickle.dumps({"a": 1}, protocol)
+            assert log_catcher.frame_format(payload) is log_catcher.Format.PICKLE
+
+    def test_json_handler_record(self, mock_target):
+        handler = remote_logging_app.JSONSocketHandler("localhost", 0)
+        record = logging.LogRecord(
+            "app", logging.INFO, "x.py", 7, "n=%d", (3,), None
+        )
+        record.path = Path("one.log")  # Not a JSON type
+        data = handler.makePickle(record)
+        (size,) = struct.unpack(">L", data[:4])
+        assert size == len(data) - 4
+        # Written as sent
+        assert log_catcher.serialize(data[4:]) == data[4:].decode()
+        record_dict = json.loads(data[4:])
+        assert record_dict["msg"] == "n=3" and record_dict["args"] is None
+        assert record_dict["path"] == "one.log"
+
+    def test_json_spanning_lines(self, mock_target):
+        assert log_catcher.serialize(b'{"a":\n 1}') == '{"a": 1}'
+        with raises(ValueError):
+            log_catcher.serialize(b"{not json")
+
+    def test_log_catcher_settles_format(self, mock_log_writer, capsys):
+        mock_socket = Mock(getpeername=Mock(return_value=("127.0.0.1", 12342)))
+        payloads = [b'{"a": 1}', pickle.dumps({"b": 2}), b'{"c": 3}']
+        read_effects = []
+        for payload in payloads:
+            read_effects.extend([struct.pack(">L", len(payload)), payload])
+        stream = Mock(
+            readexactly=AsyncMock(side_effect=read_effects + [END]),
+            get_extra_info=Mock(return_value=mock_socket),
+        )
+        asyncio.run(log_catcher.log_catcher(stream, stream))
+        assert mock_log_writer.await_args_list == [
+            call(b'{"a": 1}'),
+            call(b'{"c": 3}'),
+        ]
+        assert capsys.readouterr().out.splitlines() == [
+            "Dropped 1 payloads not in json",
+            "From ('127.0.0.1', 12342): 2 lines",
+        ]
+
+    def test_protocol_settles_format(self, mock_log_writer, capsys):
+        async def connect():
+            transport = Mock(get_extra_info=Mock(return_value=("10.0.0.1", 5)))
+            protocol = log_catcher.LogCatcherProtocol()
+            protocol.connection_made(transport)
+            payloads = [pickle.dumps("a"), b'{"b": 1}', pickle.dumps("c")]
+            data = b"".join(frame(p) for p in payloads)
+            view = protocol.get_buffer(-1)
+            view[: len(data)] = data
+            protocol.buffer_updated(len(data))
+            protocol.connection_lost(None)
+            await protocol.done
+
+        asyncio.run(connect())
+        assert mock_log_writer.await_count == 2
+        assert capsys.readouterr().out.splitlines() == [
+            "Dropped 1 payloads not in pickle",
+            "From ('10.0.0.1', 5): 2 lines",
+        ]
+
+
+class TestWorkers:
+    """Test suite for the sharded, multi-process server."""
+
+    def test_shard_path(self):
+        path = log_catcher.shard_path(Path("logs") / "one.log", 3)
+        assert path == Path("logs") / "one.log.3"
+
+    def test_merge_shards(self, tmp_path):
+        shards = [tmp_path / "one.log.0", tmp_path / "one.log.1"]
+        shards[0].write_text(
+            '{"created": 1.0, "n": 1}\n'
+            '"no time"\n'
+            '{"created": 4.0, "n": 4}\n'
+            '{"lines_collected": 3, "worker": 0}\n'
+        )
+        shards[1].write_text(
+            '{"created": 2.0, "n": 2}\n'
+            '{"created": 3.0, "n": 3}\n'
+            '{"lines_collected": 2, "worker": 1}\n'
+        )
+        target = tmp_path / "one.log"
+        assert log_catcher.merge_shards(shards, target) == 5
+        assert target.read_text().splitlines() == [
+            '{"created": 1.0, "n": 1}',
+            '"no time"',
+            '{"created": 2.0, "n": 2}',
+            '{"created": 3.0, "n": 3}',
+            '{"created": 4.0, "n": 4}',
+            '{"lines_collected": 5, "workers": 2}',
+        ]
+
+    @mark.parametrize("run_lines", [log_catcher.MERGE_RUN, 2, 1])
+    def test_merge_unsorted_shards(self, tmp_path, run_lines):
+        """Shards in arrival order, not time order, still merge sorted."""
+        shards = [tmp_path / "one.log.0", tmp_path / "one.log.1"]
+        shards[0].write_text(
+            '{"created": 5, "n": 5}\n'
+            '{"created": 1, "n": 1}\n'
+            '"after 1"\n'
+            '{"created": 6, "n": 6}\n'
+        )
+        shards[1].write_text('{"created": 2, "n": 2}\n{"created": 3, "n": 3}\n')
+        target = tmp_path / "one.log"
+        assert log_catcher.merge_shards(shards, target, run_lines) == 6
+        assert target.read_text().splitlines() == [
+            '{"created": 1, "n": 1}',
+            '"after 1"',
+            '{"created": 2, "n": 2}',
+            '{"created": 3, "n": 3}',
+            '{"created": 5, "n": 5}',
+            '{"created": 6, "n": 6}',
+            '{"lines_collected": 6, "workers": 2}',
+        ]
+
+    def test_get_options(self):
+        options = log_catcher.get_options(["--workers", "4", "--merge"])
+        assert options.workers == 4 and options.merge
+        assert options.port == 18842 and options.target == Path("one.log")
+        assert log_catcher.get_options([]).workers == 1
+
+    @mark.skipif(sys.platform == "win32", reason="no SO_REUSEPORT")
+    def test_workers_share_port(self, tmp_path):
+        import signal
+        import socket
+        import subprocess
+        import time
+
+        with socket.socket() as probe:
+            probe.bind(("127.0.0.1", 0))
+            port = probe.getsockname()[1]
+        server = subprocess.Popen(
+            [
+                sys.executable,
+                str(Path(log_catcher.__file__)),
+                *("--host", "127.0.0.1", "--port", str(port)),
+                *("--workers", "2", "--merge"),
+            ],
+            cwd=tmp_path,
+            stdout=subprocess.PIPE,
+            text=True,
+        )
+        try:
+            for _ in range(100):
+                try:
+                    socket.create_connection(("127.0.0.1", port)).close()
+                    break
+                except ConnectionRefusedError:
+                    time.sleep(0.05)
+            created = 1_000_000.0
+            for connection in range(8):
+                with socket.create_connection(("127.0.0.1", port)) as client:
+                    for _ in range(5):
+                        created += 1
+                        record = {"created": created, "conn": connection}
+                        client.sendall(frame(pickle.dumps(record, 1)))
+            time.sleep(1)
+        finally:
+            server.send_signal(signal.SIGTERM)
+            out, _ = server.communicate(timeout=30)
+        assert server.returncode == 0
+        shards = sorted(tmp_path.glob("one.log.*"))
+        assert [shard.name for shard in shards] == ["one.log.0", "one.log.1"]
+        lines = (tmp_path / "one.log").read_text().splitlines()
+        times = [json.loads(line)["created"] for line in lines[:-1]]
+        assert times == [1_000_001.0 + n for n in range(40)]
+        assert json.loads(lines[-1]) == {"lines_collected": 40, "workers": 2}
+        assert "{'lines_collected': 40, 'workers': [" in out
+
+
+def created_lines(first, count, pad=40):
+    return [
+        json.dumps({"created": float(n), "msg": "x" * pad}) + "\n"
+        for n in range(first, first + count)
+    ]
+
+
+class TestSegments:
+    """Test suite for segmented, compressed and indexed output."""
+
+    def test_rotate_by_size_gzip(self, tmp_path):
+        import gzip
+
+        base = tmp_path / "one.log"
+        lines = created_lines(0, 100)
+        segments = log_catcher.Segments(2000, compression=log_catcher.Compression.GZIP)
+        with log_catcher.SegmentWriter(base, segments, block=500) as log:
+            log.writelines(lines)
+        packed = sorted(tmp_path.glob("one.log.*.gz"))
+        assert len(packed) == len(sorted(tmp_path.glob("one.log.*.idx"))) > 1
+        assert not list(tmp_path.glob("one.log.??????"))  # Raw files removed
+        # The blocks are gzip members, which make up a whole gzip file
+        text = b"".join(gzip.decompress(path.read_bytes()) for path in packed)
+        assert text.decode() == "".join(lines)
+        index = json.loads((tmp_path / "one.log.000000.idx").read_text())
+        assert index["segment"] == "one.log.000000.gz"
+        assert index["compression"] == "gzip" and index["first"] == 0.0
+        data = packed[0].read_bytes()
+        offset = 0
+        for block in index["blocks"]:
+            assert block["offset"] == offset
+            chunk = gzip.decompress(data[offset : offset + block["length"]])
+            times = [json.loads(line)["created"] for line in chunk.splitlines()]
+            assert [block["first"], block["last"]] == [times[0], times[-1]]
+            assert block["records"] == len(times)
+            offset += block["length"]
+        assert sum(block["records"] for block in index["blocks"]) == index["records"]
+
+    def test_rotate_by_time(self, tmp_path):
+        base = tmp_path / "one.log"
+        with log_catcher.SegmentWriter(base, log_catcher.Segments(seconds=0)) as log:
+            log.writelines(created_lines(0, 3))
+        # The last, empty segment is removed
+        assert [path.name for path in sorted(tmp_path.iterdir())] == [
+            "one.log.000000",
+            "one.log.000000.idx",
+            "one.log.000001",
+            "one.log.000001.idx",
+            "one.log.000002",
+            "one.log.000002.idx",
+        ]
+
+    def test_rotate_idle(self, tmp_path):
+        """An aged segment is finished even if no more lines arrive."""
+        import time
+
+        base = tmp_path / "one.log"
+        segments = log_catcher.Segments(seconds=0.1)
+        with log_catcher.SegmentWriter(base, segments) as log:
+            time.sleep(0.3)  # No segment yet: nothing to finish
+            assert log.sequence == 0 and log.timer is None
+            log.writelines(created_lines(0, 2))
+            deadline = time.monotonic() + 5
+            while not (tmp_path / "one.log.000000.idx").exists():
+                assert time.monotonic() < deadline
+                time.sleep(0.01)
+            assert log.sequence == 1 and log.timer is None
+        index = json.loads((tmp_path / "one.log.000000.idx").read_text())
+        assert index["records"] == 2
+        assert not (tmp_path / "one.log.000001").exists()
+
+    def test_partial_lines(self, tmp_path, mock_target):
+        base = tmp_path / "one.log"
+        log = log_catcher.SegmentWriter(base, log_catcher.Segments(size=10**6))
+        log_catcher.TARGET = log
+        log_catcher.serialize(pickle.dumps({"created": 5.0}))
+        log.write('{"created":')
+        log.write(" 6.0}\n{")
+        log.close()
+        assert (tmp_path / "one.log.000000").read_text().splitlines() == [
+            '{"created": 5.0}',
+            '{"created": 6.0}',
+            "{",
+        ]
+        index = json.loads((tmp_path / "one.log.000000.idx").read_text())
+        assert (index["records"], index["first"], index["last"]) == (3, 5.0, 6.0)
+
+    def test_read_segments(self, tmp_path):
+        base = tmp_path / "one.log"
+        segments = log_catcher.Segments(2000, compression=log_catcher.Compression.GZIP)
+        with log_catcher.SegmentWriter(base, segments, block=500) as log:
+            log.writelines(created_lines(0, 100))
+        assert "".join(log_catcher.read_segments(base)) == "".join(
+            created_lines(0, 100)
+        )
+        lines = list(log_catcher.read_segments(base, 40, 45))
+        times = [json.loads(line)["created"] for line in lines]
+        assert set(range(40, 46)) <= set(times)
+        assert len(lines) < 20  # Only the blocks holding the range
+
+    def test_read_segments_skips_shards(self, tmp_path):
+        """A worker shard's segments are not read as the base log's."""
+        for name, first in (("one.log", 0), ("one.log.1", 100)):
+            segments = log_catcher.Segments(size=10**6)
+            with log_catcher.SegmentWriter(tmp_path / name, segments) as log:
+                log.writelines(created_lines(first, 3))
+        assert (tmp_path / "one.log.1.000000.idx").exists()
+        assert list(log_catcher.read_segments(tmp_path / "one.log")) == (
+            created_lines(0, 3)
+        )
+
+    def test_numbering_continues(self, tmp_path):
+        base = tmp_path / "one.log"
+        (tmp_path / "one.log.0").write_text("")  # A shard, not a segment
+        for _ in range(2):
+            with log_catcher.SegmentWriter(base, log_catcher.Segments()) as log:
+                log.write('{"created": 1.0}\n')
+        assert (tmp_path / "one.log.000001.idx").exists()
+
+    def test_zstd_unavailable(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(log_catcher, "zstd", None)
+        segments = log_catcher.Segments(compression=log_catcher.Compression.ZSTD)
+        with raises(ValueError, match="zstd"):
+            log_catcher.SegmentWriter(tmp_path / "one.log", segments)
+
+    def test_options(self):
+        options = log_catcher.get_options(
+            ["--segment-size", "1000", "--compress", "gzip"]
+        )
+        assert log_catcher.log_segments(options) == log_catcher.Segments(
+            1000, None, log_catcher.Compression.GZIP
+        )
+        assert log_catcher.log_segments(log_catcher.get_options([])) is None
+        with raises(SystemExit):
+            log_catcher.get_options(
+                ["--workers", "2", "--merge", "--segment-time", "60"]
+            )
+
+
+# The previous chapter's copies of the payload decoding and JSON handler
+CH13_SOURCE = Path(__file__).parents[2] / "ch13" / "src"
+
+
+def load_ch13(name):
+    """Import a ch13 module by path, beside this chapter's one of that name."""
+    spec = importlib.util.spec_from_file_location(
+        f"ch13_{name}", CH13_SOURCE / f"{name}.py"
+    )
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def outcome(convert, payload):
+    """What convert makes of payload: its text, or its error's type."""
+    try:
+        return convert(payload)
+    except Exception as error:
+        return type(error)
+
+
+@mark.skipif(not CH13_SOURCE.exists(), reason="needs the ch13 sources")
+class TestChapterCopies:
+    """The chapters each keep a copy of the decoding; they must not drift."""
+
+    def test_record_text(self):
+        ch13 = load_ch13("log_catcher")
+        payloads = [
+            pickle.dumps({"msg": "Hello", "args": None, "lineno": 42}),
+            pickle.dumps({"msg": "Hello"}, protocol=1),
+            pickle.dumps(Path("one.log")),  # Names a global
+            pickle.dumps({1, 2}),  # Not JSON serializable
+            b"not a pickle",
+            b'{"msg": "Hello"}',
+            b'{\n"msg": "Hello"\n}',
+            b'{"msg": ',
+        ]
+        for payload in payloads:
+            assert outcome(ch13.record_text, payload) == outcome(
+                log_catcher.record_text, payload
+            )
+            assert ch13.frame_format(payload).value == (
+                log_catcher.frame_format(payload).value
+            )
+
+    def test_json_handler(self):
+        ch13 = load_ch13("remote_logging_app")
+        record = logging.LogRecord(
+            "app", logging.INFO, "app.py", 7, "x=%s", (Path("p"),), None
+        )
+        handlers = [
+            module.JSONSocketHandler("localhost", 0)
+            for module in (ch13, remote_logging_app)
+        ]
+        try:
+            ours, theirs = (handler.makePickle(record) for handler in handlers)
+        finally:
+            for handler in handlers:
+                handler.close()
+        assert ours == theirs
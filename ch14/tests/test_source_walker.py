@@ -0,0 +1,120 @@
+"""Test suite for the source_walker module.
+
+Covers the compiled glob rules, pruning of skipped directories (including
+glob entries such as *.egg-info), traversal order compared with os.walk,
+symbolic links, and the thread-pool fan-out.
+"""
+
+from fnmatch import fnmatch
+import os
+import sys
+from pathlib import Path
+
+# Add src directory to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from pytest import *
+import source_walker
+
+
+@fixture
+def mock_tree(tmp_path):
+    """Create a small source tree with skipped and nested directories.
+
+    Returns:
+        Path: Root of the tree.
+    """
+
+    for name in (
+        "setup.py",
+        "README.md",
+        "pkg/__init__.py",
+        "pkg/core.py",
+        "pkg/sub/deep.py",
+        "pkg/__pycache__/core.cpython-313.pyc",
+        "tests/test_core.py",
+        "demo.egg-info/PKG-INFO",
+        "demo.egg-info/hooks.py",
+        ".git/hooks/pre-commit.py",
+        "build/lib/pkg/core.py",
+    ):
+        path = tmp_path / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(f"# {name}\n")
+    return tmp_path
+
+
+def os_walk(path, pattern, skip):
+    """Reference implementation: os.walk with the skip globs."""
+
+    for root, dirs, files in os.walk(path):
+        dirs[:] = [d for d in dirs if not any(fnmatch(d, s) for s in skip)]
+        yield from (Path(root) / f for f in files if fnmatch(f, pattern))
+
+
+def test_compile_globs():
+    """Test the combined pattern matches any glob, and nothing when empty."""
+
+    skip = source_walker.compile_globs([".git", "*.egg-info", "build"])
+    assert skip.match("demo.egg-info")
+    assert skip.match(".git")
+    assert not skip.match("src")
+    assert not skip.match(".github")
+    assert not source_walker.compile_globs([]).match("anything")
+
+
+def test_walk_skips_glob_entries(mock_tree):
+    """Test *.egg-info is pruned (it used to be compared as a literal name)."""
+
+    files = list(source_walker.walk(mock_tree, "*.py"))
+
+    assert files[0] == mock_tree / "setup.py"
+    assert sorted(p.relative_to(mock_tree).as_posix() for p in files) == [
+        "pkg/__init__.py",
+        "pkg/core.py",
+        "pkg/sub/deep.py",
+        "setup.py",
+        "tests/test_core.py",
+    ]
+
+
+@mark.parametrize("workers", [None, 1, 4])
+def test_walk_matches_os_walk_order(mock_tree, workers):
+    """Test the walk yields exactly what os.walk does, in the same order."""
+
+    skip = ["__pycache__", ".git"]
+    expected = list(os_walk(mock_tree, "*", skip))
+
+    assert list(source_walker.walk(mock_tree, "*", skip, workers)) == expected
+
+
+def test_walk_custom_skip(mock_tree):
+    """Test an explicit skip list replaces the default one."""
+
+    files = list(source_walker.walk(mock_tree, "*.py", skip=["pkg", "b*"]))
+
+    assert sorted(p.relative_to(mock_tree).as_posix() for p in files) == [
+        ".git/hooks/pre-commit.py",
+        "demo.egg-info/hooks.py",
+        "setup.py",
+        "tests/test_core.py",
+    ]
+
+
+def test_walk_does_not_follow_directory_links(mock_tree):
+    """Test symbolic links to directories are not descended, like os.walk."""
+
+    (mock_tree / "link").symlink_to(mock_tree / "pkg", target_is_directory=True)
+    (mock_tree / "alias.py").symlink_to(mock_tree / "setup.py")
+
+    files = list(source_walker.walk(mock_tree, "*.py"))
+
+    assert mock_tree / "alias.py" in files
+    assert not any("link" in p.parts for p in files)
+
+
+def test_walk_missing_root(tmp_path):
+    """Test a missing root yields nothing, with or without workers."""
+
+    assert list(source_walker.walk(tmp_path / "missing", "*.py")) == []
+    assert list(source_walker.walk(tmp_path / "missing", "*.py", workers=2)) == []